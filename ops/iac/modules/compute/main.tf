@@ -156,7 +156,7 @@ resource "aws_lambda_function" "api" {
         AURORA_SECRET_ARN            = var.aurora_secret_arn
         AURORA_WRITER_ENDPOINT_PARAM = var.aurora_writer_endpoint_param
         REDIS_ENDPOINT_PARAM         = var.redis_endpoint_param
-        DJANGO_SETTINGS_MODULE       = "Habit_Tracker.settings"
+        DJANGO_SETTINGS_MODULE       = "Habit_Tracker.settings_api"
         DB_MIGRATE_ON_START          = "true"          # Temporarily enabled to run migrations
         API_GATEWAY_STAGE            = var.environment # Stage name for middleware to strip prefix
       },
@@ -182,6 +182,119 @@ resource "aws_lambda_permission" "apigw" {
   source_arn = "${aws_apigatewayv2_api.api.execution_arn}/${aws_apigatewayv2_stage.api.name}/*/*"
 }
 
+# Scheduled refresh of the precomputed "struggled most" habit rankings
+# lambda_handler runs the management command named in the event input
+resource "aws_cloudwatch_event_rule" "rankings_full_refresh" {
+  name                = "${var.project_name}-${var.environment}-rankings-full-refresh"
+  description         = "Recompute every habit ranking"
+  schedule_expression = var.rankings_full_refresh_schedule
+  tags                = local.common_tags
+}
+
+resource "aws_cloudwatch_event_target" "rankings_full_refresh" {
+  rule  = aws_cloudwatch_event_rule.rankings_full_refresh.name
+  arn   = aws_lambda_function.api.arn
+  input = jsonencode({ management_command = "refresh_rankings", args = [] })
+}
+
+resource "aws_cloudwatch_event_rule" "rankings_incremental_refresh" {
+  name                = "${var.project_name}-${var.environment}-rankings-incremental-refresh"
+  description         = "Re-score habits whose streak changed since the last ranking"
+  schedule_expression = var.rankings_incremental_refresh_schedule
+  tags                = local.common_tags
+}
+
+resource "aws_cloudwatch_event_target" "rankings_incremental_refresh" {
+  rule  = aws_cloudwatch_event_rule.rankings_incremental_refresh.name
+  arn   = aws_lambda_function.api.arn
+  input = jsonencode({ management_command = "refresh_rankings", args = ["--changed-only"] })
+}
+
+# Backfill of the Redis streak indexes; readers fall back to the database until
+# it has run after a flush, a failover or an update that could not reach Redis
+resource "aws_cloudwatch_event_rule" "streak_index_rebuild" {
+  name                = "${var.project_name}-${var.environment}-streak-index-rebuild"
+  description         = "Rebuild the Redis current/longest streak indexes"
+  schedule_expression = var.streak_index_rebuild_schedule
+  tags                = local.common_tags
+}
+
+resource "aws_cloudwatch_event_target" "streak_index_rebuild" {
+  rule  = aws_cloudwatch_event_rule.streak_index_rebuild.name
+  arn   = aws_lambda_function.api.arn
+  input = jsonencode({ management_command = "rebuild_streak_index", args = ["--batch-size", "1000"] })
+}
+
+# Deletes the Redis keys whose invalidation could not reach Redis (recorded in
+# the database while a container's circuit breaker was open)
+resource "aws_cloudwatch_event_rule" "cache_invalidation_replay" {
+  name                = "${var.project_name}-${var.environment}-cache-invalidation-replay"
+  description         = "Replay cache invalidations that could not reach Redis"
+  schedule_expression = var.cache_invalidation_replay_schedule
+  tags                = local.common_tags
+}
+
+resource "aws_cloudwatch_event_target" "cache_invalidation_replay" {
+  rule  = aws_cloudwatch_event_rule.cache_invalidation_replay.name
+  arn   = aws_lambda_function.api.arn
+  input = jsonencode({ management_command = "replay_cache_invalidations", args = [] })
+}
+
+# Sessions are stored in the database behind the Redis cache (cached_db);
+# Django never deletes the expired rows on its own
+resource "aws_cloudwatch_event_rule" "clear_sessions" {
+  name                = "${var.project_name}-${var.environment}-clear-sessions"
+  description         = "Delete expired sessions from the database"
+  schedule_expression = var.clear_sessions_schedule
+  tags                = local.common_tags
+}
+
+resource "aws_cloudwatch_event_target" "clear_sessions" {
+  rule  = aws_cloudwatch_event_rule.clear_sessions.name
+  arn   = aws_lambda_function.api.arn
+  input = jsonencode({ management_command = "clearsessions", args = [] })
+}
+
+resource "aws_lambda_permission" "rankings_full_refresh" {
+  statement_id  = "AllowEventBridgeRankingsFullRefresh"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.api.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.rankings_full_refresh.arn
+}
+
+resource "aws_lambda_permission" "rankings_incremental_refresh" {
+  statement_id  = "AllowEventBridgeRankingsIncrementalRefresh"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.api.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.rankings_incremental_refresh.arn
+}
+
+resource "aws_lambda_permission" "streak_index_rebuild" {
+  statement_id  = "AllowEventBridgeStreakIndexRebuild"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.api.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.streak_index_rebuild.arn
+}
+
+resource "aws_lambda_permission" "cache_invalidation_replay" {
+  statement_id  = "AllowEventBridgeCacheInvalidationReplay"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.api.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.cache_invalidation_replay.arn
+}
+
+resource "aws_lambda_permission" "clear_sessions" {
+  statement_id  = "AllowEventBridgeClearSessions"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.api.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.clear_sessions.arn
+}
+
 resource "aws_apigatewayv2_api" "api" {
   name          = "${var.project_name}-${var.environment}-http-api"
   protocol_type = "HTTP"
@@ -67,3 +67,33 @@ variable "log_retention_in_days" {
 }
 
 
+
+variable "rankings_full_refresh_schedule" {
+  description = "EventBridge schedule expression for the full habit rankings refresh."
+  type        = string
+  default     = "rate(1 day)"
+}
+
+variable "rankings_incremental_refresh_schedule" {
+  description = "EventBridge schedule expression for re-scoring habits whose streak changed."
+  type        = string
+  default     = "rate(15 minutes)"
+}
+
+variable "streak_index_rebuild_schedule" {
+  description = "EventBridge schedule expression for rebuilding the Redis streak indexes."
+  type        = string
+  default     = "rate(1 hour)"
+}
+
+variable "cache_invalidation_replay_schedule" {
+  description = "EventBridge schedule expression for replaying cache invalidations that could not reach Redis."
+  type        = string
+  default     = "rate(1 minute)"
+}
+
+variable "clear_sessions_schedule" {
+  description = "EventBridge schedule expression for deleting expired sessions from the database."
+  type        = string
+  default     = "rate(1 day)"
+}
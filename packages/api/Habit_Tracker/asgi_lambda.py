@@ -0,0 +1,61 @@
+"""
+ASGI config for the Lambda runtime (served through Mangum by lambda_handler).
+
+Django's ASGIHandler opens a new ``ThreadSensitiveContext`` for every request,
+so the synchronous part of each request (middleware, sync views, the ORM) runs
+on a new executor thread. Database connections belong to the thread that opened
+them, so every warm invocation would open a new connection and leave the
+previous one idle until its thread is garbage-collected.
+
+A Lambda container serves one request at a time, so this handler runs the
+synchronous code of every request on one thread kept for the life of the
+process. Connections kept by ``CONN_MAX_AGE`` are then reused across
+invocations (see Habit_Tracker.db_connections). Init work that opens
+connections for the requests (the warm-up) runs on that thread too, through
+``run_on_request_thread``. ASGI servers serving concurrent requests keep using
+``Habit_Tracker.asgi``.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext
+from django.core.handlers.asgi import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Habit_Tracker.settings_api')
+
+
+class SingleThreadASGIHandler(ASGIHandler):
+    """ASGIHandler running the synchronous code of all requests on the same thread."""
+
+    # Shared by all requests; its executor (one worker thread) lives as long as the process
+    thread_context = ThreadSensitiveContext()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='django-requests')
+    # sync_to_async runs the code of a thread-sensitive context on the executor registered for it
+    SyncToAsync.context_to_thread_executor[thread_context] = executor
+
+    async def __call__(self, scope, receive, send):
+        # ASGIHandler's own ThreadSensitiveContext is re-entrant and leaves this one in place
+        token = SyncToAsync.thread_sensitive_context.set(self.thread_context)
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            SyncToAsync.thread_sensitive_context.reset(token)
+
+
+def run_on_request_thread(func, *args, **kwargs):
+    """
+    Call a function on the thread that runs the requests' synchronous code.
+
+    Args:
+        func: The function to call
+
+    Returns:
+        Whatever ``func`` returns (its exceptions are raised here)
+    """
+    return SingleThreadASGIHandler.executor.submit(func, *args, **kwargs).result()
+
+
+django.setup(set_prefix=False)
+application = SingleThreadASGIHandler()
@@ -0,0 +1,153 @@
+"""
+Cached resolution of the authenticated user.
+
+``AuthenticationMiddleware`` loads the user row on every request. Here the
+session's user ID is resolved to a compact record instead, read from a small
+in-process LRU and then from Redis (``USER_CACHE_ALIAS``) before falling back
+to the database. The record holds the user's identity fields and the session
+auth hash (the HMAC of the password hash), so the session is verified exactly
+as ``django.contrib.auth.get_user`` does without loading the password.
+``request.user`` is rebuilt from the record as a ``User`` instance whose other
+fields (the password, for one) are deferred and load on first access.
+
+Saving or deleting a user invalidates both layers in this process and the
+Redis entry (see ``Users.signals``), the latter even while the Redis circuit
+is open (see ``Habit_Tracker.circuit_breaker.invalidate``). Other processes may keep their in-process entry for up to
+``USER_CACHE_LOCAL_TTL`` seconds, which bounds how long a session signed with
+a changed password can still be accepted by them.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import constant_time_compare
+
+from Habit_Tracker import circuit_breaker
+
+# Identity fields kept in the record; the remaining User fields are deferred
+RECORD_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email',
+    'is_active', 'is_staff', 'is_superuser', 'date_joined', 'last_login',
+)
+# The only backend whose users the record can stand in for
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+LOCAL_MAX_ENTRIES = 1024
+
+_lock = threading.Lock()
+# user ID -> (monotonic expiry, record)
+_local = OrderedDict()
+
+
+def cache_key(user_id):
+    """Return the Redis key of a user's record."""
+    return f'auth:user:{user_id}'
+
+
+def load_record(user_id):
+    """
+    Read a user's record from the database.
+
+    Returns:
+        dict or None: The record, or None if the user does not exist
+    """
+    try:
+        user = User._default_manager.get(pk=user_id)
+    except User.DoesNotExist:
+        return None
+    record = {name: getattr(user, name) for name in RECORD_FIELDS}
+    record['session_auth_hash'] = user.get_session_auth_hash()
+    return record
+
+
+def get_record(user_id):
+    """
+    Return a user's record from the in-process layer, Redis or the database.
+
+    Returns:
+        dict or None: The record, or None if the user does not exist
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _local.get(user_id)
+        if entry is not None and entry[0] > now:
+            _local.move_to_end(user_id)
+            return entry[1]
+
+    cache = caches[settings.USER_CACHE_ALIAS]
+    record = cache.get(cache_key(user_id))
+    if record is None:
+        record = load_record(user_id)
+        if record is None:
+            return None
+        cache.set(cache_key(user_id), record, settings.USER_CACHE_TTL)
+
+    if settings.USER_CACHE_LOCAL_TTL > 0:
+        with _lock:
+            _local[user_id] = (now + settings.USER_CACHE_LOCAL_TTL, record)
+            _local.move_to_end(user_id)
+            while len(_local) > LOCAL_MAX_ENTRIES:
+                _local.popitem(last=False)
+    return record
+
+
+def build_user(record):
+    """Build a ``User`` from a record, deferring the fields it does not hold."""
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in record]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [record[name] for name in names])
+
+
+def invalidate(user_id):
+    """Drop a user's record from this process and from Redis."""
+    with _lock:
+        _local.pop(user_id, None)
+    circuit_breaker.invalidate(caches[settings.USER_CACHE_ALIAS], [cache_key(user_id)])
+
+
+def clear_local():
+    """Empty the in-process layer (used by tests)."""
+    with _lock:
+        _local.clear()
+
+
+def get_user(request):
+    """
+    Return the user of the request's session, like ``django.contrib.auth.get_user``.
+
+    Returns:
+        User or AnonymousUser: The session's user, or AnonymousUser if the
+        session has none, the user no longer exists or is inactive, or the
+        session was signed with another password (the session is then flushed)
+    """
+    try:
+        user_id = auth._get_user_session_key(request)
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path != MODEL_BACKEND:
+        return auth.get_user(request)
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    record = get_record(user_id)
+    if record is None or not record['is_active']:
+        return AnonymousUser()
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(session_hash, record['session_auth_hash'])):
+        request.session.flush()
+        return AnonymousUser()
+
+    user = build_user(record)
+    user.backend = backend_path
+    return user
+
+
+def get_cached_user(request):
+    """Resolve the request's user once per request."""
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
@@ -1,28 +1,66 @@
 """
 AWS configuration helper for reading from Secrets Manager and SSM Parameter Store.
+
+Clients are created on first use, each from its own boto3 session, so nothing
+is paid at import time and the Secrets Manager and SSM clients can be built
+concurrently. ``load_aws_config`` fetches the database secret and all SSM
+parameters (one batched ``GetParameters`` call) in parallel.
 """
 import os
 import json
-import boto3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from botocore.exceptions import ClientError
 
-# Initialize AWS clients
-secrets_client = boto3.client('secretsmanager', region_name=os.environ.get('AWS_REGION', 'us-east-1'))
-ssm_client = boto3.client('ssm', region_name=os.environ.get('AWS_REGION', 'us-east-1'))
+# GetParameters accepts at most 10 names per call
+SSM_BATCH_SIZE = 10
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(service):
+    """
+    Return the cached client for an AWS service, creating it on first use.
+
+    A boto3 session is not thread-safe, so every client gets its own session
+    instead of sharing the default one.
+    """
+    client = _clients.get(service)
+    if client is None:
+        import boto3
+
+        client = boto3.session.Session().client(
+            service, region_name=os.environ.get('AWS_REGION', 'us-east-1'))
+        with _clients_lock:
+            client = _clients.setdefault(service, client)
+    return client
+
+
+def get_secrets_client():
+    """Return the Secrets Manager client."""
+    return _get_client('secretsmanager')
+
+
+def get_ssm_client():
+    """Return the SSM client."""
+    return _get_client('ssm')
 
 
 def get_secret(secret_name):
     """
     Retrieve a secret from AWS Secrets Manager.
-    
+
     Args:
         secret_name: Name or ARN of the secret
-        
+
     Returns:
         dict: Secret value as dictionary, or None if not found
     """
     try:
-        response = secrets_client.get_secret_value(SecretId=secret_name)
+        response = get_secrets_client().get_secret_value(SecretId=secret_name)
         secret_string = response['SecretString']
         return json.loads(secret_string)
     except ClientError as e:
@@ -36,17 +74,17 @@ def get_secret(secret_name):
 def get_parameter(parameter_name, decrypt=False, required=False):
     """
     Retrieve a parameter from AWS SSM Parameter Store.
-    
+
     Args:
         parameter_name: Name of the parameter
         decrypt: Whether to decrypt SecureString parameters
         required: If True, log error; if False, silently return None
-        
+
     Returns:
         str: Parameter value, or None if not found
     """
     try:
-        response = ssm_client.get_parameter(
+        response = get_ssm_client().get_parameter(
             Name=parameter_name,
             WithDecryption=decrypt
         )
@@ -63,47 +101,110 @@ def get_parameter(parameter_name, decrypt=False, required=False):
             return None
 
 
+def get_parameters(parameter_names, decrypt=False):
+    """
+    Retrieve several parameters from AWS SSM Parameter Store in batched calls.
+
+    Args:
+        parameter_names: Names of the parameters
+        decrypt: Whether to decrypt SecureString parameters (plain String
+            parameters are returned unchanged either way)
+
+    Returns:
+        dict: Values by parameter name; missing parameters are left out
+    """
+    names = list(dict.fromkeys(parameter_names))
+    values = {}
+    for start in range(0, len(names), SSM_BATCH_SIZE):
+        batch = names[start:start + SSM_BATCH_SIZE]
+        try:
+            response = get_ssm_client().get_parameters(Names=batch, WithDecryption=decrypt)
+        except ClientError as e:
+            print(f"Error retrieving parameters {', '.join(batch)}: {e}")
+            continue
+        for parameter in response.get('Parameters', []):
+            values[parameter['Name']] = parameter['Value']
+    return values
+
+
+def _timed(timings, name, func, *args, **kwargs):
+    """Call ``func`` and record its duration in milliseconds under ``name``."""
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def _fetch_secret(timings, secret_name):
+    _timed(timings, 'secrets_client', get_secrets_client)
+    return _timed(timings, 'secret', get_secret, secret_name)
+
+
+def _fetch_parameters(timings, parameter_names):
+    _timed(timings, 'ssm_client', get_ssm_client)
+    return _timed(timings, 'parameters', get_parameters, parameter_names, decrypt=True)
+
+
 def load_aws_config():
     """
     Load configuration from AWS Secrets Manager and SSM Parameter Store.
     Sets environment variables that Django settings can read.
-    
+
     Expected environment variables:
     - AWS_SECRET_NAME: Name/ARN of Secrets Manager secret containing DB credentials
     - AWS_SSM_PREFIX: Prefix for SSM parameters (e.g., /project/env/)
+
+    Returns:
+        dict: Milliseconds spent creating each client, fetching the secret,
+        fetching the parameters and in total
     """
     project_name = os.environ.get('PROJECT_NAME', 'habit-tracker')
     environment = os.environ.get('ENVIRONMENT', 'staging')
-    
-    # Load database credentials from Secrets Manager
+
+    # Database credentials from Secrets Manager
     # Support both ARN and name formats
     secret_name = os.environ.get('AWS_SECRET_NAME') or os.environ.get('AURORA_SECRET_ARN', f'{project_name}/{environment}/aurora/master')
-    secret = get_secret(secret_name)
-    
+
+    # Other configuration from SSM Parameter Store
+    ssm_prefix = os.environ.get('AWS_SSM_PREFIX', f'/{project_name}/{environment}')
+    # Aurora/Redis endpoints - use specific parameter names from environment or fallback to SSM prefix
+    writer_param = os.environ.get('AURORA_WRITER_ENDPOINT_PARAM', f'{ssm_prefix}/aurora/writer_endpoint')
+    reader_param = f'{ssm_prefix}/aurora/reader_endpoint'
+    redis_param = os.environ.get('REDIS_ENDPOINT_PARAM', f'{ssm_prefix}/redis/endpoint')
+    # Django settings (optional - will use defaults if not found)
+    django_params = {
+        name: f'{ssm_prefix}/django/{name}'
+        for name in ('secret_key', 'debug', 'allowed_hosts', 'csrf_trusted_origins')
+    }
+
+    # The secret and the parameters do not depend on each other: fetch them concurrently
+    timings = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        secret_future = executor.submit(_fetch_secret, timings, secret_name)
+        parameters_future = executor.submit(
+            _fetch_parameters, timings, [writer_param, reader_param, redis_param, *django_params.values()])
+        secret = secret_future.result()
+        parameters = parameters_future.result()
+    timings['total'] = round((time.perf_counter() - start) * 1000, 1)
+
     if secret:
         os.environ.setdefault('DB_NAME', secret.get('dbname', 'habittracker'))
         os.environ.setdefault('DB_USER', secret.get('username', 'dbadmin'))
         os.environ.setdefault('DB_PASSWORD', secret.get('password', ''))
         os.environ.setdefault('DB_HOST', secret.get('host', ''))
         os.environ.setdefault('DB_PORT', str(secret.get('port', 5432)))
-    
-    # Load other configuration from SSM Parameter Store
-    ssm_prefix = os.environ.get('AWS_SSM_PREFIX', f'/{project_name}/{environment}')
-    
-    # Aurora endpoints - use specific parameter names from environment or fallback to SSM prefix
-    writer_param = os.environ.get('AURORA_WRITER_ENDPOINT_PARAM', f'{ssm_prefix}/aurora/writer_endpoint')
-    writer_endpoint = get_parameter(writer_param)
+
+    writer_endpoint = parameters.get(writer_param)
     if writer_endpoint:
         os.environ['DB_HOST'] = writer_endpoint
-    
-    reader_param = f'{ssm_prefix}/aurora/reader_endpoint'
-    reader_endpoint = get_parameter(reader_param)
+
+    reader_endpoint = parameters.get(reader_param)
     if reader_endpoint:
         os.environ.setdefault('DB_READER_HOST', reader_endpoint)
-    
-    # Redis endpoint - use specific parameter name from environment or fallback to SSM prefix
-    redis_param = os.environ.get('REDIS_ENDPOINT_PARAM', f'{ssm_prefix}/redis/endpoint')
-    redis_endpoint = get_parameter(redis_param)
+
+    redis_endpoint = parameters.get(redis_param)
     if redis_endpoint:
         # Redis endpoint format: host:port or just host
         if ':' in redis_endpoint:
@@ -113,17 +214,16 @@ def load_aws_config():
         else:
             os.environ['REDIS_HOST'] = redis_endpoint
             os.environ.setdefault('REDIS_PORT', '6379')
-    
-    # Django settings (optional - will use defaults if not found)
-    django_secret_key = get_parameter(f'{ssm_prefix}/django/secret_key', decrypt=True, required=False)
+
+    django_secret_key = parameters.get(django_params['secret_key'])
     if django_secret_key:
         os.environ.setdefault('SECRET_KEY', django_secret_key)
-    
-    django_debug = get_parameter(f'{ssm_prefix}/django/debug', required=False)
+
+    django_debug = parameters.get(django_params['debug'])
     if django_debug:
         os.environ.setdefault('DEBUG', django_debug)
-    
-    allowed_hosts = get_parameter(f'{ssm_prefix}/django/allowed_hosts', required=False)
+
+    allowed_hosts = parameters.get(django_params['allowed_hosts'])
     if allowed_hosts:
         os.environ['ALLOWED_HOSTS'] = allowed_hosts
     else:
@@ -131,7 +231,8 @@ def load_aws_config():
         # In production, set this via SSM Parameter Store with specific domains
         os.environ.setdefault('ALLOWED_HOSTS', '*')
 
-    csrf_trusted_origins = get_parameter(f'{ssm_prefix}/django/csrf_trusted_origins', required=False)
+    csrf_trusted_origins = parameters.get(django_params['csrf_trusted_origins'])
     if csrf_trusted_origins:
         os.environ['CSRF_TRUSTED_ORIGINS'] = csrf_trusted_origins
 
+    return timings
@@ -0,0 +1,72 @@
+"""
+Cache helpers shared by the apps.
+
+Gives direct access to the Redis client behind the Django cache, for data
+structures the cache API does not expose (e.g. sorted sets), and provides the
+compressor of the Redis cache.
+
+Production Redis is ElastiCache Serverless, whose endpoint is a cluster: a
+command naming several keys (MGET, a multi-key DEL, MULTI/EXEC) fails with
+CROSSSLOT unless all its keys share a hash tag, as the ``{streaks}`` keys of
+``habit.streak_index`` do. Delete unrelated keys one command each in a
+pipeline instead.
+"""
+from django.core.cache import caches
+from django_redis.compressors.zlib import ZlibCompressor
+
+
+class ThresholdZlibCompressor(ZlibCompressor):
+    """
+    zlib compressor for django-redis that leaves small values uncompressed.
+
+    Only values of at least ``COMPRESS_MIN_SIZE`` bytes (cache OPTIONS,
+    default 1024) are compressed, so large snapshots shrink in Redis and on
+    the wire while small keys skip the CPU cost. django-redis reads values
+    that fail to decompress as uncompressed, so both kinds can be mixed.
+    ``COMPRESS_LEVEL`` sets the zlib level (default 6).
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        # ZlibCompressor compresses values longer than min_length
+        self.min_length = int(options.get('COMPRESS_MIN_SIZE', 1024)) - 1
+        self.preset = int(options.get('COMPRESS_LEVEL', self.preset))
+
+
+def get_redis_client(alias='default', write=True):
+    """
+    Return the redis-py client behind a cache alias.
+
+    Args:
+        alias: Name of the cache in settings.CACHES
+        write: Return a client for the primary (write) server rather than a replica
+
+    Returns:
+        redis.Redis: A client for the cache's server, or None if the cache is
+        not Redis-backed (e.g. LocMemCache in development) or its circuit
+        breaker is open, so callers fail fast to their fallback.
+    """
+    if circuit_open(alias):
+        return None
+    backend = caches[alias]
+    # django.core.cache.backends.redis.RedisCache
+    client = getattr(backend, '_cache', None)
+    if hasattr(client, 'get_client'):
+        return client.get_client(write=write)
+    # django_redis.cache.RedisCache
+    client = getattr(backend, 'client', None)
+    if hasattr(client, 'get_client'):
+        return client.get_client(write=write)
+    return None
+
+
+def circuit_open(alias='default'):
+    """Return True if the cache's circuit breaker is open (see Habit_Tracker.circuit_breaker)."""
+    backend = caches[alias]
+    return hasattr(backend, 'circuit_open') and backend.circuit_open()
+
+
+def make_key(key, alias='default'):
+    """Apply the cache's KEY_PREFIX and VERSION to a raw Redis key."""
+    return caches[alias].make_key(key)
+
@@ -0,0 +1,474 @@
+"""
+Circuit breaker around the Redis cache.
+
+Without it, every cache call made while Redis is down or overloaded waits for
+the socket timeouts before failing, on every request. ``CircuitBreakerRedisCache``
+counts consecutive failed calls (connection errors and timeouts) and slow ones
+(``BREAKER_SLOW_CALL_SECONDS`` and up) as failures. After
+``BREAKER_FAILURE_THRESHOLD`` of them the circuit opens: calls skip Redis and
+are answered by an in-process LocMemCache. After ``BREAKER_RESET_TIMEOUT``
+seconds the next call first pings Redis as a probe (half-open); if Redis
+answers in time the circuit closes, otherwise it stays open for another period.
+
+Keys written or deleted while the circuit was open are deleted from Redis
+before it closes, so values changed in the meantime (sessions, generation
+counters) are never read back stale from Redis, and the in-process copies are
+dropped. Sessions use the ``cached_db`` engine, so a session missing from the
+fallback is read from the database.
+
+Those purges only happen in the container whose circuit closes, and a circuit
+also opens on one container's slow calls while Redis serves the others. So
+invalidations (``invalidate``: the auth records, the tiered cache generations,
+deleted sessions) are not answered in-process: they are sent to Redis even
+while the circuit is open. A key Redis could not delete is recorded in the
+database (``habit.models.CacheInvalidation``) and deleted by
+``replay_invalidations`` once Redis answers; if it cannot be recorded either,
+the invalidation raises.
+
+The breaker state is shared by every thread of the process (Django creates a
+cache backend per thread), per Redis location.
+"""
+import logging
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django_redis.cache import RedisCache
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+from Habit_Tracker.db_router import WRITER_ALIAS
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean Redis is unreachable or unresponsive (as opposed to a bad command)
+REDIS_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Keys remembered while open; beyond this, later writes may be read back stale after recovery
+MAX_DIRTY_KEYS = 10000
+
+_lock = threading.Lock()
+_counters = {
+    'calls': 0,
+    'failures': 0,
+    'slow_calls': 0,
+    'fallbacks': 0,
+    'trips': 0,
+    'recoveries': 0,
+    'recorded_invalidations': 0,
+}
+# Redis location -> CircuitBreaker
+_breakers = {}
+
+
+def _increment(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_stats():
+    """
+    Return a snapshot of the circuit breaker counters.
+
+    Returns:
+        dict: calls (calls sent to Redis), failures and slow_calls (those that
+        failed or were slow), fallbacks (calls answered in-process), trips and
+        recoveries (circuits opened and closed), recorded_invalidations (keys
+        recorded for replay because Redis could not delete them),
+        open_circuits (circuits not closed right now) and fallback_ratio
+        (fallbacks over all calls, None before the first call)
+    """
+    with _lock:
+        stats = dict(_counters)
+        stats['open_circuits'] = sum(breaker.state != CLOSED for breaker in _breakers.values())
+    total = stats['calls'] + stats['fallbacks']
+    stats['fallback_ratio'] = stats['fallbacks'] / total if total else None
+    return stats
+
+
+def reset_stats():
+    """Zero the counters (used by tests and benchmarks)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
+
+
+def reset_breakers():
+    """Close every circuit (used by tests)."""
+    with _lock:
+        breakers = list(_breakers.values())
+    for breaker in breakers:
+        breaker.reset()
+
+
+def get_breaker(location, options):
+    """
+    Return the process-wide breaker of a Redis location, creating it on first use.
+
+    Args:
+        location (str): The cache's LOCATION
+        options (dict): The cache's OPTIONS, read for the BREAKER_* settings
+    """
+    with _lock:
+        breaker = _breakers.get(location)
+        if breaker is None:
+            breaker = _breakers[location] = CircuitBreaker(
+                failure_threshold=int(options.get('BREAKER_FAILURE_THRESHOLD', 5)),
+                slow_call_seconds=float(options.get('BREAKER_SLOW_CALL_SECONDS', 0.25)),
+                reset_timeout=float(options.get('BREAKER_RESET_TIMEOUT', 5)),
+            )
+        return breaker
+
+
+def delete_keys(client, keys):
+    """
+    Delete Redis keys with one DEL each, sent in a single pipeline.
+
+    The keys belong to unrelated hash slots, and a multi-key DEL fails with
+    CROSSSLOT on the cluster endpoint (see ``Habit_Tracker.cache``).
+
+    Args:
+        client (redis.Redis): The client to send the deletes with
+        keys: The full Redis keys
+    """
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.delete(key)
+    pipe.execute()
+
+
+def circuit_open(cache):
+    """Return True if a cache backend answers from process memory right now."""
+    return isinstance(cache, CircuitBreakerRedisCache) and cache.circuit_open()
+
+
+def invalidate(cache, keys, version=None):
+    """
+    Delete keys from a cache so that no container reads them back.
+
+    Unlike ``delete_many``, a ``CircuitBreakerRedisCache`` sends the delete to
+    Redis even while its circuit is open (see ``CircuitBreakerRedisCache.invalidate_many``).
+
+    Args:
+        cache: The cache backend
+        keys (list): The keys, as passed to the cache
+        version (int): The keys' version (defaults to the cache's)
+    """
+    if isinstance(cache, CircuitBreakerRedisCache):
+        cache.invalidate_many(keys, version=version)
+    else:
+        cache.delete_many(keys, version=version)
+
+
+def record_invalidations(location, keys):
+    """
+    Record Redis keys that could not be deleted, for ``replay_invalidations``.
+
+    Args:
+        location (str): The LOCATION of the Redis cache
+        keys (list): The full Redis keys
+
+    Raises:
+        DatabaseError: The keys could not be recorded either
+    """
+    from habit.models import CacheInvalidation
+
+    CacheInvalidation.objects.using(WRITER_ALIAS).bulk_create(
+        [CacheInvalidation(location=location, key=key) for key in keys])
+    with _lock:
+        _counters['recorded_invalidations'] += len(keys)
+    logger.warning("Recorded %s cache invalidations that could not reach Redis", len(keys))
+
+
+def replay_invalidations(cache, batch_size=1000):
+    """
+    Delete from Redis the keys recorded while it could not delete them.
+
+    Deleting a cache key only causes a miss, so a key is safe to delete again
+    even if it was written since. A row is removed once its key is deleted.
+
+    Args:
+        cache (CircuitBreakerRedisCache): The cache whose keys are replayed
+        batch_size (int): Keys deleted per round trip
+
+    Returns:
+        int: The number of recorded keys deleted
+
+    Raises:
+        redis.exceptions.RedisError: Redis could not delete them (the rows are kept)
+    """
+    from habit.models import CacheInvalidation
+
+    client = cache.client.get_client(write=True)
+    pending = CacheInvalidation.objects.using(WRITER_ALIAS).filter(location=cache.location).order_by('id')
+    replayed = 0
+    while True:
+        rows = list(pending.values_list('id', 'key')[:batch_size])
+        if not rows:
+            return replayed
+        delete_keys(client, {key for _, key in rows})
+        CacheInvalidation.objects.using(WRITER_ALIAS).filter(pk__in=[pk for pk, _ in rows]).delete()
+        replayed += len(rows)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open state machine guarding one dependency.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit
+        slow_call_seconds (float): Calls lasting this long count as failures
+        reset_timeout (float): Seconds the circuit stays open before a probe
+    """
+
+    def __init__(self, failure_threshold=5, slow_call_seconds=0.25, reset_timeout=5):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Close the circuit and forget the failures and changed keys."""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.dirty_keys = set()
+
+    def allow(self):
+        """
+        Return whether a call may go to the dependency.
+
+        While open, the first call after the reset timeout is let through as
+        the probe and the circuit turns half-open; other calls are refused
+        until the probe completes.
+
+        Returns:
+            str: CLOSED for a normal call, HALF_OPEN if the caller is the
+            probe, or None if the call must not go to the dependency
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return CLOSED
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                return HALF_OPEN
+            return None
+
+    def changed_keys(self):
+        """Return a copy of the keys changed while the circuit was not closed."""
+        with self._lock:
+            return set(self.dirty_keys)
+
+    def record_success(self, duration, probe=False):
+        """
+        Record a completed call.
+
+        Args:
+            duration (float): Seconds the call took; slow calls count as failures
+            probe (bool): The call was the half-open probe
+
+        Returns:
+            set: If the probe closed the circuit, the keys changed while it
+            was not closed; otherwise None
+        """
+        if duration >= self.slow_call_seconds:
+            _increment('slow_calls')
+            self.record_failure()
+            return None
+        with self._lock:
+            if self.state == CLOSED:
+                self.failures = 0
+                return None
+            if not probe or self.state != HALF_OPEN:
+                # A call that started before the circuit opened
+                return None
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            dirty, self.dirty_keys = self.dirty_keys, set()
+        _increment('recoveries')
+        logger.info("Redis circuit closed")
+        return dirty
+
+    def record_failure(self):
+        """Record a failed call, opening the circuit at the threshold or after a failed probe."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                tripped = self.state == CLOSED
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            else:
+                return
+        if tripped:
+            _increment('trips')
+            logger.warning("Redis circuit opened after %s failed or slow calls", self.failures)
+
+    def mark_dirty(self, keys):
+        """Remember keys changed while the circuit is not closed."""
+        with self._lock:
+            if len(self.dirty_keys) < MAX_DIRTY_KEYS:
+                self.dirty_keys.update(keys)
+
+
+class CircuitBreakerRedisCache(RedisCache):
+    """
+    django-redis cache backend that fails fast to an in-process cache while Redis is unavailable.
+
+    Besides the django-redis OPTIONS, reads BREAKER_FAILURE_THRESHOLD (default
+    5), BREAKER_SLOW_CALL_SECONDS (0.25), BREAKER_RESET_TIMEOUT (5) and
+    BREAKER_FALLBACK_MAX_ENTRIES (1000, the size of the in-process cache).
+    """
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        options = params.get('OPTIONS', {})
+        self.location = server
+        self.breaker = get_breaker(server, options)
+        # LocMemCache instances of the same name share their storage across threads
+        self.fallback = LocMemCache(f'circuit-breaker:{server}', {
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            'OPTIONS': {'MAX_ENTRIES': int(options.get('BREAKER_FALLBACK_MAX_ENTRIES', 1000))},
+        })
+
+    def circuit_open(self):
+        """Return True if calls are currently answered in-process."""
+        return self.breaker.state != CLOSED
+
+    def _call(self, method, args, keys=(), version=None, fallback=None):
+        allowed = self.breaker.allow()
+        if allowed == HALF_OPEN:
+            allowed = self._probe()
+        if allowed:
+            start = time.monotonic()
+            try:
+                result = getattr(super(), method)(*args)
+            except REDIS_ERRORS:
+                self._record_failure(method)
+            except Exception:
+                # Redis answered, with an error reply
+                _increment('calls')
+                self.breaker.record_success(time.monotonic() - start)
+                raise
+            else:
+                _increment('calls')
+                self.breaker.record_success(time.monotonic() - start)
+                return result
+        else:
+            _increment('fallbacks')
+        self.breaker.mark_dirty(self.make_key(key, version=version) for key in keys)
+        return (fallback or getattr(self.fallback, method))(*args)
+
+    def _record_failure(self, command):
+        _increment('calls')
+        _increment('failures')
+        self.breaker.record_failure()
+        logger.warning("Redis %s failed, using the in-process cache", command, exc_info=True)
+
+    def _probe(self):
+        """
+        Ping Redis as the half-open probe and close the circuit if it answers in time.
+
+        Keys changed while the circuit was open are deleted from Redis before
+        it closes, so no call reads their old values back, and the in-process
+        copies are dropped so a later outage does not serve them either.
+        """
+        start = time.monotonic()
+        try:
+            client = self.client.get_client(write=True)
+            client.ping()
+            purged = self.breaker.changed_keys()
+            if purged:
+                delete_keys(client, purged)
+        except REDIS_ERRORS:
+            self._record_failure('probe')
+            return False
+        _increment('calls')
+        dirty = self.breaker.record_success(time.monotonic() - start, probe=True)
+        if dirty is None:
+            return False
+        self.fallback.clear()
+        late = dirty - purged
+        if late:
+            # Changed by other threads while the probe ran
+            try:
+                delete_keys(client, late)
+            except REDIS_ERRORS:
+                logger.warning("Could not purge %s keys changed while the Redis circuit was open",
+                               len(late), exc_info=True)
+        return True
+
+    def get(self, key, default=None, version=None):
+        return self._call('get', (key, default, version))
+
+    def get_many(self, keys, version=None):
+        return self._call('get_many', (keys, version))
+
+    def has_key(self, key, version=None):
+        return self._call('has_key', (key, version))
+
+    def ttl(self, key, version=None):
+        # The in-process cache does not expose expiries
+        return self._call('ttl', (key, version), fallback=lambda key, version: None)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('add', (key, value, timeout, version), [key], version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('set', (key, value, timeout, version), [key], version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('touch', (key, timeout, version), [key], version)
+
+    def delete(self, key, version=None):
+        return self._call('delete', (key, version), [key], version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('set_many', (data, timeout, version), list(data), version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        return self._call('delete_many', (keys, version), keys, version)
+
+    def incr(self, key, delta=1, version=None):
+        return self._call('incr', (key, delta, version), [key], version)
+
+    def decr(self, key, delta=1, version=None):
+        return self._call('decr', (key, delta, version), [key], version)
+
+    def invalidate_many(self, keys, version=None):
+        """
+        Delete keys from Redis and from the in-process cache, even while the circuit is open.
+
+        The delete is not answered in-process: the circuit may be open for this
+        container only, and other containers would keep reading the keys from
+        Redis. If Redis cannot be reached, the keys are recorded in the
+        database for ``replay_invalidations``.
+
+        Raises:
+            DatabaseError: Redis could not be reached and the keys could not
+                be recorded
+        """
+        keys = list(keys)
+        redis_keys = [self.make_key(key, version=version) for key in keys]
+        self.fallback.delete_many(keys, version=version)
+        start = time.monotonic()
+        try:
+            delete_keys(self.client.get_client(write=True), redis_keys)
+        except REDIS_ERRORS:
+            self._record_failure('delete')
+            self.breaker.mark_dirty(redis_keys)
+            record_invalidations(self.location, redis_keys)
+        else:
+            _increment('calls')
+            self.breaker.record_success(time.monotonic() - start)
+
+    def clear(self):
+        # Keys written to Redis before or during an outage are not tracked here
+        return self._call('clear', ())
@@ -0,0 +1,101 @@
+"""
+Database connection lifecycle for warm Lambda invocations.
+
+Django keeps connections open between requests when ``CONN_MAX_AGE`` is set and,
+with ``CONN_HEALTH_CHECKS``, pings a reused connection once before its first query
+of a request. Connections belong to the thread that opened them, so in Lambda
+every request runs its synchronous code on the same thread
+(``Habit_Tracker.asgi_lambda``). This module adds what Lambda needs on top of that:
+
+- Connections idle for longer than ``DATABASE_CONN_MAX_IDLE`` seconds are closed
+  before the next request uses them. A frozen execution environment can sit idle
+  for minutes, and Aurora or the network may have dropped the socket meanwhile.
+- Counters of new connections, reused connections and recycled connections, so
+  reuse rates can be checked under load (logged per invocation by lambda_handler).
+
+Idle time is measured with the wall clock: the monotonic clock Django uses for
+``CONN_MAX_AGE`` may not advance while the Lambda sandbox is frozen.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+_counters = {
+    'connects': 0,
+    'reuses': 0,
+    'idle_recycles': 0,
+}
+# Wall-clock time each alias last finished serving a request
+_last_used = {}
+
+
+def _increment(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_stats():
+    """
+    Return a snapshot of the connection counters.
+
+    Returns:
+        dict: connects, reuses, idle_recycles and reuse_ratio (reuses over
+        requests that needed a connection, None before the first one)
+    """
+    with _lock:
+        stats = dict(_counters)
+    total = stats['connects'] + stats['reuses']
+    stats['reuse_ratio'] = stats['reuses'] / total if total else None
+    return stats
+
+
+def reset_stats():
+    """Zero the counters (used by tests and benchmarks)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
+        _last_used.clear()
+
+
+@receiver(connection_created)
+def count_connect(sender, connection, **kwargs):
+    """Count every new database connection."""
+    _increment('connects')
+
+
+def prepare_connections(now=None):
+    """
+    Recycle idle connections and count the ones about to be reused.
+
+    Args:
+        now: Current wall-clock time (defaults to time.time())
+    """
+    now = time.time() if now is None else now
+    max_idle = getattr(settings, 'DATABASE_CONN_MAX_IDLE', None)
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is None:
+            continue
+        last_used = _last_used.get(conn.alias)
+        if max_idle is not None and last_used is not None and now - last_used > max_idle:
+            conn.close()
+            _increment('idle_recycles')
+        else:
+            _increment('reuses')
+
+
+def release_connections(now=None):
+    """
+    Record when each open connection finished serving a request.
+
+    Args:
+        now: Current wall-clock time (defaults to time.time())
+    """
+    now = time.time() if now is None else now
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None:
+            _last_used[conn.alias] = now
@@ -0,0 +1,132 @@
+"""
+Database router sending analytics reads to the Aurora reader endpoint.
+
+The ``default`` alias is the writer and ``reader`` the read replica. Reads of
+models in ``DATABASE_READER_APPS`` go to the reader unless the current request
+is pinned to the writer: ``ReplicaPinningMiddleware`` pins requests with an
+unsafe method from the start, so they never update rows read from the replica,
+and the router pins any request once it writes to one of those models
+(read-your-writes). The middleware also keeps a client pinned for
+``DATABASE_REPLICA_LAG`` seconds after a request that wrote, so the next
+requests do not read data the replica has not replayed yet. Results cached
+beyond the request are computed inside ``read_from_writer``.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+
+WRITER_ALIAS = 'default'
+READER_ALIAS = 'reader'
+
+
+class _RoutingState:
+    """Per-request routing flags."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+def start_request(pinned=False):
+    """
+    Reset the routing state at the start of a request.
+
+    Args:
+        pinned: Read from the writer from the start (e.g. the client wrote recently)
+
+    Returns:
+        contextvars.Token: Token to pass to ``end_request``
+    """
+    return _state.set(_RoutingState(pinned))
+
+
+def end_request(token):
+    """Restore the routing state that was active before ``start_request``."""
+    _state.reset(token)
+
+
+def is_pinned():
+    """Return True if reads in the current context must go to the writer."""
+    state = _state.get()
+    return state is not None and state.pinned
+
+
+def wrote():
+    """Return True if the current request wrote to a replicated model."""
+    state = _state.get()
+    return state is not None and state.wrote
+
+
+def pin_to_writer():
+    """Send the rest of the current request's reads to the writer."""
+    state = _state.get()
+    if state is None:
+        state = _RoutingState()
+        _state.set(state)
+    state.pinned = True
+
+
+@contextmanager
+def read_from_writer():
+    """
+    Send the reads made inside the block to the writer, without pinning the rest of the request.
+
+    Used for results that outlive the request (cached payloads), which must
+    not be computed from a lagging replica.
+    """
+    token = _state.set(_RoutingState(pinned=True))
+    try:
+        yield
+    finally:
+        wrote = _state.get().wrote
+        _state.reset(token)
+        if wrote:
+            pin_to_writer()
+            _state.get().wrote = True
+
+
+def replica_enabled():
+    """Return True if a reader alias is configured."""
+    return READER_ALIAS in settings.DATABASES
+
+
+def is_replicated(model):
+    """Return True if reads of ``model`` may be served by the reader."""
+    return model._meta.app_label in getattr(settings, 'DATABASE_READER_APPS', ())
+
+
+class ReadReplicaRouter:
+    """
+    Route analytics reads to the reader and everything else to the writer.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_enabled() or not is_replicated(model):
+            return None
+        # Related lookups stay on the database the instance was loaded from
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return WRITER_ALIAS if is_pinned() else READER_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if replica_enabled() and is_replicated(model):
+            pin_to_writer()
+            _state.get().wrote = True
+        return WRITER_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        if {obj1._state.db, obj2._state.db} <= {WRITER_ALIAS, READER_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The reader replicates the writer's schema
+        if db == READER_ALIAS:
+            return False
+        return None
@@ -0,0 +1,144 @@
+"""
+Load shedding driven by the database's recent latency.
+
+While Aurora Serverless scales up, queries slow down, requests take longer
+and invocations pile up until API Gateway times out. Every query run inside
+``observe_queries`` feeds an exponentially weighted moving average of query
+latency, kept per process (one per Lambda container). Once it reaches
+``LOAD_SHED_DB_LATENCY_MS``, ``LoadSheddingMiddleware`` answers low-priority
+requests (``LOAD_SHED_PATHS``, e.g. the analysis) with a 503 and a
+``Retry-After`` header before they touch the database or Redis. Everything
+else, task completion and authentication included, is still served. Shedding
+stops once the average is back under ``LOAD_SHED_RECOVER_LATENCY_MS``.
+
+The average is forgotten after ``LOAD_SHED_STALE_SECONDS`` without queries, so
+a container that only saw shed requests lets the next one through to measure
+the database again. Times are taken from the wall clock, which keeps
+advancing while a Lambda sandbox is frozen.
+"""
+import contextlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counters = {
+    'queries': 0,
+    'shed': 0,
+    'admitted': 0,
+    'overloads': 0,
+}
+# Moving average of query latency (ms), wall-clock time of the last sample,
+# and whether low-priority requests are being shed
+_state = {
+    'latency_ms': None,
+    'updated_at': None,
+    'shedding': False,
+}
+
+
+def _increment(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_stats():
+    """
+    Return a snapshot of the load shedding counters and state.
+
+    Returns:
+        dict: queries (queries measured), shed and admitted (low-priority
+        requests rejected and served), overloads (times shedding started),
+        db_latency_ms (the current average, None without recent queries),
+        shedding, and shed_ratio (shed over low-priority requests, None
+        before the first one)
+    """
+    with _lock:
+        stats = dict(_counters)
+        stats['db_latency_ms'] = _state['latency_ms']
+        stats['shedding'] = _state['shedding']
+    total = stats['shed'] + stats['admitted']
+    stats['shed_ratio'] = stats['shed'] / total if total else None
+    return stats
+
+
+def reset_stats():
+    """Zero the counters and forget the latency average (used by tests and benchmarks)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
+        _state.update(latency_ms=None, updated_at=None, shedding=False)
+
+
+def record_query(duration_ms, now=None):
+    """
+    Add a query's duration to the latency average.
+
+    Args:
+        duration_ms (float): How long the query took
+        now: Current wall-clock time (defaults to time.time())
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        _counters['queries'] += 1
+        latency = _state['latency_ms']
+        if latency is None or now - _state['updated_at'] > settings.LOAD_SHED_STALE_SECONDS:
+            _state['latency_ms'] = duration_ms
+        else:
+            _state['latency_ms'] = latency + settings.LOAD_SHED_SMOOTHING * (duration_ms - latency)
+        _state['updated_at'] = now
+
+
+def overloaded(now=None):
+    """
+    Return True if low-priority requests should be shed.
+
+    Shedding starts when the average reaches LOAD_SHED_DB_LATENCY_MS and
+    stops when it falls under LOAD_SHED_RECOVER_LATENCY_MS, or when no query
+    was measured for LOAD_SHED_STALE_SECONDS.
+
+    Args:
+        now: Current wall-clock time (defaults to time.time())
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        latency = _state['latency_ms']
+        if latency is None or now - _state['updated_at'] > settings.LOAD_SHED_STALE_SECONDS:
+            _state.update(latency_ms=None, updated_at=None, shedding=False)
+            return False
+        if _state['shedding']:
+            _state['shedding'] = latency >= settings.LOAD_SHED_RECOVER_LATENCY_MS
+            return _state['shedding']
+        if latency < settings.LOAD_SHED_DB_LATENCY_MS:
+            return False
+        _state['shedding'] = True
+        _counters['overloads'] += 1
+    logger.warning("Shedding low-priority requests: DB latency averages %.0f ms", latency)
+    return True
+
+
+def record_request(shed):
+    """Count a low-priority request as shed or admitted."""
+    _increment('shed' if shed else 'admitted')
+
+
+def _observe(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_query((time.perf_counter() - start) * 1000)
+
+
+@contextlib.contextmanager
+def observe_queries():
+    """Measure the queries this thread runs on every database alias until exit."""
+    with contextlib.ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(_observe))
+        yield
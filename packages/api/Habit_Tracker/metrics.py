@@ -0,0 +1,131 @@
+"""
+CloudWatch Embedded Metric Format (EMF) records.
+
+An EMF record is a JSON log line that CloudWatch Logs turns into metrics, so
+Lambda can publish metrics by printing to stdout without calling the
+CloudWatch API. This module does not import Django: lambda_handler uses it
+before Django is set up.
+
+Run it on a saved log stream to summarize the records locally:
+
+    python -m Habit_Tracker.metrics < lambda.log
+"""
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'HabitTracker/API')
+
+
+def emf_record(metrics, dimensions=None, properties=None, unit='Milliseconds', timestamp=None, units=None):
+    """
+    Build an EMF record.
+
+    Args:
+        metrics: Metric values by name
+        dimensions: Dimension values by name (one dimension set with all of them)
+        properties: Extra fields logged with the record but not turned into metrics
+        unit: CloudWatch unit of every metric
+        timestamp: Milliseconds since the epoch (defaults to now)
+        units: Units by metric name, overriding ``unit`` for those metrics
+
+    Returns:
+        dict: The record, ready to be serialized as one log line
+    """
+    dimensions = dimensions or {}
+    units = units or {}
+    return {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000) if timestamp is None else timestamp,
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': units.get(name, unit)} for name in metrics],
+            }],
+        },
+        **(properties or {}),
+        **dimensions,
+        **metrics,
+    }
+
+
+def emit(record, stream=None):
+    """
+    Write a record as a single JSON line.
+
+    Args:
+        record: Record built by ``emf_record``
+        stream: File to write to (defaults to stdout, which Lambda sends to CloudWatch Logs)
+    """
+    stream = stream or sys.stdout
+    stream.write(json.dumps(record, separators=(',', ':'), default=str) + '\n')
+    stream.flush()
+
+
+def parse_emf(lines):
+    """
+    Extract EMF records from log lines, checking that they are well formed.
+
+    Lines that are not JSON objects with an ``_aws`` key are skipped.
+
+    Args:
+        lines: Log lines
+
+    Returns:
+        list: The records
+
+    Raises:
+        ValueError: If a record declares a metric or dimension it does not carry
+    """
+    records = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith('{'):
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict) or '_aws' not in record:
+            continue
+        for directive in record['_aws']['CloudWatchMetrics']:
+            for name in (metric['Name'] for metric in directive['Metrics']):
+                if not isinstance(record.get(name), (int, float)):
+                    raise ValueError(f'EMF metric {name} has no numeric value')
+            for dimension in (d for dimension_set in directive['Dimensions'] for d in dimension_set):
+                if not isinstance(record.get(dimension), str):
+                    raise ValueError(f'EMF dimension {dimension} has no string value')
+        records.append(record)
+    return records
+
+
+def summarize(records):
+    """
+    Median of every metric, grouped by the record's dimension values.
+
+    Args:
+        records: Records returned by ``parse_emf``
+
+    Returns:
+        dict: ``{dimension values: {metric name: (count, median)}}``
+    """
+    values = defaultdict(lambda: defaultdict(list))
+    for record in records:
+        for directive in record['_aws']['CloudWatchMetrics']:
+            key = tuple(f'{d}={record[d]}' for dimension_set in directive['Dimensions'] for d in dimension_set)
+            for metric in directive['Metrics']:
+                values[key][metric['Name']].append(record[metric['Name']])
+    return {
+        key: {name: (len(samples), statistics.median(samples)) for name, samples in metrics.items()}
+        for key, metrics in values.items()
+    }
+
+
+if __name__ == '__main__':
+    for key, metrics in summarize(parse_emf(sys.stdin)).items():
+        print(', '.join(key) or '(no dimensions)')
+        for name, (count, median) in sorted(metrics.items()):
+            print(f'  {name:<28}{count:>6} samples  median {median:.1f}')
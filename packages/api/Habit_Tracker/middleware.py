@@ -3,10 +3,33 @@ Middleware to strip API Gateway stage prefix from request paths and handle CORS.
 
 When using API Gateway with CloudFront, the stage name (e.g., 'staging') 
 is included in the path. This middleware removes it so Django URLs work correctly.
-Also handles CORS headers for cross-origin requests with credentials.
+Also handles CORS headers for cross-origin requests with credentials,
+and compresses API responses before they are returned through Mangum.
 """
+import gzip
+import math
 import os
 import re
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from Habit_Tracker import auth_cache, db_connections, db_router, load_shedding, request_metrics, sessions
+from Habit_Tracker.metrics import emit
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
 
 
 class AllowAllHostsMiddleware:
@@ -57,42 +80,428 @@ class StripStagePrefixMiddleware:
         return response
 
 
+CORS_ALLOW_METHODS = 'GET, HEAD, OPTIONS, PUT, POST, PATCH, DELETE'
+CORS_ALLOW_HEADERS = 'Content-Type, X-CSRFToken, Authorization, Accept, Origin, X-Requested-With, Cache-Control, Pragma'
+CORS_MAX_AGE = '3600'
+
+
 class CorsMiddleware:
     """
-    Middleware to add CORS headers to responses.
+    Middleware to add CORS headers to responses and answer preflight requests.
     
     Handles CORS for cross-origin requests with credentials support.
-    Validates origin and adds appropriate CORS headers.
+    Sits at the top of the stack so an OPTIONS request from an allowed origin
+    is answered right away, without running sessions, CSRF, auth, URL
+    resolution or a view. Allowed origins are kept in a set, and each allowed
+    origin's header set is built once and reused.
     """
+
+    # Bound on the header sets cached for origins allowed by '*'
+    MAX_CACHED_ORIGINS = 256
     
     def __init__(self, get_response):
         self.get_response = get_response
         # Get allowed origins from environment variable
         # Default to allowing all origins (for development)
         allowed_origins = os.environ.get('CORS_ALLOWED_ORIGINS', '*')
-        self.allowed_origins = [origin.strip() for origin in allowed_origins.split(',')] if allowed_origins != '*' else ['*']
+        self.allow_all = allowed_origins.strip() == '*'
+        origins = () if self.allow_all else (origin.strip() for origin in allowed_origins.split(','))
+        self.allowed_origins = frozenset(origin for origin in origins if origin)
+        self.origin_headers = {origin: self.build_headers(origin) for origin in self.allowed_origins}
+
+    @staticmethod
+    def build_headers(origin):
+        """Return the CORS headers answering requests from ``origin``."""
+        # When allow_credentials is true, we cannot use '*' - must specify exact origin
+        return {
+            'Access-Control-Allow-Origin': origin,
+            'Access-Control-Allow-Credentials': 'true',
+            'Access-Control-Allow-Methods': CORS_ALLOW_METHODS,
+            'Access-Control-Allow-Headers': CORS_ALLOW_HEADERS,
+            'Access-Control-Max-Age': CORS_MAX_AGE,
+        }
+
+    def headers_for(self, origin):
+        """Return the header set of an allowed origin, or None if it is not allowed."""
+        headers = self.origin_headers.get(origin)
+        if headers is None and self.allow_all:
+            headers = self.build_headers(origin)
+            if len(self.origin_headers) < self.MAX_CACHED_ORIGINS:
+                self.origin_headers[origin] = headers
+        return headers
     
+    def __call__(self, request):
+        origin = request.META.get('HTTP_ORIGIN')
+        headers = self.headers_for(origin) if origin else None
+
+        if headers is not None and request.method == 'OPTIONS':
+            # Preflight: nothing below needs to run
+            response = HttpResponse()
+        else:
+            response = self.get_response(request)
+            if headers is None:
+                return response
+
+        for name, value in headers.items():
+            response.headers[name] = value
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware reporting the queries and cache calls of each request.
+
+    Adds a Server-Timing header (db, cache and total durations) when
+    SERVER_TIMING is on, and emits an EMF record per request, with the URL
+    name as the Route dimension, when REQUEST_METRICS_EMF is on (in Lambda).
+    Not used when both are off.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = settings.SERVER_TIMING
+        self.emf = settings.REQUEST_METRICS_EMF
+        if not (self.server_timing or self.emf):
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with request_metrics.measure() as metrics:
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        if self.server_timing:
+            timing = metrics.server_timing(total_ms)
+            if response.has_header('Server-Timing'):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response['Server-Timing'] = timing
+        if self.emf:
+            match = getattr(request, 'resolver_match', None)
+            emit(metrics.emf(match.url_name if match and match.url_name else 'unresolved', total_ms,
+                             properties={'method': request.method, 'status_code': response.status_code}))
+        return response
+
+
+class ConnectionLifecycleMiddleware:
+    """
+    Middleware to recycle idle DB connections and count connection reuse.
+
+    Runs first so connections idle for longer than DATABASE_CONN_MAX_IDLE are
+    closed before any other middleware queries the database.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_connections.prepare_connections()
+        try:
+            return self.get_response(request)
+        finally:
+            db_connections.release_connections()
+
+
+class LoadSheddingMiddleware:
+    """
+    Middleware rejecting low-priority requests while the database is slow.
+
+    Measures the latency of every query run further down the chain (see
+    Habit_Tracker.load_shedding). While the average is over the threshold,
+    requests to LOAD_SHED_PATHS get a 503 with a Retry-After header before
+    any session, auth or view code runs; other requests are served.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.low_priority_paths = tuple(settings.LOAD_SHED_PATHS)
+        self.retry_after = str(settings.LOAD_SHED_RETRY_AFTER_SECONDS)
+
+    def __call__(self, request):
+        # Stage prefix has already been stripped from request.path by the outer middleware
+        if request.path_info.startswith(self.low_priority_paths):
+            shed = load_shedding.overloaded()
+            load_shedding.record_request(shed)
+            if shed:
+                response = JsonResponse({'error': 'Service is busy, please retry later'}, status=503)
+                response['Retry-After'] = self.retry_after
+                return response
+        with load_shedding.observe_queries():
+            return self.get_response(request)
+
+
+class SessionWriteMiddleware(SessionMiddleware):
+    """
+    Django's SessionMiddleware, counting session writes performed and skipped.
+
+    Used with SESSION_SAVE_EVERY_REQUEST off and the sliding-expiry engine of
+    Habit_Tracker.sessions, so read-only requests leave the session untouched.
+    """
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is not None:
+            sessions.record_response(session, response)
+        return super().process_response(request, response)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware resolving request.user from cached user records.
+
+    The user is looked up in Habit_Tracker.auth_cache (in-process, then Redis)
+    instead of the database, so authenticated requests need no user query.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: auth_cache.get_cached_user(request))
+
+
+class ReplicaPinningMiddleware:
+    """
+    Middleware to keep reads on the DB writer after a client writes.
+
+    Requests with an unsafe method (POST, PUT, PATCH, DELETE) read from the
+    writer from the start, so the rows they read and then update are current.
+    Within other requests, the router pins reads to the writer as soon as they
+    write. A request that wrote also sets a short-lived cookie, so the client's
+    next requests read from the writer until the reader has caught up
+    (DATABASE_REPLICA_LAG seconds).
+    """
+
+    cookie_name = 'db_pinned'
+    # Methods that do not change data (RFC 9110), which may read from the reader
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lag = getattr(settings, 'DATABASE_REPLICA_LAG', 0)
+
+    def __call__(self, request):
+        token = db_router.start_request(pinned=(self.cookie_name in request.COOKIES
+                                                or request.method not in self.safe_methods))
+        try:
+            response = self.get_response(request)
+            if db_router.wrote() and self.lag > 0:
+                response.set_cookie(self.cookie_name, '1', max_age=math.ceil(self.lag),
+                                    httponly=True, samesite=settings.SESSION_COOKIE_SAMESITE,
+                                    secure=settings.SESSION_COOKIE_SECURE)
+            return response
+        finally:
+            db_router.end_request(token)
+
+
+# Content types worth compressing; everything else (images, archives) is passed through
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/',
+)
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header into a mapping of coding -> q-value.
+
+    Codings with q=0 are explicitly refused and kept with a 0.0 weight.
+    """
+    accepted = {}
+    for item in header.split(','):
+        parts = item.strip().split(';')
+        coding = parts[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate_encoding(header, available):
+    """
+    Pick the best content coding the client accepts out of ``available``.
+
+    ``available`` is ordered by server preference, which breaks q-value ties.
+    Returns None when the client accepts none of them.
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress_body(body, encoding, gzip_level=6, brotli_quality=5):
+    """Compress ``body`` with the given content coding ('br' or 'gzip')."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 keeps the output deterministic so identical payloads compress identically
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Middleware to compress response bodies with brotli or gzip.
+
+    Tuned for responses returned through Mangum and API Gateway:
+    - Negotiates brotli (when installed) or gzip from Accept-Encoding
+    - Skips bodies below a size threshold and non-text content types
+    - Skips health and auth endpoints, whose payloads are always tiny
+    - Only keeps the compressed body if it is actually smaller
+
+    Mangum decides whether to base64 encode a body from its content type,
+    so compressed JSON must be re-flagged; see ``flag_encoded_body`` in
+    ``lambda_handler.py``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+        self.gzip_level = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+        self.brotli_quality = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+        excluded = os.environ.get('COMPRESSION_EXCLUDE_PATHS', '/health/,/api/auth/')
+        self.excluded_paths = tuple(path.strip() for path in excluded.split(',') if path.strip())
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
     def __call__(self, request):
         response = self.get_response(request)
-        
-        # Get origin from request
-        origin = request.META.get('HTTP_ORIGIN', '')
-        
-        # Determine if origin is allowed
-        # When allow_credentials is true, we cannot use '*' - must specify exact origin
-        if origin:
-            if self.allowed_origins == ['*'] or origin in self.allowed_origins:
-                # Add CORS headers with exact origin (required when credentials are allowed)
-                response['Access-Control-Allow-Origin'] = origin
-                response['Access-Control-Allow-Credentials'] = 'true'
-                response['Access-Control-Allow-Methods'] = 'GET, HEAD, OPTIONS, PUT, POST, PATCH, DELETE'
-                response['Access-Control-Allow-Headers'] = 'Content-Type, X-CSRFToken, Authorization, Accept, Origin, X-Requested-With, Cache-Control, Pragma'
-                response['Access-Control-Max-Age'] = '3600'
-                
-                # Handle preflight OPTIONS requests
-                if request.method == 'OPTIONS':
-                    response.status_code = 200
-                    response.content = b''
-        
+
+        # Stage prefix has already been stripped from request.path by the inner middleware
+        if request.path.startswith(self.excluded_paths):
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return response
+
+        compressed = compress_body(response.content, encoding, self.gzip_level, self.brotli_quality)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag no longer matches the encoded bytes, so make it weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        return response
+
+
+# A route's middleware chain and the hooks its middleware registered
+MiddlewareChain = namedtuple(
+    'MiddlewareChain', 'handler view_middleware template_response_middleware exception_middleware'
+)
+
+
+def build_chain(middleware_paths, get_response):
+    """
+    Build a middleware chain around ``get_response``, as Django builds MIDDLEWARE.
+
+    Args:
+        middleware_paths (list): Dotted paths of the middleware, outermost first
+        get_response: The callable the innermost middleware wraps
+
+    Returns:
+        MiddlewareChain: The chain's entry point and its process_view,
+        process_template_response and process_exception hooks, in the order
+        Django's handler would call them
+    """
+    handler = get_response
+    view_middleware = []
+    template_response_middleware = []
+    exception_middleware = []
+    for middleware_path in reversed(middleware_paths):
+        try:
+            middleware = import_string(middleware_path)(handler)
+        except MiddlewareNotUsed:
+            continue
+        if hasattr(middleware, 'process_view'):
+            view_middleware.insert(0, middleware.process_view)
+        if hasattr(middleware, 'process_template_response'):
+            template_response_middleware.append(middleware.process_template_response)
+        if hasattr(middleware, 'process_exception'):
+            exception_middleware.append(middleware.process_exception)
+        handler = convert_exception_to_response(middleware)
+    return MiddlewareChain(handler, view_middleware, template_response_middleware, exception_middleware)
+
+
+class RouteMiddleware:
+    """
+    Middleware to run a separate middleware chain per route class.
+
+    MIDDLEWARE_ROUTES maps each route class (health, API, HTML pages) to the
+    middleware it needs, so the health checks skip sessions and auth and the
+    API skips messages and frame options. A path's class comes from its first
+    segment (MIDDLEWARE_ROUTE_PREFIXES, else MIDDLEWARE_DEFAULT_ROUTE) and is
+    decided once per segment. The chains are built once, like MIDDLEWARE;
+    their middleware must be synchronous.
+    """
+
+    # Bound on the first path segments whose route is remembered
+    MAX_CACHED_PREFIXES = 256
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.chains = {
+            route: build_chain(middleware_paths, get_response)
+            for route, middleware_paths in settings.MIDDLEWARE_ROUTES.items()
+        }
+        self.prefix_routes = dict(settings.MIDDLEWARE_ROUTE_PREFIXES)
+        self.default_route = settings.MIDDLEWARE_DEFAULT_ROUTE
+        unknown = {self.default_route, *self.prefix_routes.values()} - set(self.chains)
+        if unknown:
+            raise ImproperlyConfigured(f'MIDDLEWARE_ROUTES has no chain for {", ".join(sorted(unknown))}')
+        self.segment_routes = {}
+
+    def route_for(self, path):
+        """Return the route class of a request path."""
+        segment = path[:path.find('/', 1) + 1] or path
+        route = self.segment_routes.get(segment)
+        if route is None:
+            route = self.prefix_routes.get(segment, self.default_route)
+            if len(self.segment_routes) < self.MAX_CACHED_PREFIXES:
+                self.segment_routes[segment] = route
+        return route
+
+    def __call__(self, request):
+        # Stage prefix has already been stripped from request.path by the outer middleware
+        request.middleware_route = self.route_for(request.path_info)
+        return self.chains[request.middleware_route].handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in self.chains[request.middleware_route].view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        for process_template_response in self.chains[request.middleware_route].template_response_middleware:
+            response = process_template_response(request, response)
         return response
 
+    def process_exception(self, request, exception):
+        for process_exception in self.chains[request.middleware_route].exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
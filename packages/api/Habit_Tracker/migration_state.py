@@ -0,0 +1,195 @@
+"""
+Cold-start migration check against a fingerprint baked into the image.
+
+The image build runs ``manage.py migration_fingerprint --write``, which hashes
+the migrations of every installed app into ``MIGRATION_FINGERPRINT_FILE``. On
+cold start, ``ensure_migrated`` compares it with the fingerprint stored in the
+single-row ``SchemaState`` table (one primary key lookup). When they differ,
+it compares this image's migrations with those recorded as applied, and only
+migrates if some are missing. The state is always read from the default
+(writer) database that ``migrate`` targets, never from a read replica.
+
+During a rolling deploy, old and new images cold start side by side. An old
+image finds the database ahead of it and neither migrates nor records its
+fingerprint, and a fingerprint is only recorded by an image that knows every
+applied migration. So the stored fingerprint does not flip between the two.
+
+Migrations run under a PostgreSQL advisory lock, and the fingerprint is read
+again once the lock is held, so concurrent cold starts apply them once while
+the others wait and skip. The lock is polled with ``pg_try_advisory_lock`` for
+at most ``MIGRATION_LOCK_TIMEOUT`` seconds, well within Lambda's init limit.
+"""
+import hashlib
+import logging
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key of the advisory lock serializing migration runs
+MIGRATION_LOCK_KEY = zlib.crc32(b'habit-tracker:migrate')
+# Seconds between attempts to take the lock
+MIGRATION_LOCK_POLL_INTERVAL = 0.25
+
+
+def image_migrations():
+    """
+    Return the migrations of every installed app shipped in this image.
+
+    Returns:
+        set: (app_label, name) pairs
+    """
+    return set(MigrationLoader(None, ignore_no_migrations=True).disk_migrations)
+
+
+def compute_fingerprint():
+    """
+    Hash the names of the migrations of every installed app.
+
+    Returns:
+        str: SHA-256 hex digest; it changes whenever a migration is added or removed
+    """
+    names = sorted(f'{app_label}.{name}' for app_label, name in image_migrations())
+    return hashlib.sha256('\n'.join(names).encode()).hexdigest()
+
+
+def fingerprint_path():
+    """Return the path of the baked fingerprint file."""
+    return settings.MIGRATION_FINGERPRINT_FILE
+
+
+def write_fingerprint():
+    """
+    Bake the current fingerprint into ``MIGRATION_FINGERPRINT_FILE``.
+
+    Returns:
+        str: The fingerprint
+    """
+    fingerprint = compute_fingerprint()
+    with open(fingerprint_path(), 'w') as fingerprint_file:
+        fingerprint_file.write(fingerprint + '\n')
+    return fingerprint
+
+
+def baked_fingerprint():
+    """
+    Return the fingerprint baked into the image.
+
+    Falls back to computing it (loading every migration module) when the image
+    was built without one, e.g. when running locally.
+
+    Returns:
+        str: The fingerprint
+    """
+    try:
+        with open(fingerprint_path()) as fingerprint_file:
+            return fingerprint_file.read().strip()
+    except FileNotFoundError:
+        logger.info("No baked migration fingerprint at %s, computing it", fingerprint_path())
+        return compute_fingerprint()
+
+
+def stored_fingerprint():
+    """
+    Read the fingerprint of the last migration run from the database.
+
+    Returns:
+        str or None: The fingerprint, or None if it was never recorded or the
+        table does not exist yet
+    """
+    from habit.models import SchemaState
+
+    try:
+        states = SchemaState.objects.using(DEFAULT_DB_ALIAS).filter(pk=SchemaState.SINGLETON_ID)
+        return states.values_list('fingerprint', flat=True).first()
+    except DatabaseError:
+        return None
+
+
+def applied_migrations():
+    """
+    Return the migrations recorded as applied in the default database.
+
+    Returns:
+        set: (app_label, name) pairs; empty if nothing was ever migrated
+    """
+    return set(MigrationRecorder(connections[DEFAULT_DB_ALIAS]).applied_migrations())
+
+
+def record_fingerprint(fingerprint):
+    """Store the fingerprint of the migrations just applied."""
+    from habit.models import SchemaState
+
+    SchemaState.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        pk=SchemaState.SINGLETON_ID, defaults={'fingerprint': fingerprint})
+
+
+@contextmanager
+def migration_lock():
+    """
+    Hold the migration advisory lock on the default (writer) connection.
+
+    Only PostgreSQL has advisory locks; on other databases this does nothing.
+
+    Raises:
+        TimeoutError: Another cold start held the lock for longer than
+            ``MIGRATION_LOCK_TIMEOUT`` seconds
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    # pg_advisory_lock would wait without limit, past Lambda's init timeout
+    deadline = time.monotonic() + settings.MIGRATION_LOCK_TIMEOUT
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [MIGRATION_LOCK_KEY])
+            if cursor.fetchone()[0]:
+                break
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f'Migration lock still held after {settings.MIGRATION_LOCK_TIMEOUT} seconds')
+            time.sleep(MIGRATION_LOCK_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [MIGRATION_LOCK_KEY])
+
+
+def ensure_migrated():
+    """
+    Apply pending migrations if the database is behind the image.
+
+    Returns:
+        bool: True if this call ran the migrations
+    """
+    expected = baked_fingerprint()
+    if stored_fingerprint() == expected:
+        return False
+    migrations = image_migrations()
+    if migrations <= applied_migrations():
+        # The database is at least as new as this image (e.g. an old image during a rolling deploy)
+        return False
+
+    with migration_lock():
+        # Another cold start may have migrated while this one waited for the lock
+        if stored_fingerprint() == expected:
+            return False
+        logger.info("Migration fingerprint changed, running migrations")
+        call_command('migrate', interactive=False, verbosity=0)
+        unknown = applied_migrations() - migrations
+        if unknown:
+            # A newer image migrated too; its fingerprint must stay the recorded one
+            logger.info("Database has %s migrations this image does not know, fingerprint not recorded",
+                        len(unknown))
+        else:
+            record_fingerprint(expected)
+    return True
@@ -0,0 +1,167 @@
+"""
+Per-request database and cache timings.
+
+``measure()`` counts what the current request spends on each layer:
+
+- Queries and their total time, on every database alias, through
+  ``connection.execute_wrapper``.
+- Cache calls and their total time, with the hits and misses of ``get`` and
+  ``get_many``. Each cache backend instance (Django creates one per thread
+  and alias) has its methods wrapped once; outside ``measure()`` the wrappers
+  only pass the call through.
+
+``RequestMetricsMiddleware`` turns the counts into a ``Server-Timing``
+header (``SERVER_TIMING``, on outside production) and, in Lambda, into one
+EMF record per request with the URL name as the ``Route`` dimension
+(``REQUEST_METRICS_EMF``).
+
+Only work done on the request's thread is counted: the readiness probes of
+the health check run on their own threads, and the sorted-set reads of the
+streak index use the Redis client directly.
+"""
+import contextlib
+import contextvars
+import functools
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from Habit_Tracker.metrics import emf_record
+
+_MISSING = object()
+
+# Cache methods timed; the reads among them also count hits and misses
+CACHE_METHODS = ('get', 'get_many', 'set', 'add', 'delete', 'set_many', 'delete_many',
+                 'incr', 'decr', 'touch', 'has_key')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counts and total durations (ms) of a request's queries and cache calls."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.cache_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_ms = 0.0
+        # Set while a cache call runs, so calls it makes on itself are not counted twice
+        self.in_cache = False
+
+    def server_timing(self, total_ms):
+        """
+        Return the value of a Server-Timing header.
+
+        Args:
+            total_ms (float): Duration of the whole request
+        """
+        return (f'db;dur={self.db_ms:.1f};desc="{self.queries} queries", '
+                f'cache;dur={self.cache_ms:.1f};desc="{self.cache_hits} hits/{self.cache_misses} misses", '
+                f'total;dur={total_ms:.1f}')
+
+    def emf(self, route, total_ms, properties=None):
+        """
+        Return the EMF record of the request.
+
+        Args:
+            route (str): Value of the Route dimension
+            total_ms (float): Duration of the whole request
+            properties (dict): Extra fields logged with the record
+        """
+        return emf_record(
+            {
+                'RequestDuration': round(total_ms, 1),
+                'DBTime': round(self.db_ms, 1),
+                'Queries': self.queries,
+                'CacheTime': round(self.cache_ms, 1),
+                'CacheHits': self.cache_hits,
+                'CacheMisses': self.cache_misses,
+            },
+            dimensions={'FunctionName': settings.REQUEST_METRICS_FUNCTION_NAME, 'Route': route},
+            properties={'event': 'request', **(properties or {})},
+            units={'Queries': 'Count', 'CacheHits': 'Count', 'CacheMisses': 'Count'},
+        )
+
+
+def _observe_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_ms += (time.perf_counter() - start) * 1000
+
+
+def _timed(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics.in_cache:
+            return method(*args, **kwargs)
+        metrics.in_cache = True
+        start = time.perf_counter()
+        try:
+            if name == 'get':
+                return _get(metrics, method, *args, **kwargs)
+            if name == 'get_many':
+                return _get_many(metrics, method, *args, **kwargs)
+            return method(*args, **kwargs)
+        finally:
+            metrics.in_cache = False
+            metrics.cache_calls += 1
+            metrics.cache_ms += (time.perf_counter() - start) * 1000
+    return wrapper
+
+
+def _get(metrics, method, key, default=None, version=None):
+    value = method(key, _MISSING, version)
+    if value is _MISSING:
+        metrics.cache_misses += 1
+        return default
+    metrics.cache_hits += 1
+    return value
+
+
+def _get_many(metrics, method, keys, version=None):
+    keys = list(keys)
+    values = method(keys, version)
+    metrics.cache_hits += len(values)
+    metrics.cache_misses += len(keys) - len(values)
+    return values
+
+
+def instrument_cache(backend):
+    """Wrap the methods of a cache backend instance so ``measure()`` counts its calls (once)."""
+    if getattr(backend, 'request_metrics_instrumented', False):
+        return
+    for name in CACHE_METHODS:
+        setattr(backend, name, _timed(name, getattr(backend, name)))
+    backend.request_metrics_instrumented = True
+
+
+@contextlib.contextmanager
+def measure():
+    """
+    Count the queries and cache calls of the current request until exit.
+
+    Yields:
+        RequestMetrics: The counts, updated as the request runs
+    """
+    metrics = RequestMetrics()
+    for alias in settings.CACHES:
+        instrument_cache(caches[alias])
+    token = _current.set(metrics)
+    try:
+        with contextlib.ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(_observe_query))
+            yield metrics
+    finally:
+        _current.reset(token)
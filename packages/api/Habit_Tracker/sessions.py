@@ -0,0 +1,124 @@
+"""
+Sliding-expiry session engine that skips redundant session writes.
+
+``SESSION_SAVE_EVERY_REQUEST`` keeps sessions alive by writing every session
+back on every request, read-only GETs included. This engine instead stores
+when a session was last written. Once ``SESSION_REFRESH_FRACTION`` of its age
+has elapsed, loading it marks it modified, so ``SessionMiddleware`` writes it
+and re-sends the cookie with a fresh expiry. An active session therefore
+stays alive while being written at most once per refresh interval, plus
+whenever its data actually changes. An idle session expires between
+``(1 - SESSION_REFRESH_FRACTION) * SESSION_COOKIE_AGE`` and
+``SESSION_COOKIE_AGE`` after its last use.
+
+The sessions are stored by ``SESSION_BASE_ENGINE`` (the Redis cache in
+production). Deleting a session (logout, key cycling) removes it from Redis
+even while the Redis circuit is open. ``SessionWriteMiddleware`` counts the writes performed and skipped.
+"""
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+
+from Habit_Tracker import circuit_breaker
+
+# Session key holding the wall-clock time of the last write
+REFRESHED_AT_KEY = '_session_refreshed_at'
+
+_lock = threading.Lock()
+_counters = {
+    'writes': 0,
+    'refreshes': 0,
+    'skipped': 0,
+}
+
+
+def _increment(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_stats():
+    """
+    Return a snapshot of the session write counters.
+
+    Returns:
+        dict: writes (all session writes), refreshes (writes made while the
+        expiry was due for a refresh), skipped (requests that used an existing
+        session without writing it) and write_ratio (writes over requests that
+        used a session, None before the first one)
+    """
+    with _lock:
+        stats = dict(_counters)
+    total = stats['writes'] + stats['skipped']
+    stats['write_ratio'] = stats['writes'] / total if total else None
+    return stats
+
+
+def reset_stats():
+    """Zero the counters (used by tests and benchmarks)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
+
+
+BaseSessionStore = import_module(settings.SESSION_BASE_ENGINE).SessionStore
+
+
+class SessionStore(BaseSessionStore):
+    """Session store that asks for a write only when the expiry needs extending."""
+
+    refreshing = False
+
+    def refresh_due(self, data, now=None):
+        """
+        Return True if the session's expiry should be extended.
+
+        Args:
+            data (dict): The loaded session data
+            now: Current wall-clock time (defaults to time.time())
+        """
+        now = time.time() if now is None else now
+        refreshed_at = data.get(REFRESHED_AT_KEY)
+        if refreshed_at is None:
+            return True
+        interval = self.get_expiry_age(expiry=data.get('_session_expiry')) * settings.SESSION_REFRESH_FRACTION
+        return now - refreshed_at >= interval
+
+    def load(self):
+        data = super().load()
+        if data and self.refresh_due(data):
+            self.modified = self.refreshing = True
+        return data
+
+    def save(self, must_create=False):
+        self._get_session(no_load=must_create)[REFRESHED_AT_KEY] = int(time.time())
+        super().save(must_create=must_create)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        super().delete(session_key)
+        cache = getattr(self, '_cache', None)
+        if session_key is not None and circuit_breaker.circuit_open(cache):
+            # The cache-backed engines' delete only reached the in-process cache
+            circuit_breaker.invalidate(cache, [self.cache_key_prefix + session_key])
+
+
+def record_response(session, response):
+    """
+    Count whether ``SessionMiddleware`` writes the session of a response.
+
+    Only sessions the request used and that hold data are counted. With
+    SESSION_SAVE_EVERY_REQUEST off, those are written when modified (which
+    includes SessionStore's expiry refreshes), unless the response is a 500.
+    """
+    if not session.accessed or session.is_empty():
+        return
+    if not session.modified:
+        _increment('skipped')
+    elif response.status_code != 500:
+        _increment('writes')
+        if getattr(session, 'refreshing', False):
+            _increment('refreshes')
@@ -60,18 +60,54 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'Habit_Tracker.middleware.AllowAllHostsMiddleware',  # Bypass ALLOWED_HOSTS for Lambda
-    'Habit_Tracker.middleware.CorsMiddleware',  # Handle CORS headers
-    'Habit_Tracker.middleware.StripStagePrefixMiddleware',  # Strip API Gateway stage prefix
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'Habit_Tracker.middleware.CorsMiddleware',  # Handle CORS headers, answer preflights before anything else runs
+    'Habit_Tracker.middleware.StripStagePrefixMiddleware',  # Strip API Gateway stage prefix before routing
+    'Habit_Tracker.middleware.RequestMetricsMiddleware',  # Per-request DB/cache timings (Server-Timing, EMF)
+    'Habit_Tracker.middleware.RouteMiddleware',  # Run the MIDDLEWARE_ROUTES chain of the path's route class
 ]
 
+# Middleware chain per route class, outermost first
+MIDDLEWARE_ROUTES = {
+    # Probes only need their DB connections recycled
+    'health': [
+        'Habit_Tracker.middleware.ConnectionLifecycleMiddleware',  # Recycle idle DB connections
+    ],
+    'api': [
+        'django.middleware.security.SecurityMiddleware',
+        'Habit_Tracker.middleware.LoadSheddingMiddleware',  # 503 for LOAD_SHED_PATHS while the DB is slow
+        'Habit_Tracker.middleware.ConnectionLifecycleMiddleware',  # Recycle idle DB connections
+        'Habit_Tracker.middleware.CompressionMiddleware',  # Compress responses
+        'Habit_Tracker.middleware.AllowAllHostsMiddleware',  # Bypass ALLOWED_HOSTS for Lambda
+        'Habit_Tracker.middleware.ReplicaPinningMiddleware',  # Read-your-writes for the DB reader
+        'Habit_Tracker.middleware.SessionWriteMiddleware',  # SessionMiddleware counting skipped writes
+        'django.middleware.common.CommonMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'Habit_Tracker.middleware.CachedAuthenticationMiddleware',  # request.user from cached user records
+    ],
+    # Server-rendered pages and the admin
+    'html': [
+        'django.middleware.security.SecurityMiddleware',
+        'Habit_Tracker.middleware.LoadSheddingMiddleware',
+        'Habit_Tracker.middleware.ConnectionLifecycleMiddleware',
+        'Habit_Tracker.middleware.CompressionMiddleware',
+        'Habit_Tracker.middleware.ReplicaPinningMiddleware',
+        'Habit_Tracker.middleware.SessionWriteMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'Habit_Tracker.middleware.CachedAuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ],
+}
+# First path segment -> route class; other paths use MIDDLEWARE_DEFAULT_ROUTE
+MIDDLEWARE_ROUTE_PREFIXES = {
+    '/health/': 'health',
+    '/api/': 'api',
+}
+MIDDLEWARE_DEFAULT_ROUTE = 'html'
+# The admin looks for its middleware in MIDDLEWARE; the 'html' chain provides it
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
 ROOT_URLCONF = 'Habit_Tracker.urls'
 
 TEMPLATES = [
@@ -109,12 +145,25 @@ if os.environ.get('DB_HOST'):
             'PORT': os.environ.get('DB_PORT', '5432'),
             'OPTIONS': {
                 'connect_timeout': 10,
+                # Detect sockets silently dropped while the Lambda sandbox was frozen
+                'keepalives': 1,
+                'keepalives_idle': 30,
+                'keepalives_interval': 10,
+                'keepalives_count': 3,
             },
+            # Keep connections across warm invocations, pinging them before reuse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+            'CONN_HEALTH_CHECKS': True,
         }
     }
-    # Use reader endpoint for read replicas if available (optional)
+    # Aurora reader endpoint for analytics reads (see Habit_Tracker.db_router)
+    # The writer stays the default alias, so writes never reach the reader
     if os.environ.get('DB_READER_HOST'):
-        DATABASES['default']['HOST'] = os.environ.get('DB_READER_HOST')
+        DATABASES['reader'] = {
+            **DATABASES['default'],
+            'HOST': os.environ.get('DB_READER_HOST'),
+            'TEST': {'MIRROR': 'default'},
+        }
 elif os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
     # Running in Lambda but DB_HOST not set - use a dummy database config
     # This allows Django to start even if database isn't configured yet
@@ -146,6 +195,36 @@ else:
             }
         }
 
+# Local read replica testing: a second database (e.g. another SQLite file) as the reader
+if os.environ.get('DB_READER_NAME') and 'reader' not in DATABASES:
+    DATABASES['reader'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DB_READER_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Read/write splitting: reads of these apps go to the 'reader' alias when configured
+DATABASE_ROUTERS = ['Habit_Tracker.db_router.ReadReplicaRouter']
+DATABASE_READER_APPS = ['habit']
+# Seconds a client keeps reading from the writer after a write (covers Aurora replica lag)
+DATABASE_REPLICA_LAG = float(os.environ.get('DB_REPLICA_LAG_SECONDS', '2'))
+
+# Close persistent connections idle for longer than this before reusing them
+# (see Habit_Tracker.db_connections)
+DATABASE_CONN_MAX_IDLE = float(os.environ.get('DB_CONN_MAX_IDLE_SECONDS', '300'))
+
+# Migration fingerprint baked into the image at build time (see Habit_Tracker.migration_state)
+MIGRATION_FINGERPRINT_FILE = os.environ.get('MIGRATION_FINGERPRINT_FILE', str(BASE_DIR / 'migration_fingerprint.txt'))
+# Seconds a cold start waits for another one's migration lock (Lambda init is capped at 10 s)
+MIGRATION_LOCK_TIMEOUT = float(os.environ.get('MIGRATION_LOCK_TIMEOUT_SECONDS', '5'))
+
+# Readiness probe deadline and how long its result is reused (see habit.probes)
+HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT_SECONDS', '1'))
+HEALTH_CHECK_CACHE_SECONDS = float(os.environ.get('HEALTH_CHECK_CACHE_SECONDS', '5'))
+
+# Route the read endpoints to the async views of habit.async_views (ASGI server deployments, see gunicorn.conf.py)
+API_ASYNC_VIEWS = os.environ.get('API_ASYNC_VIEWS', 'false').lower() == 'true'
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -208,24 +287,43 @@ if os.environ.get('REDIS_HOST'):
         # ElastiCache Serverless runs in cluster mode - must use database 0 (no /1)
         # Cluster mode doesn't support SELECT command for switching databases
         redis_location = f"rediss://{redis_host}:{redis_port}?ssl_cert_reqs=none"
-        CACHES = {
-            'default': {
-                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-                'LOCATION': redis_location,
-            }
-        }
     else:
         # Non-TLS Redis (local development) - can use database 1
         redis_location = f"redis://{redis_host}:{redis_port}/1"
-        CACHES = {
-            'default': {
-                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-                'LOCATION': redis_location,
-            }
+
+    # django-redis: redis-py parses replies with hiredis when it is installed.
+    # The backend adds a circuit breaker that answers from process memory
+    # while Redis fails or is slow (see Habit_Tracker.circuit_breaker)
+    CACHES = {
+        'default': {
+            'BACKEND': 'Habit_Tracker.circuit_breaker.CircuitBreakerRedisCache',
+            'LOCATION': redis_location,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                # Threads wait for a free connection instead of failing when the pool is exhausted
+                'CONNECTION_POOL_CLASS': 'redis.BlockingConnectionPool',
+                'CONNECTION_POOL_KWARGS': {
+                    'max_connections': int(os.environ.get('REDIS_MAX_CONNECTIONS', '20')),
+                    'timeout': float(os.environ.get('REDIS_POOL_TIMEOUT_SECONDS', '1')),
+                    # Ping connections idle this long (e.g. across a frozen Lambda) before reuse
+                    'health_check_interval': 30,
+                },
+                'SOCKET_CONNECT_TIMEOUT': float(os.environ.get('REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS', '1')),
+                'SOCKET_TIMEOUT': float(os.environ.get('REDIS_SOCKET_TIMEOUT_SECONDS', '1')),
+                'SERIALIZER': os.environ.get('REDIS_SERIALIZER', 'django_redis.serializers.pickle.PickleSerializer'),
+                # Values from REDIS_COMPRESS_MIN_SIZE bytes up are zlib-compressed (see Habit_Tracker.cache)
+                'COMPRESSOR': os.environ.get('REDIS_COMPRESSOR', 'Habit_Tracker.cache.ThresholdZlibCompressor'),
+                'COMPRESS_MIN_SIZE': int(os.environ.get('REDIS_COMPRESS_MIN_SIZE', '1024')),
+                'BREAKER_FAILURE_THRESHOLD': int(os.environ.get('REDIS_BREAKER_FAILURE_THRESHOLD', '5')),
+                'BREAKER_SLOW_CALL_SECONDS': float(os.environ.get('REDIS_BREAKER_SLOW_CALL_SECONDS', '0.25')),
+                'BREAKER_RESET_TIMEOUT': float(os.environ.get('REDIS_BREAKER_RESET_SECONDS', '5')),
+            },
         }
+    }
     
-    # Use Redis for session storage in serverless environment
-    SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+    # Sessions are read from Redis and written through to the database, which
+    # serves them while the Redis circuit is open
+    SESSION_BASE_ENGINE = 'django.contrib.sessions.backends.cached_db'
     SESSION_CACHE_ALIAS = 'default'
 else:
     # Fallback to local memory cache if Redis is not available
@@ -234,6 +332,7 @@ else:
             'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         }
     }
+    SESSION_BASE_ENGINE = 'django.contrib.sessions.backends.db'
 
 # Session Configuration for Serverless/Lambda
 # Sessions are stored in Redis if available, otherwise in database
@@ -242,9 +341,49 @@ SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'false').lower() == 'true'  # Set to True if using HTTPS
 SESSION_COOKIE_SAMESITE = 'None' if os.environ.get('SESSION_COOKIE_SECURE', 'false').lower() == 'true' else 'Lax'  # None for HTTPS, Lax for HTTP
-SESSION_SAVE_EVERY_REQUEST = True  # Save session on every request to extend expiry
+# Sliding expiry without a write per request: a session is rewritten when modified or
+# once SESSION_REFRESH_FRACTION of its age has elapsed (see Habit_Tracker.sessions)
+SESSION_ENGINE = 'Habit_Tracker.sessions'
+SESSION_REFRESH_FRACTION = float(os.environ.get('SESSION_REFRESH_FRACTION', '0.25'))
+SESSION_SAVE_EVERY_REQUEST = False
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
+# Cached user records behind request.user (see Habit_Tracker.auth_cache)
+USER_CACHE_ALIAS = 'default'
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL_SECONDS', '3600'))
+USER_CACHE_LOCAL_TTL = float(os.environ.get('USER_CACHE_LOCAL_TTL_SECONDS', '10'))
+
+# Two-tier cache (in-process LRU, then Redis) for read-mostly records (see Habit_Tracker.tiered_cache)
+TIERED_CACHE_ALIAS = 'default'
+TIERED_CACHE_TIMEOUT = int(os.environ.get('TIERED_CACHE_TIMEOUT_SECONDS', '3600'))
+TIERED_CACHE_LOCAL_TTL = float(os.environ.get('TIERED_CACHE_LOCAL_TTL_SECONDS', '10'))
+TIERED_CACHE_MAX_ENTRIES = int(os.environ.get('TIERED_CACHE_MAX_ENTRIES', '2048'))
+
+# Stampede protection for expensive cached results (see Habit_Tracker.single_flight)
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_LOCK_TIMEOUT_SECONDS', '30'))
+SINGLE_FLIGHT_WAIT = float(os.environ.get('SINGLE_FLIGHT_WAIT_SECONDS', '5'))
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+ANALYSIS_CACHE_TIMEOUT = int(os.environ.get('ANALYSIS_CACHE_SECONDS', '60'))
+ANALYSIS_CACHE_STALE_TIMEOUT = int(os.environ.get('ANALYSIS_CACHE_STALE_SECONDS', '300'))
+
+# Low-priority paths answered with a 503 while queries are slow (see Habit_Tracker.load_shedding)
+LOAD_SHED_PATHS = ['/api/analysis/', '/Habits-Analysis/']
+LOAD_SHED_DB_LATENCY_MS = float(os.environ.get('LOAD_SHED_DB_LATENCY_MS', '250'))
+LOAD_SHED_RECOVER_LATENCY_MS = float(os.environ.get('LOAD_SHED_RECOVER_LATENCY_MS', '100'))
+LOAD_SHED_SMOOTHING = 0.2  # Weight of each query in the moving average
+LOAD_SHED_STALE_SECONDS = float(os.environ.get('LOAD_SHED_STALE_SECONDS', '30'))
+LOAD_SHED_RETRY_AFTER_SECONDS = int(os.environ.get('LOAD_SHED_RETRY_AFTER_SECONDS', '10'))
+
+# Per-request query and cache timings (see Habit_Tracker.request_metrics): a
+# Server-Timing header outside production, and an EMF record per request in Lambda
+SERVER_TIMING = os.environ.get(
+    'SERVER_TIMING', 'false' if os.environ.get('ENVIRONMENT', 'staging') == 'production' else 'true'
+).lower() == 'true'
+REQUEST_METRICS_FUNCTION_NAME = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+REQUEST_METRICS_EMF = os.environ.get(
+    'REQUEST_METRICS_EMF', 'true' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'false'
+).lower() == 'true'
+
 # CSRF Configuration for Serverless/Lambda
 CSRF_COOKIE_NAME = 'csrftoken'
 CSRF_COOKIE_AGE = 86400
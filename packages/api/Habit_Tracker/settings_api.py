@@ -0,0 +1,34 @@
+"""
+API-only settings profile for the Lambda runtime.
+
+The SPA only calls the JSON endpoints, so this profile drops everything the
+server-rendered pages need: the admin, messages, static files, template tags
+(crispy_forms, fontawesomefree) and development tools (django_extensions).
+Everything else, including databases, caches, sessions and CORS, comes from
+``Habit_Tracker.settings``.
+
+Lambda runs its cold-start migrations under this profile, and the image bakes
+the migration fingerprint with it (see Habit_Tracker.migration_state), so they
+only cover the apps listed here. The admin's tables are only created by
+migrating with the full settings, which the server-rendered site needs.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import MIDDLEWARE_ROUTES
+
+INSTALLED_APPS = [
+    'habit.apps.HabitConfig',
+    'Users.apps.UsersConfig',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+]
+
+# No HTML is rendered, so there are no messages to show or pages to frame;
+# the auth forms (Login/, Register/, Logout/) are JSON endpoints here
+MIDDLEWARE_ROUTES = {route: MIDDLEWARE_ROUTES[route] for route in ('health', 'api')}
+MIDDLEWARE_DEFAULT_ROUTE = 'api'
+
+ROOT_URLCONF = 'Habit_Tracker.urls_api'
+
+# Error pages fall back to Django's built-in responses
+TEMPLATES = []
@@ -0,0 +1,189 @@
+"""
+Stampede-protected caching of expensive results.
+
+When a popular cached value expires, every worker that reads it at the same
+moment would recompute it. ``get_or_compute`` prevents that:
+
+- Single flight: a worker only recomputes a value while holding a short lock
+  in the cache (``SET NX`` on Redis). Workers that find a cold key locked
+  wait up to ``SINGLE_FLIGHT_WAIT`` seconds for the winner's value. The lock
+  holds a random token, and a worker only releases the lock if it still holds
+  its token: if the compute outlasts ``SINGLE_FLIGHT_LOCK_TIMEOUT``, the lock
+  may have expired and been taken by another worker.
+- Probabilistic early refresh ("XFetch"): each read of a fresh value may
+  decide to recompute it before it expires, with a probability rising as
+  expiry approaches and with how long the value took to compute, so a
+  single worker usually refreshes a hot key before it goes stale at all.
+- Stale-while-revalidate: a value is kept ``stale_timeout`` seconds past its
+  expiry. While one worker recomputes it, the others keep serving it.
+
+The winner recomputes inline: a Lambda container is frozen as soon as it has
+answered, so there is no background thread to leave the work to.
+"""
+import logging
+import math
+import random
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from redis.exceptions import RedisError
+
+from Habit_Tracker.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counters = {
+    'hits': 0,
+    'computes': 0,
+    'early_refreshes': 0,
+    'stale_served': 0,
+    'waits': 0,
+}
+
+
+def _increment(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_stats():
+    """
+    Return a snapshot of the single-flight counters.
+
+    Returns:
+        dict: hits (fresh values served), computes (values computed),
+        early_refreshes (computes started before expiry), stale_served
+        (expired values served while another worker recomputed them), waits
+        (reads of a cold key that waited for another worker) and hit_ratio
+        (reads served without computing, None before the first read)
+    """
+    with _lock:
+        stats = dict(_counters)
+    served = stats['hits'] + stats['stale_served']
+    reads = served + stats['computes']
+    stats['hit_ratio'] = served / reads if reads else None
+    return stats
+
+
+def reset_stats():
+    """Zero the counters (used by tests and benchmarks)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
+
+
+# Deletes the lock only if it still holds the releasing worker's token, atomically
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def lock_key(key):
+    """Return the cache key of the lock guarding a recomputation."""
+    return f'lock:{key}'
+
+
+def refresh_early(entry, now, beta):
+    """
+    Return True if a fresh entry should be recomputed now (XFetch).
+
+    Args:
+        entry (dict): The cached entry, with its expiry and compute time
+        now (float): Current wall-clock time
+        beta (float): Eagerness; above 1 refreshes earlier, 0 never early
+    """
+    # 1 - random() is in (0, 1], so the log is defined
+    return now - entry['delta'] * beta * math.log(1 - random.random()) >= entry['expires_at']
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=0, beta=1.0, alias='default'):
+    """
+    Return the cached value of ``key``, computing it at most once across workers.
+
+    Args:
+        key (str): Cache key
+        compute (callable): Called without arguments to build the value
+        timeout (float): Seconds the value is fresh
+        stale_timeout (float): Seconds an expired value may still be served
+            while another worker recomputes it
+        beta (float): Eagerness of the early refresh (see refresh_early)
+        alias: Name of the cache in settings.CACHES
+
+    Returns:
+        The fresh value, a stale one while another worker recomputes it, or
+        a newly computed one
+    """
+    cache = caches[alias]
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None:
+        if now < entry['expires_at'] and not refresh_early(entry, now, beta):
+            _increment('hits')
+            return entry['value']
+        token = _acquire(cache, key)
+        if token is None:
+            # Another worker is recomputing it
+            _increment('stale_served')
+            return entry['value']
+        if now < entry['expires_at']:
+            _increment('early_refreshes')
+        return _compute(cache, alias, key, compute, timeout, stale_timeout, token)
+
+    token = _acquire(cache, key)
+    if token is None:
+        _increment('waits')
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                _increment('hits')
+                return entry['value']
+        logger.warning("Gave up waiting for %s to be computed by another worker", key)
+    return _compute(cache, alias, key, compute, timeout, stale_timeout, token)
+
+
+def _acquire(cache, key):
+    """Take the lock of ``key``; return the token it holds, or None if another worker has it."""
+    # An integer, which both Redis cache backends store as its decimal digits
+    # rather than pickled, so the release script can compare it
+    token = secrets.randbits(63)
+    if cache.add(lock_key(key), token, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def _release(cache, alias, key, token):
+    """Delete the lock of ``key`` if it still holds ``token``."""
+    client = get_redis_client(alias)
+    if client is None:
+        # Without Redis the check and the delete are not atomic: best effort
+        if cache.get(lock_key(key)) == token:
+            cache.delete(lock_key(key))
+        return
+    try:
+        client.eval(RELEASE_SCRIPT, 1, cache.make_key(lock_key(key)), token)
+    except RedisError:
+        # The lock expires on its own
+        logger.warning("Could not release the lock of %s", key, exc_info=True)
+
+
+def _compute(cache, alias, key, compute, timeout, stale_timeout, token=None):
+    _increment('computes')
+    try:
+        start = time.time()
+        value = compute()
+        now = time.time()
+        entry = {'value': value, 'expires_at': now + timeout, 'delta': now - start}
+        cache.set(key, entry, timeout + stale_timeout)
+        return value
+    finally:
+        if token is not None:
+            _release(cache, alias, key, token)
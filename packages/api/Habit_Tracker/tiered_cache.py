@@ -0,0 +1,193 @@
+"""
+Two-tier cache for read-mostly data: an in-process LRU in front of Redis.
+
+A warm Lambda container reads the same small records (profiles, habit
+metadata) on request after request. ``TieredCache`` answers those reads from
+a bounded in-process LRU whose entries live ``TIERED_CACHE_LOCAL_TTL``
+seconds, then from the Redis cache (``TIERED_CACHE_ALIAS``), and only then
+loads them from the database.
+
+Records belong to a scope (e.g. one user's data), and each scope has a
+generation counter in Redis that is part of every key. ``bump_generation``
+increments it, so every record of the scope is invalidated in all containers
+at once without scanning keys; the orphaned entries expire on their own.
+Containers learn a scope's generation from Redis at most once per local TTL,
+which bounds how long another container can serve a record after it changed.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from Habit_Tracker import circuit_breaker
+
+_MISSING = object()
+
+_lock = threading.Lock()
+# key -> (monotonic expiry, value); holds records and scope generations
+_local = OrderedDict()
+_counters = {
+    'local_hits': 0,
+    'redis_hits': 0,
+    'misses': 0,
+}
+
+
+def _increment(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_stats():
+    """
+    Return a snapshot of the hit counters of each tier.
+
+    Returns:
+        dict: local_hits, redis_hits and misses (reads answered by the
+        in-process LRU, by Redis, and by the loader), local_hit_ratio (over
+        all reads), redis_hit_ratio (over the reads that reached Redis) and
+        hit_ratio (over all reads); ratios are None before the first read
+    """
+    with _lock:
+        stats = dict(_counters)
+    reads = stats['local_hits'] + stats['redis_hits'] + stats['misses']
+    redis_reads = stats['redis_hits'] + stats['misses']
+    stats['local_hit_ratio'] = stats['local_hits'] / reads if reads else None
+    stats['redis_hit_ratio'] = stats['redis_hits'] / redis_reads if redis_reads else None
+    stats['hit_ratio'] = (stats['local_hits'] + stats['redis_hits']) / reads if reads else None
+    return stats
+
+
+def reset_stats():
+    """Zero the counters (used by tests and benchmarks)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
+
+
+def clear_local():
+    """Empty the in-process tier (used by tests)."""
+    with _lock:
+        _local.clear()
+
+
+def _get_local(key, now):
+    with _lock:
+        entry = _local.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[0] <= now:
+            del _local[key]
+            return _MISSING
+        _local.move_to_end(key)
+        return entry[1]
+
+
+def _set_local(key, value, now):
+    if settings.TIERED_CACHE_LOCAL_TTL <= 0:
+        return
+    with _lock:
+        _local[key] = (now + settings.TIERED_CACHE_LOCAL_TTL, value)
+        _local.move_to_end(key)
+        while len(_local) > settings.TIERED_CACHE_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def generation_key(scope):
+    """Return the Redis key of a scope's generation counter."""
+    return f'gen:{scope}'
+
+
+def get_generation(scope):
+    """
+    Return the current generation of a scope.
+
+    A missing counter (never bumped, or evicted) is created from the current
+    time in milliseconds, so a recreated counter never repeats an old
+    generation and revives records cached under it.
+    """
+    key = generation_key(scope)
+    now = time.monotonic()
+    generation = _get_local(key, now)
+    if generation is _MISSING:
+        cache = caches[settings.TIERED_CACHE_ALIAS]
+        generation = cache.get(key)
+        if generation is None:
+            cache.add(key, int(time.time() * 1000), None)
+            generation = cache.get(key)
+        _set_local(key, generation, now)
+    return generation
+
+
+def bump_generation(scope):
+    """Invalidate every record of a scope, in this container and in Redis."""
+    key = generation_key(scope)
+    cache = caches[settings.TIERED_CACHE_ALIAS]
+    if circuit_breaker.circuit_open(cache):
+        # An increment would only reach the in-process cache. Deleting the
+        # counter also moves the scope to a new generation (see get_generation),
+        # and invalidate() reaches Redis or records the key for replay.
+        circuit_breaker.invalidate(cache, [key])
+        with _lock:
+            _local.pop(key, None)
+        return
+    try:
+        generation = cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.incr(key)
+    _set_local(key, generation, time.monotonic())
+
+
+class TieredCache:
+    """
+    A named family of cached records, read through the in-process and Redis tiers.
+
+    Args:
+        name (str): Key prefix of the records
+        timeout (int): Lifetime of the records in Redis, in seconds
+            (defaults to TIERED_CACHE_TIMEOUT)
+    """
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+
+    def make_key(self, key, scope):
+        """Return the cache key of a record under the scope's current generation."""
+        return f'{self.name}:{scope}:{get_generation(scope)}:{key}'
+
+    def get_or_load(self, key, load, scope):
+        """
+        Return a record, loading and caching it on a miss in both tiers.
+
+        Args:
+            key: The record's key within the scope
+            load (callable): Called without arguments to build the record;
+                exceptions propagate and nothing is cached
+            scope (str): The scope whose generation invalidates the record
+
+        Returns:
+            The record. Callers must not mutate it: the in-process tier hands
+            the same object to every request.
+        """
+        cache_key = self.make_key(key, scope)
+        now = time.monotonic()
+        value = _get_local(cache_key, now)
+        if value is not _MISSING:
+            _increment('local_hits')
+            return value
+
+        cache = caches[settings.TIERED_CACHE_ALIAS]
+        value = cache.get(cache_key, _MISSING)
+        if value is _MISSING:
+            _increment('misses')
+            value = load()
+            timeout = self.timeout if self.timeout is not None else settings.TIERED_CACHE_TIMEOUT
+            cache.set(cache_key, value, timeout)
+        else:
+            _increment('redis_hits')
+        _set_local(cache_key, value, now)
+        return value
@@ -20,36 +20,14 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from Users import views as user_views
 from habit import views as habit_views
-from habit.health import (
-    HealthCheckView, AuthCheckView, ProfileView, HabitsView, TasksView,
-    HabitDetailView, CompleteTaskView, DeleteHabitView, AnalysisView
-)
+from Habit_Tracker.urls_api import api_urlpatterns
 from django.conf import settings
 from django.conf.urls.static import static
 
 
 
 
-urlpatterns = [
-    # Health check endpoint
-    path('health/', HealthCheckView.as_view(), name='health-check'),
-    # Authentication check endpoint
-    path('api/auth/check/', AuthCheckView.as_view(), name='auth-check'),
-    # Profile API endpoint
-    path('api/profile/', ProfileView.as_view(), name='api-profile'),
-    # Habits API endpoint (GET for list, POST for create)
-    path('api/habits/', HabitsView.as_view(), name='api-habits'),
-    # Tasks API endpoint
-    path('api/tasks/', TasksView.as_view(), name='api-tasks'),
-    # Habit detail API endpoint
-    path('api/habits/<int:habit_id>/', HabitDetailView.as_view(), name='api-habit-detail'),
-    # Complete task API endpoint
-    path('api/tasks/complete/', CompleteTaskView.as_view(), name='api-complete-task'),
-    # Delete habit API endpoint
-    path('api/habits/<int:habit_id>/delete/', DeleteHabitView.as_view(), name='api-delete-habit'),
-    # Analysis API endpoint (GET and POST)
-    path('api/analysis/', AnalysisView.as_view(), name='api-analysis'),
-    
+urlpatterns = api_urlpatterns + [
     path('admin/', admin.site.urls),
     # Django auth views - CSRF exempt for React SPA
     path('Login/', method_decorator(csrf_exempt, name='dispatch')(auth_views.LoginView).as_view(template_name='Users/login.html'), name='login'),
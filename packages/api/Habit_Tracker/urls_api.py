@@ -0,0 +1,51 @@
+"""Habit_Tracker API URL Configuration
+
+The JSON endpoints used by the SPA, without the admin and the server-rendered
+pages. Used as ROOT_URLCONF by ``Habit_Tracker.settings_api``; the full
+``Habit_Tracker.urls`` includes ``api_urlpatterns`` from here.
+"""
+from django.conf import settings
+from django.urls import path
+from Users.api import LoginAPIView, LogoutAPIView, RegisterAPIView
+from habit.health import (
+    HealthCheckView, AuthCheckView, ProfileView, HabitsView, TasksView,
+    HabitDetailView, CompleteTaskView, DeleteHabitView, AnalysisView, LivenessView
+)
+
+if settings.API_ASYNC_VIEWS:
+    # Under an ASGI server, the read endpoints use the async ORM
+    from habit.async_views import (  # noqa: F811
+        AsyncHealthCheckView as HealthCheckView, AsyncAuthCheckView as AuthCheckView,
+        AsyncProfileView as ProfileView, AsyncHabitsView as HabitsView, AsyncTasksView as TasksView,
+        AsyncHabitDetailView as HabitDetailView, AsyncAnalysisView as AnalysisView,
+    )
+
+api_urlpatterns = [
+    # Health check endpoint
+    path('health/', HealthCheckView.as_view(), name='health-check'),
+    # Liveness endpoint (no dependencies touched)
+    path('health/live/', LivenessView.as_view(), name='health-live'),
+    # Authentication check endpoint
+    path('api/auth/check/', AuthCheckView.as_view(), name='auth-check'),
+    # Profile API endpoint
+    path('api/profile/', ProfileView.as_view(), name='api-profile'),
+    # Habits API endpoint (GET for list, POST for create)
+    path('api/habits/', HabitsView.as_view(), name='api-habits'),
+    # Tasks API endpoint
+    path('api/tasks/', TasksView.as_view(), name='api-tasks'),
+    # Habit detail API endpoint
+    path('api/habits/<int:habit_id>/', HabitDetailView.as_view(), name='api-habit-detail'),
+    # Complete task API endpoint
+    path('api/tasks/complete/', CompleteTaskView.as_view(), name='api-complete-task'),
+    # Delete habit API endpoint
+    path('api/habits/<int:habit_id>/delete/', DeleteHabitView.as_view(), name='api-delete-habit'),
+    # Analysis API endpoint (GET and POST)
+    path('api/analysis/', AnalysisView.as_view(), name='api-analysis'),
+]
+
+urlpatterns = api_urlpatterns + [
+    # The SPA posts its auth forms to the same paths as the server-rendered views
+    path('Login/', LoginAPIView.as_view(), name='login'),
+    path('Register/', RegisterAPIView.as_view(), name='register'),
+    path('Logout/', LogoutAPIView.as_view(), name='logout'),
+]
@@ -0,0 +1,181 @@
+"""
+Warm-up of Django's lazily initialized state during Lambda init.
+
+Django defers a lot of work to the first request: populating the URL resolver
+and compiling its regexes, compiling templates, filling model metadata caches,
+compiling the first queries and opening the database and cache connections.
+Running that work while the execution environment initializes, before any
+request is waiting, makes the first request as fast as the following ones.
+
+A database connection belongs to the thread that opened it, so the warm-up
+must run on the thread that serves requests for them to reuse its connections
+(``Habit_Tracker.asgi_lambda.run_on_request_thread`` in Lambda).
+"""
+import importlib
+import logging
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import DatabaseError, router
+from django.http import HttpResponse
+from django.http.request import split_domain_port
+from django.template import engines
+from django.urls import URLPattern, URLResolver, get_resolver
+
+logger = logging.getLogger(__name__)
+
+# Modules the API views import inside their handlers. habit.ranking is left out
+# on purpose: it pulls in NumPy, which only large ranking inputs need.
+DEFERRED_IMPORTS = ('habit.analytics', 'habit.forms', 'django.core.serializers')
+
+
+def warm_urls():
+    """
+    Populate the URL resolver and compile every route's regex.
+
+    Returns:
+        int: The number of routes
+    """
+    resolver = get_resolver()
+    # Building the reverse dictionary populates the resolver and its namespaces
+    resolver.reverse_dict
+    # The root pattern ('^/'), matched first by every request
+    resolver.pattern.regex
+
+    def walk(patterns):
+        count = 0
+        for pattern in patterns:
+            pattern.pattern.regex
+            if isinstance(pattern, URLResolver):
+                count += walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern):
+                count += 1
+        return count
+
+    return walk(resolver.url_patterns)
+
+
+def warm_templates():
+    """
+    Compile every template found in the template directories.
+
+    With the cached template loader (the default when DEBUG is off), compiled
+    templates are kept for the lifetime of the process.
+
+    Returns:
+        int: The number of compiled templates
+    """
+    count = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if not name.endswith(('.html', '.txt')):
+                        continue
+                    template_name = os.path.relpath(os.path.join(root, name), directory)
+                    try:
+                        engine.get_template(template_name.replace(os.sep, '/'))
+                        count += 1
+                    except Exception:
+                        logger.debug("Could not compile template %s", template_name, exc_info=True)
+    return count
+
+
+def warm_http():
+    """
+    Compile the regexes Django compiles lazily while handling a request.
+
+    These validate the Host header, read the charset of a response and check
+    the separator of signed values (sessions, CSRF and signed cookies).
+
+    Returns:
+        int: The number of compiled regexes
+    """
+    split_domain_port('localhost')
+    HttpResponse(content_type='application/json; charset=utf-8').charset
+    signing.TimestampSigner()
+    return 3
+
+
+def warm_models():
+    """
+    Run one trivial query per model on the connection its reads are routed to.
+
+    This fills the model metadata caches, compiles a query per model and opens
+    every database connection the API reads from.
+
+    Returns:
+        int: The number of queried models
+    """
+    count = 0
+    for model in apps.get_models():
+        if model._meta.proxy or not model._meta.managed:
+            continue
+        try:
+            list(model._default_manager.using(router.db_for_read(model)).filter(pk=0).order_by().values_list('pk')[:1])
+            count += 1
+        except DatabaseError:
+            logger.debug("Could not query %s", model._meta.label, exc_info=True)
+    return count
+
+
+def warm_imports():
+    """
+    Import the modules the API views defer to their first call.
+
+    Returns:
+        int: The number of imported modules
+    """
+    for name in DEFERRED_IMPORTS:
+        importlib.import_module(name)
+    return len(DEFERRED_IMPORTS)
+
+
+def warm_caches():
+    """
+    Create every cache backend and open its connection with one read.
+
+    Returns:
+        int: The number of caches
+    """
+    for alias in settings.CACHES:
+        caches[alias].get('warmup')
+    return len(settings.CACHES)
+
+
+def warm_probes():
+    """
+    Run one round of the health check's probes.
+
+    This starts each probe's thread and opens the database connection the
+    database probe keeps reusing. The report itself is not cached.
+
+    Returns:
+        int: The number of probes
+    """
+    from habit.probes import PROBES, run_probes
+
+    run_probes(PROBES, settings.HEALTH_CHECK_TIMEOUT)
+    return len(PROBES)
+
+
+def warm_up():
+    """
+    Run every warm-up step, logging failures instead of raising them.
+
+    Returns:
+        dict: The number of routes, regexes, templates, models, imports, caches
+        and probes warmed by each step that succeeded
+    """
+    steps = {'routes': warm_urls, 'http': warm_http, 'templates': warm_templates, 'models': warm_models,
+             'imports': warm_imports, 'caches': warm_caches, 'probes': warm_probes}
+    warmed = {}
+    for name, step in steps.items():
+        try:
+            warmed[name] = step()
+        except Exception as e:
+            logger.warning("Warm-up of %s failed: %s", name, e, exc_info=True)
+    return warmed
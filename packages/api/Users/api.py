@@ -0,0 +1,73 @@
+"""
+JSON authentication endpoints for the API-only URLconf.
+
+They accept the same form posts as the server-rendered login, register and
+logout views, but answer with JSON instead of rendering templates or
+redirecting to HTML pages, so the API profile needs neither.
+"""
+from django.contrib.auth import login as auth_login, logout as auth_logout
+from django.contrib.auth.forms import AuthenticationForm
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from .forms import UserRegisterForm
+
+
+def form_errors(form, message):
+    """
+    Build the 400 response for an invalid form.
+
+    Parameters
+    ----------
+    form : Form
+        The bound, invalid form.
+    message : str
+        Summary shown to the user.
+
+    Returns
+    -------
+    JsonResponse
+        The errors of every field under ``form.errors``.
+    """
+    return JsonResponse({'message': message, 'form': {'errors': form.errors}}, status=400)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LoginAPIView(View):
+    """
+    Log a user in from a username/password form post.
+    """
+
+    def post(self, request):
+        form = AuthenticationForm(request, data=request.POST)
+        if not form.is_valid():
+            return form_errors(form, 'Invalid username or password')
+        user = form.get_user()
+        auth_login(request, user)
+        return JsonResponse({'authenticated': True, 'user_id': user.id, 'username': user.username})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class RegisterAPIView(View):
+    """
+    Create a user account from the registration form post.
+    """
+
+    def post(self, request):
+        form = UserRegisterForm(request.POST)
+        if not form.is_valid():
+            return form_errors(form, 'Registration failed')
+        user = form.save()
+        return JsonResponse({'success': True, 'username': user.username}, status=201)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LogoutAPIView(View):
+    """
+    Log the current user out.
+    """
+
+    def post(self, request):
+        auth_logout(request)
+        return JsonResponse({'success': True})
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
+from Habit_Tracker import auth_cache
+from habit.cached import invalidate_user
 from .models import Profile
 
 @receiver(post_save, sender=User)
@@ -39,3 +41,41 @@ def save_profile(sender, instance, **kwargs):
         None
     """
     instance.profile.save()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop the cached record of a user that changed or was deleted.
+
+    Parameters:
+    ----------
+        sender: The sender of the signal.
+        instance (User): The instance of the User model being saved or deleted.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+    -------
+        None
+    """
+    auth_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    """
+    Invalidate the cached records of a user whose profile changed or was deleted.
+
+    Parameters:
+    ----------
+        sender: The sender of the signal.
+        instance (Profile): The instance of the Profile model being saved or deleted.
+        **kwargs: Additional keyword arguments.
+
+    Returns:
+    -------
+        None
+    """
+    invalidate_user(instance.user_id)
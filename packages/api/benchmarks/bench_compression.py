@@ -0,0 +1,117 @@
+"""
+Benchmark CompressionMiddleware on representative API payloads.
+
+Reports bytes saved and CPU time per response for each content coding, so the
+gzip level / brotli quality can be tuned against Lambda's per-ms billing.
+
+Usage:
+    python benchmarks/bench_compression.py [--repeat 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Habit_Tracker.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from Habit_Tracker.middleware import brotli, compress_body  # noqa: E402
+
+
+def habit_entry(i):
+    """A habit as serialized by the analysis endpoint."""
+    return {
+        'id': i,
+        'name': f'habit number {i}',
+        'period': ('daily', 'weekly', 'monthly')[i % 3],
+        'frequency': 1 + i % 2,
+        'goal': 30,
+        'notes': 'Daily meditation practice for mental well-being and stress relief.',
+        'num_of_tasks': 30,
+        'in_progress': 0,
+        'progress': 0,
+        'streak': [{
+            'current_streak': i % 7,
+            'longest_streak': i % 11,
+            'num_of_completed_tasks': i % 13,
+            'num_of_failed_tasks': i % 5,
+        }],
+    }
+
+
+def analysis_payload(num_habits):
+    """Analysis payload: every habit appears in all_habits and one period list."""
+    habits = [habit_entry(i) for i in range(num_habits)]
+    return {
+        'all_habits': habits,
+        'daily_habits': [h for h in habits if h['period'] == 'daily'],
+        'weekly_habits': [h for h in habits if h['period'] == 'weekly'],
+        'monthly_habits': [h for h in habits if h['period'] == 'monthly'],
+        'completed_habits': [],
+        'longest_streak_habit': habits[0] if habits else None,
+        'longest_current_streak_habit': habits[-1] if habits else None,
+    }
+
+
+def habit_detail_payload(num_tasks):
+    """Habit detail payload with its full task journal."""
+    start = datetime(2024, 4, 1, 8, 0)
+    return {
+        'habit': {k: v for k, v in habit_entry(1).items() if k != 'streak'},
+        'tasks': [{
+            'id': i,
+            'task_number': i,
+            'task_status': ('Completed', 'Failed', 'In progress')[i % 3],
+            'due_date': (start + timedelta(days=i + 1)).isoformat(),
+            'start_date': (start + timedelta(days=i)).isoformat(),
+            'task_completion_date': (start + timedelta(days=i, hours=3)).isoformat(),
+        } for i in range(1, num_tasks + 1)],
+        'streak': habit_entry(1)['streak'][0],
+        'achievements': [],
+    }
+
+
+PAYLOADS = {
+    'analysis (10 habits)': lambda: analysis_payload(10),
+    'analysis (100 habits)': lambda: analysis_payload(100),
+    'habit detail (30 tasks)': lambda: habit_detail_payload(30),
+    'habit detail (365 tasks)': lambda: habit_detail_payload(365),
+}
+
+
+def codings():
+    yield 'gzip-1', 'gzip', {'gzip_level': 1}
+    yield 'gzip-6', 'gzip', {'gzip_level': 6}
+    yield 'gzip-9', 'gzip', {'gzip_level': 9}
+    if brotli is not None:
+        yield 'br-1', 'br', {'brotli_quality': 1}
+        yield 'br-5', 'br', {'brotli_quality': 5}
+        yield 'br-11', 'br', {'brotli_quality': 11}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'payload':<26}{'coding':<8}{'raw B':>9}{'out B':>9}{'saved':>8}{'us/op':>10}")
+    for payload_name, build in PAYLOADS.items():
+        body = json.dumps(build()).encode()
+        for label, encoding, options in codings():
+            start = time.process_time()
+            for _ in range(args.repeat):
+                compressed = compress_body(body, encoding, **options)
+            elapsed = (time.process_time() - start) / args.repeat
+            saved = 1 - len(compressed) / len(body)
+            print(f'{payload_name:<26}{label:<8}{len(body):>9}{len(compressed):>9}'
+                  f'{saved:>8.1%}{elapsed * 1e6:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
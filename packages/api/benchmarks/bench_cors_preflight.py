@@ -0,0 +1,150 @@
+"""
+Measure CORS preflight latency under concurrent load, before and after the short-circuit.
+
+Each mode boots the API settings in a fresh interpreter against a throwaway
+SQLite database and sends OPTIONS preflights from an allowed origin straight
+to the WSGI handler from a pool of threads. "before" reproduces the old
+behaviour (CorsMiddleware low in the stack, running the rest of the chain and
+the view before rewriting the response); "after" is the current middleware
+stack, where the preflight is answered by the first middleware.
+
+Usage:
+    python benchmarks/bench_cors_preflight.py [--requests 5000] [--concurrency 8]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ORIGIN = 'https://app.example.com'
+PATHS = ['/api/habits/', '/api/tasks/', '/api/auth/check/']
+
+SETTINGS = """\
+import os
+os.environ['CORS_ALLOWED_ORIGINS'] = {origin!r}
+from Habit_Tracker.settings_api import *  # noqa: F401,F403
+
+DATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {database!r}}}}}
+CACHES = {{'default': {{'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}}}
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+if os.environ.get('BENCH_MODE') == 'before':
+    # The API stack with CorsMiddleware at its old position, after the security and host middleware
+    MIDDLEWARE = [
+        'django.middleware.security.SecurityMiddleware',
+        'Habit_Tracker.middleware.ConnectionLifecycleMiddleware',
+        'Habit_Tracker.middleware.CompressionMiddleware',
+        'Habit_Tracker.middleware.AllowAllHostsMiddleware',
+        'bench_settings.FullStackCorsMiddleware',
+        'Habit_Tracker.middleware.StripStagePrefixMiddleware',
+        'Habit_Tracker.middleware.ReplicaPinningMiddleware',
+        'Habit_Tracker.middleware.SessionWriteMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'Habit_Tracker.middleware.CachedAuthenticationMiddleware',
+    ]
+
+
+def _full_stack_cors():
+    from Habit_Tracker.middleware import CorsMiddleware
+
+    class FullStackCorsMiddleware(CorsMiddleware):
+        # Old behaviour: always run the view, then add the headers
+        def __call__(self, request):
+            response = self.get_response(request)
+            headers = self.headers_for(request.META.get('HTTP_ORIGIN'))
+            if headers is not None:
+                for name, value in headers.items():
+                    response.headers[name] = value
+            return response
+
+    return FullStackCorsMiddleware
+
+
+def __getattr__(name):
+    if name == 'FullStackCorsMiddleware':
+        return _full_stack_cors()
+    raise AttributeError(name)
+"""
+
+MEASURE = """\
+import io, json, statistics, sys, time
+from concurrent.futures import ThreadPoolExecutor
+import django
+django.setup()
+from django.core.handlers.wsgi import WSGIHandler
+
+handler = WSGIHandler()
+origin, requests, concurrency, paths = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), sys.argv[4:]
+
+
+def preflight(i):
+    environ = {
+        'REQUEST_METHOD': 'OPTIONS', 'PATH_INFO': paths[i % len(paths)], 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'wsgi.url_scheme': 'https',
+        'wsgi.input': io.BytesIO(b''), 'wsgi.errors': sys.stderr,
+        'HTTP_ORIGIN': origin, 'HTTP_ACCESS_CONTROL_REQUEST_METHOD': 'POST',
+    }
+    status = []
+    start = time.perf_counter()
+    body = b''.join(handler(environ, lambda s, headers, exc_info=None: status.append((s, dict(headers)))))
+    elapsed = (time.perf_counter() - start) * 1000
+    code, headers = status[0]
+    assert code.startswith('200') and headers.get('Access-Control-Allow-Origin') == origin, (code, body[:200])
+    return elapsed
+
+
+for i in range(200):
+    preflight(i)
+start = time.perf_counter()
+with ThreadPoolExecutor(concurrency) as pool:
+    samples = sorted(pool.map(preflight, range(requests)))
+wall = time.perf_counter() - start
+print(json.dumps({
+    'p50': statistics.median(samples),
+    'p99': samples[int(len(samples) * 0.99) - 1],
+    'rps': requests / wall,
+}))
+"""
+
+
+def run(code, env, *args):
+    """Run Python code in a fresh interpreter and return its stdout."""
+    result = subprocess.run([sys.executable, '-c', code, *args], cwd=API_DIR, env=env,
+                            capture_output=True, text=True, check=False)
+    if result.returncode:
+        raise RuntimeError(result.stderr[-2000:])
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, 'bench_settings.py'), 'w') as settings_file:
+            settings_file.write(SETTINGS.format(origin=ORIGIN, database=os.path.join(directory, 'bench.sqlite3')))
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='bench_settings',
+                   PYTHONPATH=os.pathsep.join([directory, API_DIR]))
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0'],
+                       cwd=API_DIR, env=env, check=True)
+
+        results = {}
+        for mode in ('before', 'after'):
+            results[mode] = json.loads(run(MEASURE, dict(env, BENCH_MODE=mode), ORIGIN,
+                                           str(args.requests), str(args.concurrency), *PATHS))
+
+    print(f"{'mode':<8}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>10}")
+    for mode, result in results.items():
+        print(f"{mode:<8}{result['p50']:>9.3f}{result['p99']:>9.3f}{result['rps']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Measure first- vs second-request latency with and without the init warm-up.
+
+Each mode imports ``lambda_handler`` in a fresh interpreter against a
+throwaway SQLite database, with or without the init warm-up
+(``LAMBDA_WARMUP``), then times two API Gateway (HTTP API v2) events to each
+endpoint through ``lambda_handler`` and Mangum, so requests run on the same
+thread as in Lambda. The data caches (cache, auth and tiered cache local
+copies, health report) are emptied before every request, so both requests do
+the same work and only Django's lazy first-request work differs. With the
+warm-up, the first request should cost about as much as the second. The number
+of database connections the requests opened is reported too.
+
+Usage:
+    python benchmarks/bench_first_request.py [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ['/health/', '/api/auth/check/', '/api/habits/', '/api/tasks/', '/api/analysis/']
+
+SETTINGS = """\
+from Habit_Tracker.settings_api import *  # noqa: F401,F403
+
+DATABASES = {{'default': {{'ENGINE': 'django.db.backends.sqlite3', 'NAME': {database!r}, 'CONN_MAX_AGE': 600}}}}
+CACHES = {{'default': {{'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}}}
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+"""
+
+SEED = """\
+import django
+django.setup()
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.utils import timezone
+from habit.models import Habit
+user = User.objects.create_user(username='bench', password='bench-password')
+for i in range(5):
+    Habit.objects.create(user=user, name=f'habit {i}', frequency=1, period='daily', goal=30,
+                         notes='', start_date=timezone.now())
+session = SessionStore()
+session['_auth_user_id'] = str(user.pk)
+session['_auth_user_backend'] = 'django.contrib.auth.backends.ModelBackend'
+session['_auth_user_hash'] = user.get_session_auth_hash()
+session.save()
+print(session.session_key)
+"""
+
+MEASURE = """\
+import io, json, sys, time
+from contextlib import redirect_stdout
+# Init runs the warm-up when LAMBDA_WARMUP is set; its EMF records go to stdout
+with redirect_stdout(io.StringIO()):
+    import lambda_handler
+from django.conf import settings
+from django.core.cache import cache
+from Habit_Tracker import auth_cache, db_connections, tiered_cache
+from habit.probes import reset_report
+
+# Only connections opened while serving requests
+db_connections.reset_stats()
+
+def forget_cached_data():
+    # Both requests miss the data caches, so only the cold-start work differs
+    cache.clear()
+    auth_cache.clear_local()
+    tiered_cache.clear_local()
+    reset_report()
+
+def event(path):
+    return {
+        'version': '2.0', 'routeKey': '$default', 'rawPath': path, 'rawQueryString': '',
+        'cookies': [f'{settings.SESSION_COOKIE_NAME}={sys.argv[1]}'],
+        'headers': {'host': 'localhost'},
+        'requestContext': {'http': {'method': 'GET', 'path': path, 'protocol': 'HTTP/1.1',
+                                    'sourceIp': '127.0.0.1'},
+                           'requestId': 'bench', 'stage': '$default'},
+        'isBase64Encoded': False,
+    }
+
+timings = {}
+for path in sys.argv[2:]:
+    samples = []
+    for _ in range(2):
+        forget_cached_data()
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            response = lambda_handler.lambda_handler(event(path), None)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response['statusCode'] == 200, (path, response['statusCode'])
+    timings[path] = samples
+print(json.dumps({'timings': timings, 'connects': db_connections.get_stats()['connects']}))
+"""
+
+
+def run(code, env, *args):
+    """Run Python code in a fresh interpreter and return its stdout."""
+    result = subprocess.run([sys.executable, '-c', code, *args], cwd=API_DIR, env=env,
+                            capture_output=True, text=True, check=False)
+    if result.returncode:
+        raise RuntimeError(result.stderr[-2000:])
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, 'bench_settings.py'), 'w') as settings_file:
+            settings_file.write(SETTINGS.format(database=os.path.join(directory, 'bench.sqlite3')))
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='bench_settings',
+                   PYTHONPATH=os.pathsep.join([directory, API_DIR]))
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0'],
+                       cwd=API_DIR, env=env, check=True)
+        session_key = run(SEED, env)
+
+        results, connects = {}, {}
+        for mode, warmup in (('cold', 'false'), ('warmup', 'true')):
+            mode_env = dict(env, LAMBDA_WARMUP=warmup)
+            runs = [json.loads(run(MEASURE, mode_env, session_key, *ENDPOINTS)) for _ in range(args.runs)]
+            results[mode] = {
+                path: [statistics.median(r['timings'][path][i] for r in runs) for i in range(2)]
+                for path in ENDPOINTS
+            }
+            connects[mode] = max(r['connects'] for r in runs)
+
+    print(f"{'mode':<8}{'endpoint':<20}{'1st ms':>9}{'2nd ms':>9}{'1st/2nd':>9}")
+    for mode, timings in results.items():
+        for path, (first, second) in timings.items():
+            print(f'{mode:<8}{path:<20}{first:>9.1f}{second:>9.1f}{first / second:>9.1f}')
+    for mode, count in connects.items():
+        print(f'{mode}: {count} DB connection(s) opened by the requests')
+
+
+if __name__ == '__main__':
+    main()
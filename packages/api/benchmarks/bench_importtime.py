@@ -0,0 +1,120 @@
+"""
+Benchmark the import cost of booting Django under each settings profile.
+
+Every run starts a fresh interpreter with ``-X importtime`` that sets up Django,
+builds the ASGI application and loads the URLconf, like a Lambda cold start.
+The report shows the boot wall time, the import time and number of modules
+seen by ``-X importtime``, and the top-level packages that cost the most
+(medians over the runs). Modules loaded with ``importlib.import_module`` (settings,
+apps, URLconfs) are missing from ``-X importtime``, so the wall time is the
+number to compare; the breakdown shows where it goes.
+
+Usage:
+    python benchmarks/bench_importtime.py [--runs 5] [--top 12]
+        [--settings Habit_Tracker.settings Habit_Tracker.settings_api]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "from django.core.asgi import get_asgi_application\n"
+    "get_asgi_application()\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``-X importtime`` output.
+
+    Args:
+        stderr: The interpreter's stderr
+
+    Returns:
+        dict: Self time in microseconds by module name
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(1))
+    return modules
+
+
+def measure(settings_module):
+    """Boot Django once in a fresh interpreter; return its boot seconds and import times."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT],
+        cwd=API_DIR, env=env, capture_output=True, text=True, check=False,
+    )
+    if result.returncode:
+        raise RuntimeError(f'{settings_module} failed to boot:\n{result.stderr[-2000:]}')
+    return float(result.stdout.split()[-1]), parse_importtime(result.stderr)
+
+
+def summarize(measurements):
+    """Median boot time, import time, module count and per-package self time over several runs."""
+    runs = [modules for _, modules in measurements]
+    packages = defaultdict(list)
+    for modules in runs:
+        per_package = defaultdict(int)
+        for name, self_us in modules.items():
+            per_package[name.split('.')[0]] += self_us
+        for package, total in per_package.items():
+            packages[package].append(total)
+    return {
+        'boot_ms': statistics.median(seconds for seconds, _ in measurements) * 1000,
+        'total_ms': statistics.median(sum(m.values()) for m in runs) / 1000,
+        'modules': statistics.median(len(m) for m in runs),
+        'packages': {name: statistics.median(times) / 1000 for name, times in packages.items()},
+        'modules_seen': set().union(*runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=12)
+    parser.add_argument('--settings', nargs='+',
+                        default=['Habit_Tracker.settings', 'Habit_Tracker.settings_api'])
+    args = parser.parse_args()
+
+    reports = {name: summarize([measure(name) for _ in range(args.runs)]) for name in args.settings}
+
+    print(f"{'settings':<32}{'boot ms':>9}{'import ms':>11}{'modules':>9}")
+    for name, report in reports.items():
+        print(f"{name:<32}{report['boot_ms']:>9.1f}{report['total_ms']:>11.1f}{report['modules']:>9.0f}")
+
+    for name, report in reports.items():
+        print(f'\nSlowest packages under {name}')
+        ranked = sorted(report['packages'].items(), key=lambda item: item[1], reverse=True)
+        for package, ms in ranked[:args.top]:
+            print(f'  {package:<30}{ms:>9.1f} ms')
+
+    if len(reports) > 1:
+        baseline, *others = reports.items()
+        for name, report in others:
+            saved = baseline[1]['boot_ms'] - report['boot_ms']
+            skipped = sorted(set(baseline[1]['packages']) - set(report['packages']))
+            modules = len(baseline[1]['modules_seen'] - report['modules_seen'])
+            print(f'\n{name} vs {baseline[0]}: {saved:.1f} ms faster boot '
+                  f'({saved / baseline[1]["boot_ms"]:.0%}), {modules} fewer modules')
+            print(f"  packages no longer imported: {', '.join(skipped) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
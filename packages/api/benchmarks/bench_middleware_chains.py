@@ -0,0 +1,99 @@
+"""
+Measure the per-request overhead of each route's middleware chain.
+
+Sends GETs for a health, an API and an HTML path through the WSGI handler
+with trivial views, so the time measured is the middleware's. Compares the
+routed chains of MIDDLEWARE_ROUTES with the single flat MIDDLEWARE list every
+route used to run, and reports each against a handler without middleware.
+
+Usage:
+    python benchmarks/bench_middleware_chains.py [--requests 20000]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Habit_Tracker.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.urls import path  # noqa: E402
+
+PATHS = {'health': '/health/', 'api': '/api/habits/', 'html': '/Habit-Manager/'}
+
+# The MIDDLEWARE list every route ran before MIDDLEWARE_ROUTES
+FLAT_MIDDLEWARE = [
+    'Habit_Tracker.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'Habit_Tracker.middleware.ConnectionLifecycleMiddleware',
+    'Habit_Tracker.middleware.CompressionMiddleware',
+    'Habit_Tracker.middleware.AllowAllHostsMiddleware',
+    'Habit_Tracker.middleware.StripStagePrefixMiddleware',
+    'Habit_Tracker.middleware.ReplicaPinningMiddleware',
+    'Habit_Tracker.middleware.SessionWriteMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'Habit_Tracker.middleware.CachedAuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+def view(request):
+    return HttpResponse('ok')
+
+
+urlpatterns = [path(route_path.lstrip('/'), view) for route_path in PATHS.values()]
+
+
+def time_requests(handler, request_path, requests):
+    """Return the median time in microseconds of a GET through ``handler``, over 5 rounds."""
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': request_path, 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '443', 'wsgi.url_scheme': 'https',
+        'wsgi.errors': sys.stderr, 'HTTP_ACCEPT_ENCODING': 'gzip, br',
+    }
+
+    def start_response(status, headers, exc_info=None):
+        assert status.startswith('200'), status
+
+    rounds = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(requests // 5):
+            b''.join(handler(dict(environ, **{'wsgi.input': io.BytesIO(b'')}), start_response))
+        rounds.append((time.perf_counter() - start) / (requests // 5) * 1e6)
+    return statistics.median(rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    stacks = {'none': {'MIDDLEWARE': []}, 'flat': {'MIDDLEWARE': FLAT_MIDDLEWARE}, 'routed': {}}
+    results = {}
+    for stack, overrides in stacks.items():
+        with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=['*'], **overrides):
+            handler = WSGIHandler()
+            results[stack] = {route: time_requests(handler, request_path, args.requests)
+                              for route, request_path in PATHS.items()}
+
+    print(f"{'route':<8}{'flat us':>9}{'routed us':>11}{'flat overhead':>15}{'routed overhead':>17}")
+    for route in PATHS:
+        base = results['none'][route]
+        flat, routed = results['flat'][route], results['routed'][route]
+        print(f'{route:<8}{flat:>9.1f}{routed:>11.1f}{flat - base:>15.1f}{routed - base:>17.1f}')
+
+
+if __name__ == '__main__':
+    main()
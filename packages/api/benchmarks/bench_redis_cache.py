@@ -0,0 +1,86 @@
+"""
+Compare the stock Redis cache backend with the tuned django-redis configuration.
+
+Runs against a real Redis server (``docker compose up cache`` from packages/,
+or REDIS_HOST / REDIS_PORT). For each backend, reports the time to write and
+read N keys one at a time and with one pipelined set_many / MGET get_many,
+and the bytes Redis stores for an analysis-sized snapshot. The keys share the
+``{bench}`` hash tag: on a cluster endpoint such as ElastiCache Serverless, an
+MGET of keys in different hash slots fails with CROSSSLOT.
+
+Usage:
+    REDIS_HOST=localhost python benchmarks/bench_redis_cache.py [--keys 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('REDIS_HOST', 'localhost')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Habit_Tracker.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from Habit_Tracker import cache as cache_helpers  # noqa: E402
+
+
+def snapshot():
+    """An analysis-sized payload, like the per-user snapshots cached by the API."""
+    return {'all_habits': [{'id': i, 'name': f'habit number {i}', 'period': 'daily', 'goal': 30,
+                            'notes': 'Daily meditation practice for mental well-being.',
+                            'streak': [{'current_streak': i % 7, 'longest_streak': 12}]} for i in range(200)]}
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def measure(alias, keys):
+    cache = caches[alias]
+    values = {f'{{bench}}:{i}': {'id': i, 'name': f'habit {i}'} for i in range(keys)}
+    cache.delete_many(list(values))
+    results = {
+        'set x N': timed(lambda: [cache.set(key, value, 60) for key, value in values.items()]),
+        'get x N': timed(lambda: [cache.get(key) for key in values]),
+        'set_many': timed(lambda: cache.set_many(values, 60)),
+        'get_many': timed(lambda: cache.get_many(list(values))),
+    }
+    cache.set('{bench}:snapshot', snapshot(), 60)
+    client = cache_helpers.get_redis_client(alias)
+    results['snapshot bytes'] = client.strlen(cache.make_key('{bench}:snapshot'))
+    cache.delete_many([*values, '{bench}:snapshot'])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--keys', type=int, default=200)
+    args = parser.parse_args()
+
+    tuned = settings.CACHES['default']
+    backends = {
+        'stock': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': tuned['LOCATION']},
+        'django-redis': tuned,
+    }
+    results = {}
+    with override_settings(CACHES=backends):
+        for alias in backends:
+            caches[alias].get('warmup')
+            results[alias] = measure(alias, args.keys)
+
+    print(f"{'':<16}" + ''.join(f'{alias:>14}' for alias in backends))
+    for metric in results['stock']:
+        unit = '' if metric == 'snapshot bytes' else ' ms'
+        print(f'{metric + unit:<16}' + ''.join(f'{results[alias][metric]:>14.1f}' for alias in backends))
+
+
+if __name__ == '__main__':
+    main()
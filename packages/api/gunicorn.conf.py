@@ -0,0 +1,56 @@
+"""
+Gunicorn configuration serving the API as an ASGI application in a container.
+
+Each worker is a uvicorn event loop, so with ``API_ASYNC_VIEWS=true`` a worker
+multiplexes many concurrent requests waiting on the database instead of
+blocking on one. The application is imported once in the master and shared
+copy-on-write by the forked workers; connections are only opened after fork.
+Workers are recycled after a jittered number of requests and finish their
+in-flight requests on shutdown.
+
+Usage:
+    gunicorn Habit_Tracker.asgi:application
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = 'uvicorn.workers.UvicornWorker'
+# Async workers are not blocked by I/O: one per core keeps every core busy
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# Import Django and the URL conf once, before forking
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Graceful recycling: bounds slow leaks without restarting every worker at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+
+def post_fork(server, worker):
+    """Drop database and cache connections inherited from the master."""
+    from django.core.cache import caches
+    from django.db import connections
+
+    connections.close_all()
+    caches.close_all()
+
+
+def post_worker_init(worker):
+    """Warm up Django's lazy state before the worker accepts requests."""
+    if os.environ.get('SERVER_WARMUP', 'true').lower() != 'true':
+        return
+    from django.db import connections
+    from Habit_Tracker.warmup import warm_up
+
+    warmed = warm_up()
+    # Requests run their queries in their own threads, not on this one
+    connections.close_all()
+    worker.log.info("Warm-up completed: %s", warmed)
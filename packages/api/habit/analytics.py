@@ -13,10 +13,29 @@ and analysis of habit data.
 
 from datetime import timedelta
 from functools import partial
-import numpy as np
+import math
 from django.utils import timezone
 from django.db.models import Min, Prefetch
 from habit.models import TaskTracker, Habit, Streak, Achievement
+from habit import streak_index
+
+# Weights used to rank the habits users struggled most with
+STRUGGLE_WEIGHTS = {
+    'completed_tasks': -0.2,
+    'failed_tasks': 0.8,
+    'longest_streak': -0.2,
+    'current_streak': -0.1
+}
+
+# Periods shown in the "struggled most" analysis
+RANKED_PERIODS = ('daily', 'weekly')
+
+# Streak counters a habit's score is computed from
+SCORED_STREAK_FIELDS = ('num_of_completed_tasks', 'num_of_failed_tasks', 'longest_streak', 'current_streak')
+
+# Up to this many habits are scored and ranked in pure Python; larger inputs use
+# NumPy (habit.ranking), which is only imported the first time it pays off
+SMALL_INPUT_SIZE = 64
 
 
 def all_tracked_habits(user_id):
@@ -81,12 +100,17 @@ def longest_current_streak_over_all_habits():
     """
     Retrieve the habit ID of the habit with the longest current streak from the Streak table.
 
+    Reads the Redis streak index when it is available and falls back to the database.
+
     Returns
     -------
     int
         The habit ID of the habit with the longest current streak.
 
     """
+    top = streak_index.top_habits('current_streak')
+    if top:
+        return Habit.objects.filter(id=top[0][0]).prefetch_related('streak')
     first_streak = Streak.objects.order_by('-current_streak').first()
     if first_streak is None:
         return Habit.objects.none()  # Return an empty queryset if no streaks are found
@@ -97,12 +121,17 @@ def longest_streak_over_all_habits():
     """
     Retrieve the habit ID of the habit with the longest streak from the Streak table.
 
+    Reads the Redis streak index when it is available and falls back to the database.
+
     Returns
     -------
     int
         The habit ID of the habit with the longest streak.
 
     """
+    top = streak_index.top_habits('longest_streak')
+    if top:
+        return Habit.objects.filter(id=top[0][0]).prefetch_related('streak')
     first_streak = Streak.objects.order_by('-longest_streak').first()
     if first_streak is None:
         return Habit.objects.none()  # Return an empty queryset if no streaks are found
@@ -275,31 +304,208 @@ def calculate_score(completed_tasks, failed_tasks, longest_streak, current_strea
     return score
 
 
+def ordered_sum(values):
+    """
+    Sum floats one after the other, from left to right.
+
+    ``habit.ranking`` sums in the same order (``numpy.cumsum``), so both paths
+    compute bit-for-bit identical z-scores. The built-in ``sum`` compensates
+    float rounding errors since Python 3.12 and would not match.
+
+    Parameters
+    ----------
+    values : list
+        The floats to sum.
+
+    Returns
+    -------
+    float
+        The sum of the values.
+
+    """
+    total = 0.0
+    for value in values:
+        total += value
+    return total
+
+
 def normalize_scores(scores):
     """
     Normalize the scores to ensure they are on the same scale.
 
+    Inputs larger than ``SMALL_INPUT_SIZE`` are normalized with NumPy.
+
     Parameters
     ----------
-    scores : list
+    scores : list or numpy.ndarray
         A list of scores to be normalized.
 
     Returns
     -------
     list
-        A list of normalized scores.
+        A list of normalized scores (z-scores), or NaNs if all scores are equal.
 
     """
-    mu = np.mean(scores)
-    sigma = np.std(scores)
-    z_scores = []
-    for x in scores:
-        if sigma != 0:
-            z_scores.append((x - mu) / sigma)
-        else:
-            z_scores.append(np.nan)  # or handle the case where sigma is zero appropriately
+    if len(scores) > SMALL_INPUT_SIZE:
+        from habit import ranking
+        return ranking.normalize_scores(scores)
+
+    scores = [float(score) for score in scores]
+    if not scores:
+        return []
+    mean = ordered_sum(scores) / len(scores)
+    deviations = [score - mean for score in scores]
+    sigma = math.sqrt(ordered_sum([deviation * deviation for deviation in deviations]) / len(scores))
+    if sigma == 0:
+        return [math.nan] * len(scores)
+    return [deviation / sigma for deviation in deviations]
+
+
+def rank_scores(scores):
+    """
+    Normalize scores and compute their ranking order.
+
+    Inputs larger than ``SMALL_INPUT_SIZE`` are ranked with NumPy.
+
+    Parameters
+    ----------
+    scores : list or numpy.ndarray
+        The scores of the habits of one period.
+
+    Returns
+    -------
+    tuple
+        The normalized scores and the indices that sort them in descending order.
+
+    """
+    if len(scores) > SMALL_INPUT_SIZE:
+        from habit import ranking
+        return ranking.rank_scores(scores)
+
+    normalized = normalize_scores(scores)
+    # sorted() is stable: ties keep their input order
+    return normalized, sorted(range(len(normalized)), key=lambda i: -normalized[i])
+
+
+def score_rows(rows, weights, now):
+    """
+    Score habits from their streak rows in pure Python.
+
+    Parameters
+    ----------
+    rows : list
+        Tuples of habit ID, period, number of tasks, creation time and the
+        ``SCORED_STREAK_FIELDS`` counters, ordered by habit ID and streak ID.
+    weights : dict
+        A dictionary containing weights for different factors.
+    now : DateTime
+        The reference time for the habit duration.
+
+    Returns
+    -------
+    dict
+        A mapping of column name to a list ordered by habit ID, holding
+        ``habit_id``, ``period``, the four streak counters and ``score``.
+
+    """
+    # Rows are ordered by (habit_id, streak id): the last row of each habit is its latest streak
+    latest = {row[0]: row for row in rows}
+    columns = {name: [] for name in ('habit_id', 'period', *SCORED_STREAK_FIELDS, 'score')}
+    for habit_id, period, num_of_tasks, creation_time, *counters in latest.values():
+        counters = dict(zip(SCORED_STREAK_FIELDS, counters))
+        # subtract one day from creation time to avoid ZeroDivisionError
+        duration = (now - (creation_time - timedelta(days=1))).days
+        columns['habit_id'].append(habit_id)
+        columns['period'].append(period)
+        for name, value in counters.items():
+            columns[name].append(value)
+        columns['score'].append(calculate_score(
+            counters['num_of_completed_tasks'], counters['num_of_failed_tasks'],
+            counters['longest_streak'], counters['current_streak'], num_of_tasks, duration, weights))
+    return columns
+
+
+def score_habits(weights, periods, habit_ids=None, now=None):
+    """
+    Score habits created in the last 30 days from their latest streak.
 
-    return z_scores
+    Habit and latest-streak columns are loaded with one ``values_list`` query.
+    Up to ``SMALL_INPUT_SIZE`` rows are scored in pure Python, larger inputs with
+    NumPy array operations (``habit.ranking.score_rows``).
+
+    Parameters
+    ----------
+    weights : dict
+        A dictionary containing weights for different factors.
+    periods : iterable of str
+        The periods of the habits to score.
+    habit_ids : iterable of int, optional
+        Restrict scoring to these habits. Defaults to every habit in ``periods``.
+    now : DateTime, optional
+        The reference time for the 30 day window and the habit duration.
+
+    Returns
+    -------
+    dict
+        A mapping of column name to a list or NumPy array ordered by habit ID,
+        holding ``habit_id``, ``period``, the four streak counters and ``score``.
+
+    """
+    now = now or timezone.now()
+    last_month = now - timedelta(days=30)
+
+    streaks = Streak.objects.filter(habit__period__in=list(periods),
+                                    habit__creation_time__range=(last_month, now))
+    if habit_ids is not None:
+        streaks = streaks.filter(habit_id__in=list(habit_ids))
+    rows = list(streaks.order_by('habit_id', 'id').values_list(
+        'habit_id', 'habit__period', 'habit__num_of_tasks', 'habit__creation_time',
+        *SCORED_STREAK_FIELDS,
+    ))
+    if len(rows) <= SMALL_INPUT_SIZE:
+        return score_rows(rows, weights, now)
+
+    from habit import ranking
+    return ranking.score_rows(rows, weights, now)
+
+
+def rank_habits_by_period(weights, periods):
+    """
+    Rank habits of several periods based on their scores in a single pass.
+
+    Scores are computed by ``score_habits``; z-scores are normalized within each
+    period and habits are ranked with a stable sort.
+
+    Parameters
+    ----------
+    weights : dict
+        A dictionary containing weights for different factors.
+    periods : iterable of str
+        The periods for which habits should be ranked.
+
+    Returns
+    -------
+    dict
+        A mapping of period to a list of tuples containing habit objects and their
+        corresponding normalized scores, ranked in descending order.
+
+    """
+    periods = list(periods)
+    rankings = {period: [] for period in periods}
+    columns = score_habits(weights, periods)
+    if len(columns['habit_id']) == 0:
+        return rankings
+
+    habit_ids = [int(habit_id) for habit_id in columns['habit_id']]
+    habits = Habit.objects.prefetch_related('streak').in_bulk(habit_ids)
+    for period in periods:
+        in_period = [i for i, habit_period in enumerate(columns['period']) if habit_period == period]
+        if not in_period:
+            continue
+        normalized, order = rank_scores([columns['score'][i] for i in in_period])
+        rankings[period] = [(habits[habit_ids[in_period[i]]], normalized[i]) for i in order]
+
+    return rankings
 
 
 def rank_habits(weights, period):
@@ -320,38 +526,7 @@ def rank_habits(weights, period):
        ranked in descending order.
 
     """
-    scores = []
-    now = timezone.now()
-    last_month = now - timedelta(days=30)
-
-    prefetch_streaks = Prefetch('streak', queryset=Streak.objects.all())
-    # Fetch habits with prefetching of related streaks
-    habits = Habit.objects.prefetch_related(prefetch_streaks).filter(period=period,
-                                                creation_time__range=(last_month, now))
-
-    for habit in habits:
-        streak = habit.streak.latest('id')
-        if streak is not None:
-            num_of_tasks = habit.num_of_tasks
-            completed_tasks = streak.num_of_completed_tasks
-            failed_tasks = streak.num_of_failed_tasks
-            longest_streak = streak.longest_streak
-            current_streak = streak.current_streak
-            # subtract one day from creation time to avoid ZeroDivisionError
-            duration = (now - (habit.creation_time - timedelta(days=1))).days
-
-            score = calculate_score(completed_tasks, failed_tasks, longest_streak,
-                                    current_streak, num_of_tasks, duration, weights)
-
-            scores.append(score)
-        else:
-            pass
-
-
-    normalized_scores = normalize_scores(scores)
-    ranked_habits = sorted(zip(habits, normalized_scores), key=lambda x: x[1], reverse=True)
-
-    return ranked_habits
+    return rank_habits_by_period(weights, [period])[period]
 
 def all_completed_habits(user_id):
     """
@@ -0,0 +1,288 @@
+"""
+Async variants of the read endpoints in ``habit.health``.
+
+Served instead of the synchronous views when ``API_ASYNC_VIEWS`` is enabled
+under an ASGI server (see ``gunicorn.conf.py``). Queries go through Django's
+async ORM interface, so a worker keeps serving other requests while one waits
+on the database. The responses are the same as the synchronous views'; the methods
+that write are delegated to those views, and the analysis payload comes from the
+same cache (``habit.cached``), computed by the synchronous builder on a miss.
+"""
+from asgiref.sync import sync_to_async
+from django.db import models
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+from habit import health
+from habit.analytics import (
+    active_tasks, all_tracked_habits, calculate_progress, due_today_tasks, update_user_activity, upcoming_tasks,
+)
+from habit.cached import analysis_data, habit_metadata, profile_data
+from habit.models import Achievement, Habit, Streak, TaskTracker
+from habit.probes import health_report
+from habit.serializers import (
+    ANALYSIS_HABIT_FIELDS, InvalidFieldsError, parse_fields, project_habits, serialize_habit
+)
+
+TASK_QUERIES = {'due_today': due_today_tasks, 'active': active_tasks, 'upcoming': upcoming_tasks}
+
+
+def _authenticated_user(request):
+    """Evaluate the lazy ``request.user``; return it, or None if anonymous."""
+    return request.user if request.user.is_authenticated else None
+
+
+# The session and user lookups behind request.user are synchronous
+get_authenticated_user = sync_to_async(_authenticated_user)
+
+
+def delegate(view_class):
+    """
+    Build an async method handler that runs a synchronous view.
+
+    Used for the methods that write, so an async view class can still serve
+    every method of the endpoint it replaces.
+    """
+    view = sync_to_async(view_class.as_view())
+
+    async def handler(self, request, *args, **kwargs):
+        return await view(request, *args, **kwargs)
+
+    return handler
+
+
+def serialize_task(task):
+    """Serialize a task's number, status and dates to a dictionary."""
+    return {
+        'id': task.id,
+        'task_number': task.task_number,
+        'task_status': task.task_status,
+        'due_date': task.due_date.isoformat() if task.due_date else None,
+        'start_date': task.start_date.isoformat() if task.start_date else None,
+        'task_completion_date': task.task_completion_date.isoformat() if task.task_completion_date else None,
+    }
+
+
+class AsyncHealthCheckView(View):
+    """
+    Readiness endpoint that verifies database and cache connectivity.
+    """
+
+    async def get(self, request):
+        """
+        Returns health status of the application (see habit.probes).
+        """
+        # The probes wait on their own threads; keep the request's thread free
+        health_status = await sync_to_async(health_report, thread_sensitive=False)()
+        status_code = 200 if health_status['status'] == 'healthy' else 503
+        return JsonResponse(health_status, status=status_code)
+
+
+class AsyncAuthCheckView(View):
+    """
+    Authentication check endpoint that returns user authentication status.
+    """
+
+    async def get(self, request):
+        """
+        Returns authentication status of the current user.
+        """
+        user = await get_authenticated_user(request)
+        if user is not None:
+            return JsonResponse({
+                'authenticated': True,
+                'user_id': user.id,
+                'username': user.username,
+            })
+        return JsonResponse({
+            'authenticated': False,
+            'user_id': None,
+            'username': None,
+        })
+
+
+class AsyncProfileView(View):
+    """
+    Profile endpoint that returns current user's profile information.
+    """
+
+    async def get(self, request):
+        """
+        Returns profile information for the authenticated user.
+        """
+        user = await get_authenticated_user(request)
+        if user is None:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+
+        try:
+            profile = await sync_to_async(profile_data)(user)
+
+            return JsonResponse({
+                'user': {
+                    'id': user.id,
+                    'username': user.username,
+                    'first_name': user.first_name or '',
+                    'last_name': user.last_name or '',
+                    'email': user.email or '',
+                    'date_joined': user.date_joined.isoformat() if user.date_joined else None,
+                },
+                'profile': {
+                    'email': profile['email'] or user.email or '',
+                }
+            })
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+class AsyncHabitsView(View):
+    """
+    Habits API endpoint that returns all habits for the authenticated user.
+    POST (habit creation) is served by the synchronous view.
+    """
+
+    post = delegate(health.HabitsView)
+
+    async def get(self, request):
+        """
+        Returns all active habits for the authenticated user.
+        """
+        user = await get_authenticated_user(request)
+        if user is None:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+
+        try:
+            fields = parse_fields(request)
+        except InvalidFieldsError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        try:
+            all_active_habits = Habit.objects.filter(
+                user_id=user.id
+            ).filter(
+                models.Q(completion_date__gte=timezone.now()) | models.Q(completion_date__isnull=True)
+            )
+            if not await all_active_habits.aexists():
+                all_active_habits = all_tracked_habits(user_id=user.id)
+
+            habits = [habit async for habit in project_habits(all_active_habits, fields)]
+            if 'progress' in fields:
+                await sync_to_async(calculate_progress)(habits)
+
+            habits_data = [serialize_habit(habit, fields) for habit in habits]
+            return JsonResponse({'habits': habits_data}, safe=False)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+class AsyncTasksView(View):
+    """
+    Tasks API endpoint that returns tasks for the authenticated user.
+    """
+
+    async def get(self, request):
+        """
+        Returns tasks for the authenticated user.
+
+        Query params:
+        - type: 'due_today', 'active', or 'upcoming'
+        """
+        user = await get_authenticated_user(request)
+        if user is None:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+
+        try:
+            # Update user activity when fetching tasks (like the home view does)
+            await sync_to_async(update_user_activity)(user.id)
+
+            query = TASK_QUERIES.get(request.GET.get('type', 'due_today'))
+            if query is None:
+                return JsonResponse({'error': 'Invalid task type'}, status=400)
+
+            tasks_data = []
+            async for task in query(user_id=user.id).select_related('habit'):
+                task_data = serialize_task(task)
+                task_data['habit'] = {
+                    'id': task.habit.id,
+                    'name': task.habit.name,
+                    'period': task.habit.period,
+                    'notes': task.habit.notes or '',
+                } if task.habit else None
+                tasks_data.append(task_data)
+
+            return JsonResponse({'tasks': tasks_data}, safe=False)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+class AsyncHabitDetailView(View):
+    """
+    Habit detail API endpoint that returns detailed information about a specific habit.
+    """
+
+    async def get(self, request, habit_id):
+        """
+        Returns detailed information for a specific habit.
+        """
+        user = await get_authenticated_user(request)
+        if user is None:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+
+        try:
+            # The habit's fields are cached; the in-progress count is live
+            habit_data = dict(await sync_to_async(habit_metadata)(user.id, habit_id))
+            tasks = [task async for task in TaskTracker.objects.filter(habit_id=habit_id)]
+            streak = await Streak.objects.filter(habit_id=habit_id).afirst()
+            achievements = [achievement async for achievement in Achievement.objects.filter(habit_id=habit_id)]
+            habit_data['in_progress'] = await TaskTracker.objects.filter(
+                habit_id=habit_id, task_status='In progress'
+            ).acount()
+
+            return JsonResponse({
+                'habit': habit_data,
+                'tasks': [serialize_task(task) for task in tasks],
+                'streak': {
+                    'current_streak': streak.current_streak,
+                    'longest_streak': streak.longest_streak,
+                    'num_of_completed_tasks': streak.num_of_completed_tasks,
+                    'num_of_failed_tasks': streak.num_of_failed_tasks,
+                } if streak else None,
+                'achievements': [{
+                    'id': achievement.id,
+                    'title': achievement.title,
+                    'date': achievement.date.isoformat() if achievement.date else None,
+                    'streak_length': achievement.streak_length,
+                } for achievement in achievements],
+            })
+        except Habit.DoesNotExist:
+            return JsonResponse({'error': 'Habit not found'}, status=404)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+class AsyncAnalysisView(View):
+    """
+    Habit analysis API endpoint.
+    POST (single habit analysis) is served by the synchronous view.
+    """
+
+    post = delegate(health.AnalysisView)
+
+    async def get(self, request):
+        """
+        Returns habit analysis data.
+        """
+        user = await get_authenticated_user(request)
+        if user is None:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+
+        try:
+            fields = parse_fields(request, ANALYSIS_HABIT_FIELDS)
+        except InvalidFieldsError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        try:
+            # Cached per user and fields; a miss is computed by the synchronous builder
+            data = await sync_to_async(analysis_data)(user.id, fields)
+            return JsonResponse(data)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,148 @@
+"""
+This module serves read-mostly records of the API through the two-tier cache
+(see ``Habit_Tracker.tiered_cache``), and the analysis payload through the
+stampede-protected cache (see ``Habit_Tracker.single_flight``).
+
+Every record belongs to its user's scope. Saving or deleting the user's
+profile or one of their habits, or a streak of their habits, bumps the scope's
+generation (see the ``habit.signals`` and ``Users.signals`` receivers), which
+invalidates the user's records in every container.
+"""
+
+from django.conf import settings
+from Habit_Tracker.db_router import WRITER_ALIAS, read_from_writer
+from Habit_Tracker.single_flight import get_or_compute
+from Habit_Tracker.tiered_cache import TieredCache, bump_generation, get_generation
+from habit.models import Habit
+from habit.serializers import serialize_analysis
+
+PROFILES = TieredCache('profile')
+HABITS = TieredCache('habit')
+
+
+def user_scope(user_id):
+    """
+    Return the cache scope of a user's records.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user.
+
+    Returns
+    -------
+    str
+        The scope name.
+    """
+    return f'user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """
+    Invalidate every cached record of a user.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user whose records changed.
+    """
+    bump_generation(user_scope(user_id))
+
+
+def profile_data(user):
+    """
+    Return the profile fields shown by the profile endpoint.
+
+    Parameters
+    ----------
+    user : User
+        The authenticated user; their profile is created if missing.
+
+    Returns
+    -------
+    dict
+        The profile's email.
+    """
+    def load():
+        from Users.models import Profile
+
+        profile, created = Profile.objects.get_or_create(user=user)
+        return {'email': profile.email}
+
+    return PROFILES.get_or_load(user.id, load, user_scope(user.id))
+
+
+def habit_metadata(user_id, habit_id):
+    """
+    Return the serialized fields of a user's habit, as shown by the habit detail endpoint.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user owning the habit.
+    habit_id : int
+        The ID of the habit.
+
+    Returns
+    -------
+    dict
+        The habit's fields, without the live ``in_progress`` count.
+
+    Raises
+    ------
+    Habit.DoesNotExist
+        If the user has no such habit (nothing is cached).
+    """
+    def load():
+        # From the writer: a copy read from a lagging reader would be cached until the next change
+        habit = Habit.objects.using(WRITER_ALIAS).get(pk=habit_id, user_id=user_id)
+        return {
+            'id': habit.id,
+            'name': habit.name,
+            'period': habit.period,
+            'frequency': habit.frequency,
+            'goal': habit.goal,
+            'notes': habit.notes or '',
+            'num_of_tasks': habit.num_of_tasks,
+            'creation_time': habit.creation_time.isoformat() if habit.creation_time else None,
+            'completion_date': habit.completion_date.isoformat() if habit.completion_date else None,
+        }
+
+    return HABITS.get_or_load(habit_id, load, user_scope(user_id))
+
+
+def analysis_data(user_id, fields):
+    """
+    Return a user's analysis payload, computed by at most one worker at a time.
+
+    The payload is fresh for ``ANALYSIS_CACHE_TIMEOUT`` seconds and served
+    stale for up to ``ANALYSIS_CACHE_STALE_TIMEOUT`` more while one worker
+    recomputes it. A change to the user's habits or streaks starts a new
+    generation, so the next read recomputes it; the overall streak leaders it
+    includes may lag by up to the fresh timeout.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user.
+    fields : tuple
+        The fields of each habit entry.
+
+    Returns
+    -------
+    dict
+        The payload built by ``serialize_analysis``.
+    """
+    def compute():
+        # From the writer, like habit_metadata: the payload is cached past this request
+        with read_from_writer():
+            return serialize_analysis(user_id, fields)
+
+    scope = user_scope(user_id)
+    key = f'analysis:{scope}:{get_generation(scope)}:{",".join(fields)}'
+    return get_or_compute(
+        key, compute,
+        timeout=settings.ANALYSIS_CACHE_TIMEOUT,
+        stale_timeout=settings.ANALYSIS_CACHE_STALE_TIMEOUT,
+        alias=settings.TIERED_CACHE_ALIAS,
+    )
@@ -1,88 +1,49 @@
 """
 Health check views for monitoring service status.
 """
-import logging
 from django.http import JsonResponse
-from django.db import connection
-from django.core.cache import cache
 from django.views import View
-from django.contrib.auth.models import User
 from django.db import models
 from django.utils import timezone
+from habit.cached import analysis_data, habit_metadata, profile_data
+from habit.probes import health_report
+from habit.serializers import (
+    ANALYSIS_HABIT_FIELDS, InvalidFieldsError, parse_fields, project_habits, serialize_habit
+)
 
 
 class HealthCheckView(View):
     """
-    Health check endpoint that verifies database and cache connectivity.
+    Readiness endpoint that verifies database and cache connectivity.
     """
     
     def get(self, request):
         """
         Returns health status of the application.
         
-        Checks:
+        Checks (concurrently, each with a deadline, cached for a few seconds;
+        see habit.probes):
         - Database connectivity
         - Redis cache connectivity
         - Overall service status
         """
-        health_status = {
-            'status': 'healthy',
-            'services': {}
-        }
-        
-        logger = logging.getLogger(__name__)
-        logger.info("Health check: starting database check")
-
-        # Check database
-        try:
-            with connection.cursor() as cursor:
-                logger.debug("Health check: executing SELECT 1")
-                cursor.execute("SELECT 1")
-                health_status['services']['database'] = {
-                    'status': 'healthy',
-                    'message': 'Database connection successful'
-                }
-                logger.info("Health check: database check passed")
-        except Exception as e:
-            health_status['status'] = 'unhealthy'
-            logger.exception("Health check: database check failed")
-            health_status['services']['database'] = {
-                'status': 'unhealthy',
-                'message': str(e)
-            }
-        
-        # Check Redis cache
-        logger.info("Health check: starting Redis check")
-        try:
-            logger.debug("Health check: writing to Redis cache key")
-            cache.set('health_check', 'ok', 10)
-            cache_result = cache.get('health_check')
-            if cache_result == 'ok':
-                health_status['services']['cache'] = {
-                    'status': 'healthy',
-                    'message': 'Redis cache connection successful'
-                }
-                logger.info("Health check: Redis check passed")
-            else:
-                health_status['status'] = 'unhealthy'
-                logger.warning("Health check: Redis read/write mismatch (expected 'ok', got %s)", cache_result)
-                health_status['services']['cache'] = {
-                    'status': 'unhealthy',
-                    'message': 'Cache read/write failed'
-                }
-        except Exception as e:
-            health_status['status'] = 'unhealthy'
-            logger.exception("Health check: Redis check failed")
-            health_status['services']['cache'] = {
-                'status': 'unhealthy',
-                'message': str(e)
-            }
-        
-        # Return appropriate HTTP status code
+        health_status = health_report()
         status_code = 200 if health_status['status'] == 'healthy' else 503
         return JsonResponse(health_status, status=status_code)
 
 
+class LivenessView(View):
+    """
+    Liveness endpoint that only shows the process is serving requests.
+    """
+    
+    def get(self, request):
+        """
+        Returns a constant response without touching the database or the cache.
+        """
+        return JsonResponse({'status': 'alive'})
+
+
 class AuthCheckView(View):
     """
     Authentication check endpoint that returns user authentication status.
@@ -97,22 +58,14 @@ class AuthCheckView(View):
         - user_id: user ID if authenticated, None otherwise
         - username: username if authenticated, None otherwise
         """
+        # request.user comes from the cached user record (Habit_Tracker.auth_cache),
+        # which is dropped when the user is deleted
         if request.user.is_authenticated:
-            # Verify user actually exists in database
-            try:
-                user = User.objects.get(id=request.user.id)
-                return JsonResponse({
-                    'authenticated': True,
-                    'user_id': user.id,
-                    'username': user.username,
-                })
-            except User.DoesNotExist:
-                # User doesn't exist in database, clear session
-                return JsonResponse({
-                    'authenticated': False,
-                    'user_id': None,
-                    'username': None,
-                })
+            return JsonResponse({
+                'authenticated': True,
+                'user_id': request.user.id,
+                'username': request.user.username,
+            })
         else:
             return JsonResponse({
                 'authenticated': False,
@@ -138,11 +91,9 @@ class ProfileView(View):
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
         try:
-            user = User.objects.get(id=request.user.id)
-            from Users.models import Profile
-            
-            # Get or create profile
-            profile, created = Profile.objects.get_or_create(user=user)
+            user = request.user
+            # Get or create profile (cached in-process and in Redis)
+            profile = profile_data(user)
             
             return JsonResponse({
                 'user': {
@@ -154,11 +105,9 @@ class ProfileView(View):
                     'date_joined': user.date_joined.isoformat() if user.date_joined else None,
                 },
                 'profile': {
-                    'email': profile.email or user.email or '',
+                    'email': profile['email'] or user.email or '',
                 }
             })
-        except User.DoesNotExist:
-            return JsonResponse({'error': 'User not found'}, status=404)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
 
@@ -179,6 +128,11 @@ class HabitsView(View):
         if not request.user.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
+        try:
+            fields = parse_fields(request)
+        except InvalidFieldsError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
         try:
             from habit.analytics import all_tracked_habits, calculate_progress
             from habit.models import Habit
@@ -191,43 +145,19 @@ class HabitsView(View):
                 user_id=user_id
             ).filter(
                 models.Q(completion_date__gte=timezone.now()) | models.Q(completion_date__isnull=True)
-            ).prefetch_related('streak')
+            )
             
             # Fallback to original function if needed, but try to get all active habits
-            if all_active_habits.count() == 0:
+            if not all_active_habits.exists():
                 all_active_habits = all_tracked_habits(user_id=user_id)
             
-            calculate_progress(all_active_habits)
+            # Load only the columns and streaks the requested fields need
+            all_active_habits = project_habits(all_active_habits, fields)
+            if 'progress' in fields:
+                calculate_progress(all_active_habits)
             
             # Serialize habits to JSON
-            habits_data = []
-            for habit in all_active_habits:
-                # Get streak - it's a related manager, use .first() or .all()[0]
-                streak = habit.streak.first() if hasattr(habit, 'streak') else None
-                habits_data.append({
-                    'id': habit.id,
-                    'name': habit.name,
-                    'period': habit.period,
-                    'frequency': habit.frequency,
-                    'goal': habit.goal,
-                    'notes': habit.notes or '',
-                    'num_of_tasks': habit.num_of_tasks,
-                    'in_progress': getattr(habit, 'in_progress', 0),
-                    'progress': getattr(habit, 'progress', 0),
-                    'streak': {
-                        'current_streak': streak.current_streak if streak else 0,
-                        'longest_streak': streak.longest_streak if streak else 0,
-                        'num_of_completed_tasks': streak.num_of_completed_tasks if streak else 0,
-                        'num_of_failed_tasks': streak.num_of_failed_tasks if streak else 0,
-                    } if streak else {
-                        'current_streak': 0,
-                        'longest_streak': 0,
-                        'num_of_completed_tasks': 0,
-                        'num_of_failed_tasks': 0,
-                    },
-                    'creation_time': habit.creation_time.isoformat() if habit.creation_time else None,
-                    'completion_date': habit.completion_date.isoformat() if habit.completion_date else None,
-                })
+            habits_data = [serialize_habit(habit, fields) for habit in all_active_habits]
             
             return JsonResponse({'habits': habits_data}, safe=False)
         except Exception as e:
@@ -375,15 +305,17 @@ class HabitDetailView(View):
         
         try:
             from habit.models import Habit, TaskTracker, Streak, Achievement
-            from habit.analytics import num_inprogress_tasks
             
-            habit = Habit.objects.get(pk=habit_id, user=request.user)
+            # The habit's fields are cached; the in-progress count is live
+            habit_data = dict(habit_metadata(request.user.id, habit_id))
             tasks = TaskTracker.objects.filter(habit_id=habit_id)
             streak = Streak.objects.filter(habit_id=habit_id).first()
             achievements = Achievement.objects.filter(habit_id=habit_id)
             
             # Update in-progress tasks count
-            num_inprogress_tasks(habit)
+            habit_data['in_progress'] = TaskTracker.objects.filter(
+                habit_id=habit_id, task_status='In progress'
+            ).count()
             
             # Serialize tasks
             tasks_data = []
@@ -408,18 +340,7 @@ class HabitDetailView(View):
                 })
             
             return JsonResponse({
-                'habit': {
-                    'id': habit.id,
-                    'name': habit.name,
-                    'period': habit.period,
-                    'frequency': habit.frequency,
-                    'goal': habit.goal,
-                    'notes': habit.notes or '',
-                    'num_of_tasks': habit.num_of_tasks,
-                    'in_progress': getattr(habit, 'in_progress', 0),
-                    'creation_time': habit.creation_time.isoformat() if habit.creation_time else None,
-                    'completion_date': habit.completion_date.isoformat() if habit.completion_date else None,
-                },
+                'habit': habit_data,
                 'tasks': tasks_data,
                 'streak': {
                     'current_streak': streak.current_streak if streak else 0,
@@ -547,61 +468,13 @@ class AnalysisView(View):
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
         try:
-            from habit.analytics import (
-                all_tracked_habits, habits_by_period, all_completed_habits,
-                longest_streak_over_all_habits, longest_current_streak_over_all_habits,
-                calculate_progress
-            )
-            
-            user_id = request.user.id
-            
-            # Get all habits
-            all_habits = all_tracked_habits(user_id=user_id)
-            daily_habits = habits_by_period('daily')(all_habits)
-            weekly_habits = habits_by_period('weekly')(all_habits)
-            monthly_habits = habits_by_period('monthly')(all_habits)
-            completed_habits = all_completed_habits(user_id=user_id)
-            
-            # Calculate progress
-            calculate_progress(all_habits)
-            calculate_progress(daily_habits)
-            calculate_progress(weekly_habits)
-            calculate_progress(monthly_habits)
-            
-            # Helper to serialize habit
-            def serialize_habit(habit):
-                streak = habit.streak.first() if hasattr(habit, 'streak') else None
-                return {
-                    'id': habit.id,
-                    'name': habit.name,
-                    'period': habit.period,
-                    'frequency': habit.frequency,
-                    'goal': habit.goal,
-                    'notes': habit.notes or '',
-                    'num_of_tasks': habit.num_of_tasks,
-                    'in_progress': getattr(habit, 'in_progress', 0),
-                    'progress': getattr(habit, 'progress', 0),
-                    'streak': [{
-                        'current_streak': streak.current_streak if streak else 0,
-                        'longest_streak': streak.longest_streak if streak else 0,
-                        'num_of_completed_tasks': streak.num_of_completed_tasks if streak else 0,
-                        'num_of_failed_tasks': streak.num_of_failed_tasks if streak else 0,
-                    }] if streak else [],
-                }
-            
-            # Get longest streaks
-            longest_streak_habit = longest_streak_over_all_habits().first() if longest_streak_over_all_habits().exists() else None
-            longest_current_streak_habit = longest_current_streak_over_all_habits().first() if longest_current_streak_over_all_habits().exists() else None
-            
-            return JsonResponse({
-                'all_habits': [serialize_habit(h) for h in all_habits],
-                'daily_habits': [serialize_habit(h) for h in daily_habits],
-                'weekly_habits': [serialize_habit(h) for h in weekly_habits],
-                'monthly_habits': [serialize_habit(h) for h in monthly_habits],
-                'completed_habits': [serialize_habit(h) for h in completed_habits],
-                'longest_streak_habit': serialize_habit(longest_streak_habit) if longest_streak_habit else None,
-                'longest_current_streak_habit': serialize_habit(longest_current_streak_habit) if longest_current_streak_habit else None,
-            })
+            fields = parse_fields(request, ANALYSIS_HABIT_FIELDS)
+        except InvalidFieldsError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        try:
+            # Cached per user and fields, recomputed by one worker at a time
+            return JsonResponse(analysis_data(request.user.id, fields))
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
     
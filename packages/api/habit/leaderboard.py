@@ -0,0 +1,210 @@
+"""
+This module maintains the precomputed "struggled most" rankings stored in the
+HabitRanking table.
+
+A scheduled job refreshes the table in bulk, and a cheaper incremental job only
+re-scores habits whose streak counters changed since they were last scored
+before re-normalizing each affected period from the stored scores. The analysis
+view reads the top-N habits of a period with one indexed lookup.
+
+Scores depend on how long ago a habit was created, so the rows of habits that
+were not re-scored drift slightly until the next bulk refresh.
+"""
+
+from datetime import timedelta
+import math
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from habit.analytics import (
+    RANKED_PERIODS, SCORED_STREAK_FIELDS, STRUGGLE_WEIGHTS,
+    rank_habits_by_period, rank_scores, score_habits
+)
+from habit.models import HabitRanking, Streak
+
+
+def build_rankings(columns, now):
+    """
+    Build unsaved HabitRanking rows from scored habit columns.
+
+    Parameters
+    ----------
+    columns : dict
+        The columns returned by ``score_habits``.
+    now : DateTime
+        The time the scores were computed.
+
+    Returns
+    -------
+    list
+        A list of HabitRanking objects without z-scores or ranks, ordered by habit ID.
+
+    """
+    return [
+        HabitRanking(
+            habit_id=int(columns['habit_id'][i]),
+            period=columns['period'][i],
+            score=float(columns['score'][i]),
+            computed_at=now,
+            **{name: int(columns[name][i]) for name in SCORED_STREAK_FIELDS},
+        )
+        for i in range(len(columns['habit_id']))
+    ]
+
+
+def assign_ranks(rankings):
+    """
+    Set the z-score and rank of the rankings of one period.
+
+    Parameters
+    ----------
+    rankings : list
+        The HabitRanking objects of a period, ordered by habit ID.
+
+    """
+    if not rankings:
+        return
+    normalized, order = rank_scores([ranking.score for ranking in rankings])
+    for rank, i in enumerate(order, start=1):
+        rankings[i].z_score = None if math.isnan(normalized[i]) else float(normalized[i])
+        rankings[i].rank = rank
+
+
+def refresh_rankings(weights=STRUGGLE_WEIGHTS, periods=RANKED_PERIODS):
+    """
+    Recompute the rankings of every habit of the given periods.
+
+    Parameters
+    ----------
+    weights : dict, optional
+        A dictionary containing weights for different factors.
+    periods : iterable of str, optional
+        The periods to rank.
+
+    Returns
+    -------
+    int
+        The number of ranked habits.
+
+    """
+    periods = list(periods)
+    now = timezone.now()
+    rankings = build_rankings(score_habits(weights, periods, now=now), now)
+    for period in periods:
+        assign_ranks([ranking for ranking in rankings if ranking.period == period])
+
+    with transaction.atomic():
+        HabitRanking.objects.filter(period__in=periods).delete()
+        HabitRanking.objects.bulk_create(rankings)
+    return len(rankings)
+
+
+def changed_habit_ids(periods, now):
+    """
+    Find habits in the ranking window whose streak changed since they were scored.
+
+    Parameters
+    ----------
+    periods : iterable of str
+        The periods to check.
+    now : DateTime
+        The reference time for the 30 day window.
+
+    Returns
+    -------
+    set
+        The IDs of habits that have no ranking yet or whose streak counters differ
+        from the ones their ranking was computed from.
+
+    """
+    stale = Q(habit__ranking__isnull=True)
+    for name in SCORED_STREAK_FIELDS:
+        stale |= ~Q(**{name: F(f'habit__ranking__{name}')})
+
+    return set(Streak.objects.filter(
+        stale, habit__period__in=list(periods),
+        habit__creation_time__range=(now - timedelta(days=30), now),
+    ).values_list('habit_id', flat=True))
+
+
+def refresh_changed_rankings(weights=STRUGGLE_WEIGHTS, periods=RANKED_PERIODS):
+    """
+    Re-score only habits whose streak changed, then re-rank the affected periods.
+
+    Rankings of habits that left the 30 day window are removed. Periods are
+    re-normalized from the scores stored in the table, without touching the
+    habit and streak tables again.
+
+    Parameters
+    ----------
+    weights : dict, optional
+        A dictionary containing weights for different factors.
+    periods : iterable of str, optional
+        The periods to rank.
+
+    Returns
+    -------
+    int
+        The number of re-scored habits.
+
+    """
+    periods = list(periods)
+    now = timezone.now()
+
+    with transaction.atomic():
+        expired = HabitRanking.objects.filter(period__in=periods).exclude(
+            habit__creation_time__range=(now - timedelta(days=30), now))
+        affected = set(expired.values_list('period', flat=True))
+        expired.delete()
+
+        changed = changed_habit_ids(periods, now)
+        if changed:
+            rankings = build_rankings(score_habits(weights, periods, habit_ids=changed, now=now), now)
+            HabitRanking.objects.filter(habit_id__in=changed).delete()
+            HabitRanking.objects.bulk_create(rankings)
+            affected.update(ranking.period for ranking in rankings)
+
+        for period in affected:
+            rankings = list(HabitRanking.objects.filter(period=period)
+                            .only('id', 'habit_id', 'score').order_by('habit_id'))
+            assign_ranks(rankings)
+            HabitRanking.objects.bulk_update(rankings, ['z_score', 'rank'])
+
+    return len(changed)
+
+
+def struggled_most_habits(periods=RANKED_PERIODS, limit=1):
+    """
+    Read the top-N habits users struggled most with for each period.
+
+    Falls back to ranking habits on the fly while the table has never been
+    populated (e.g. right after deployment, before the first scheduled refresh).
+
+    Parameters
+    ----------
+    periods : iterable of str, optional
+        The periods to read.
+    limit : int, optional
+        The number of habits to return per period.
+
+    Returns
+    -------
+    dict
+        A mapping of period to a list of tuples containing habit objects and their
+        normalized scores, ranked in descending order.
+
+    """
+    periods = list(periods)
+    if not HabitRanking.objects.exists():
+        rankings = rank_habits_by_period(STRUGGLE_WEIGHTS, periods)
+        return {period: ranked[:limit] for period, ranked in rankings.items()}
+
+    rankings = {}
+    for period in periods:
+        top = (HabitRanking.objects.filter(period=period).order_by('rank')
+               .select_related('habit').prefetch_related('habit__streak')[:limit])
+        rankings[period] = [
+            (ranking.habit, math.nan if ranking.z_score is None else ranking.z_score)
+            for ranking in top
+        ]
+    return rankings
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from Habit_Tracker.migration_state import compute_fingerprint, fingerprint_path, write_fingerprint
+
+
+class Command(BaseCommand):
+    """
+    Print the migration fingerprint, or bake it into the image at build time.
+    """
+    help = 'Print the fingerprint of the migrations of the installed apps.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--write', action='store_true',
+            help='Write the fingerprint to MIGRATION_FINGERPRINT_FILE for cold-start checks.',
+        )
+
+    def handle(self, *args, **options):
+        if options['write']:
+            fingerprint = write_fingerprint()
+            self.stdout.write(f'Wrote {fingerprint} to {fingerprint_path()}')
+        else:
+            self.stdout.write(compute_fingerprint())
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from habit.streak_index import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Backfill the Redis current/longest streak indexes from the database.
+    """
+    help = 'Backfill the Redis current/longest streak indexes from the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of streaks read and written per round trip (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            count = rebuild_index(batch_size=options['batch_size'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f'Indexed {count} streaks')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from habit.leaderboard import refresh_changed_rankings, refresh_rankings
+
+
+class Command(BaseCommand):
+    """
+    Refresh the precomputed "struggled most" habit rankings.
+
+    Runs a full refresh by default; ``--changed-only`` re-scores only habits
+    whose streak changed since they were last ranked.
+    """
+    help = 'Refresh the precomputed "struggled most" habit rankings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--changed-only', action='store_true',
+            help='Only re-score habits whose streak changed since the last refresh.',
+        )
+
+    def handle(self, *args, **options):
+        if options['changed_only']:
+            count = refresh_changed_rankings()
+            self.stdout.write(f'Re-scored {count} changed habits')
+        else:
+            count = refresh_rankings()
+            self.stdout.write(f'Ranked {count} habits')
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from redis.exceptions import RedisError
+from Habit_Tracker.circuit_breaker import CircuitBreakerRedisCache, replay_invalidations
+
+
+class Command(BaseCommand):
+    """
+    Delete from Redis the cache keys whose invalidation could not reach it.
+    """
+    help = 'Delete from Redis the cache keys whose invalidation could not reach it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of keys deleted per round trip (default: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        count = 0
+        for alias in settings.CACHES:
+            cache = caches[alias]
+            if not isinstance(cache, CircuitBreakerRedisCache):
+                continue
+            try:
+                count += replay_invalidations(cache, batch_size=options['batch_size'])
+            except RedisError as e:
+                raise CommandError(f'Redis could not delete the keys of cache {alias}: {e}')
+        self.stdout.write(f'Replayed {count} cache invalidations')
@@ -0,0 +1,34 @@
+# Generated by Django 4.1 on 2026-10-18 23:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habit', '0029_remove_habit_num_of_completed_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=255)),
+                ('score', models.FloatField()),
+                ('z_score', models.FloatField(blank=True, null=True)),
+                ('rank', models.IntegerField(blank=True, null=True)),
+                ('num_of_completed_tasks', models.IntegerField(default=0)),
+                ('num_of_failed_tasks', models.IntegerField(default=0)),
+                ('longest_streak', models.IntegerField(default=0)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('habit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ranking', to='habit.habit')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='habitranking',
+            index=models.Index(fields=['period', 'rank'], name='habit_ranking_period_rank'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1 on 2026-10-18 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habit', '0030_habitranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchemaState',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('applied_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
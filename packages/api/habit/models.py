@@ -2,6 +2,7 @@ from datetime import timedelta
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from Habit_Tracker.db_router import WRITER_ALIAS
 from .utils import convert_period_to_days
 
 
@@ -163,13 +164,15 @@ class TaskTracker(models.Model):
         """
         updated_habit_ids = []
         updated_task_ids = []
-        tasks_to_update = cls.objects.filter(habit__user_id=user_id,
-                                            due_date__lt=timezone.now(),
-                                            task_status='In progress')
+        # Read from the writer: GET requests run this sweep unpinned, and a
+        # lagging replica would hand back tasks that were completed meanwhile
+        tasks_to_update = cls.objects.using(WRITER_ALIAS).filter(habit__user_id=user_id,
+                                                                 due_date__lt=timezone.now(),
+                                                                 task_status='In progress')
         for task in tasks_to_update:
             task.task_status = 'Failed'
             task.task_completion_date = task.due_date
-            task.save()
+            task.save(update_fields=['task_status', 'task_completion_date'])
             updated_habit_ids.append(task.habit_id)
             updated_task_ids.append(task.id)
         return (updated_habit_ids, updated_task_ids)
@@ -373,4 +376,92 @@ class Achievement(models.Model):
         if streak.current_streak // habit.frequency == 4 and habit.period == 'monthly':
             title = "4-Month's Streak"
             cls.objects.create(habit=habit, date=timezone.now(), title=title,
-                               streak_length=streak.current_streak)
\ No newline at end of file
+                               streak_length=streak.current_streak)
+
+class HabitRanking(models.Model):
+    """
+    Represents the precomputed "struggled most" ranking of a habit within its period.
+
+    Rows are maintained by ``habit.leaderboard`` so the analysis view can read the
+    top-N habits of a period with one indexed lookup instead of scoring every habit.
+
+    Attributes
+    ----------
+    habit : Habit
+        The ranked habit.
+    period : str
+        The period of the habit, which habits are ranked within.
+    score : float
+        The raw weighted score of the habit.
+    z_score : float
+        The score normalized within the period, or None if it is undefined.
+    rank : int
+        The 1-based position of the habit within its period (1 struggled most).
+    num_of_completed_tasks : int
+        The number of completed tasks of the streak the score was computed from.
+    num_of_failed_tasks : int
+        The number of failed tasks of the streak the score was computed from.
+    longest_streak : int
+        The longest streak of the streak the score was computed from.
+    current_streak : int
+        The current streak of the streak the score was computed from.
+    computed_at : DateTime
+        When the score was computed.
+    """
+    habit = models.OneToOneField(Habit, on_delete=models.CASCADE, related_name='ranking')
+    period = models.CharField(max_length=255)
+    score = models.FloatField()
+    z_score = models.FloatField(null=True, blank=True)
+    rank = models.IntegerField(null=True, blank=True)
+    num_of_completed_tasks = models.IntegerField(default=0)
+    num_of_failed_tasks = models.IntegerField(default=0)
+    longest_streak = models.IntegerField(default=0)
+    current_streak = models.IntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['period', 'rank'], name='habit_ranking_period_rank')]
+
+
+class SchemaState(models.Model):
+    """
+    Records which migrations were last applied to the database, as a single row.
+
+    ``Habit_Tracker.migration_state`` compares the fingerprint stored here with
+    the one baked into the image, so a cold start decides whether to migrate with
+    one primary key lookup.
+
+    Attributes
+    ----------
+    fingerprint : str
+        The fingerprint of the migrations applied by the last migration run.
+    applied_at : DateTime
+        When the fingerprint was last recorded.
+    """
+    SINGLETON_ID = 1
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=SINGLETON_ID)
+    fingerprint = models.CharField(max_length=64)
+    applied_at = models.DateTimeField(auto_now=True)
+
+
+class CacheInvalidation(models.Model):
+    """
+    A Redis key whose invalidation could not reach Redis, kept for replay.
+
+    ``Habit_Tracker.circuit_breaker`` records the key when deleting it from Redis
+    fails, and ``replay_cache_invalidations`` deletes it once Redis answers, so
+    no container keeps reading the value the delete was meant to remove.
+
+    Attributes
+    ----------
+    location : str
+        The LOCATION of the Redis cache holding the key.
+    key : str
+        The full Redis key (prefix and version included).
+    created_at : DateTime
+        When the failed delete was recorded.
+    """
+    location = models.CharField(max_length=255)
+    key = models.CharField(max_length=512)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,148 @@
+"""
+Dependency probes behind the readiness health check.
+
+Each probe (``SELECT 1`` on the database, ``PING`` to Redis) runs on its own
+long-lived thread, so both run concurrently, the database probe keeps reusing
+one connection, and a probe stuck on a dead dependency never piles up more
+threads: later checks wait on the same attempt. Every check waits at most
+``HEALTH_CHECK_TIMEOUT`` seconds for the probes, and the report is cached for
+``HEALTH_CHECK_CACHE_SECONDS``, so load balancer and uptime probes cost at
+most one round of probes per process per interval and never write to Redis.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from Habit_Tracker.cache import circuit_open, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def probe_database():
+    """Run ``SELECT 1`` on the default connection."""
+    # Like at the start of a request: drop a broken or expired connection and
+    # ping a persistent one before reusing it
+    connection.close_if_unusable_or_obsolete()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    return 'Database connection successful'
+
+
+def probe_cache():
+    """Ping Redis, or read a key from other cache backends."""
+    if circuit_open():
+        raise RuntimeError('Redis circuit breaker is open')
+    client = get_redis_client(write=False)
+    if client is not None:
+        client.ping()
+        return 'Redis cache connection successful'
+    cache.get('health_check')
+    return 'Cache connection successful'
+
+
+class Probe:
+    """
+    A dependency check run on a dedicated thread.
+
+    Args:
+        name (str): Service name in the health report
+        check (callable): Raises if the dependency is unavailable, returns a
+            message otherwise
+    """
+
+    def __init__(self, name, check):
+        self.name = name
+        self.check = check
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'health-{name}')
+        self._lock = threading.Lock()
+        self._future = None
+
+    def _run(self):
+        start = time.perf_counter()
+        message = self.check()
+        return {
+            'status': 'healthy',
+            'message': message,
+            'latency_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def start(self):
+        """
+        Start the check unless the previous one is still running.
+
+        Returns:
+            Future: The running check
+        """
+        with self._lock:
+            if self._future is None or self._future.done():
+                self._future = self._executor.submit(self._run)
+            return self._future
+
+
+def run_probes(probes, timeout):
+    """
+    Run probes concurrently, waiting at most ``timeout`` seconds for each.
+
+    Args:
+        probes (list): The probes to run
+        timeout (float): Deadline in seconds, shared by all probes since they
+            start together
+
+    Returns:
+        dict: Result of each probe by service name
+    """
+    futures = {probe.name: probe.start() for probe in probes}
+    deadline = time.monotonic() + timeout
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            logger.warning("Health check: %s probe timed out after %ss", name, timeout)
+            results[name] = {'status': 'unhealthy', 'message': f'Timed out after {timeout}s'}
+        except Exception as e:
+            logger.error("Health check: %s probe failed", name, exc_info=e)
+            results[name] = {'status': 'unhealthy', 'message': str(e)}
+    return results
+
+
+PROBES = [Probe('database', probe_database), Probe('cache', probe_cache)]
+
+_report_lock = threading.Lock()
+_report = None
+_report_expires = 0.0
+
+
+def health_report():
+    """
+    Return the readiness report, probing only when the cached one expired.
+
+    Concurrent callers share a single round of probes.
+
+    Returns:
+        dict: ``status`` ('healthy' or 'unhealthy'), ``services`` with each
+        probe's result, and ``cached``, True if the report was not probed for
+        this call
+    """
+    global _report, _report_expires
+
+    with _report_lock:
+        if _report is not None and time.monotonic() < _report_expires:
+            return {**_report, 'cached': True}
+
+        services = run_probes(PROBES, settings.HEALTH_CHECK_TIMEOUT)
+        healthy = all(result['status'] == 'healthy' for result in services.values())
+        _report = {'status': 'healthy' if healthy else 'unhealthy', 'services': services}
+        _report_expires = time.monotonic() + settings.HEALTH_CHECK_CACHE_SECONDS
+        return {**_report, 'cached': False}
+
+
+def reset_report():
+    """Discard the cached report, so the next check probes again."""
+    global _report
+    with _report_lock:
+        _report = None
@@ -0,0 +1,106 @@
+"""
+This module holds the NumPy implementations of habit scoring and ranking.
+
+It is only imported by ``habit.analytics`` when there are more habits to rank
+than ``SMALL_INPUT_SIZE``; smaller inputs are handled in pure Python, so serving
+a request never pays for importing NumPy unless the vectorized path pays off.
+"""
+
+from datetime import timezone as dt_timezone
+import numpy as np
+from django.utils import timezone
+from habit.analytics import SCORED_STREAK_FIELDS, calculate_score
+
+
+def normalize_scores(scores):
+    """
+    Normalize the scores to ensure they are on the same scale.
+
+    Parameters
+    ----------
+    scores : list or numpy.ndarray
+        A list of scores to be normalized.
+
+    Returns
+    -------
+    list
+        A list of normalized scores (z-scores), or NaNs if all scores are equal.
+
+    """
+    scores = np.asarray(scores, dtype=float)
+    if scores.size == 0:
+        return []
+    # Sum left to right like habit.analytics.ordered_sum (np.sum adds pairwise),
+    # so both paths compute identical z-scores
+    mean = np.cumsum(scores)[-1] / scores.size
+    deviations = scores - mean
+    sigma = np.sqrt(np.cumsum(deviations * deviations)[-1] / scores.size)
+    if sigma == 0:
+        return [np.nan] * scores.size
+    return list(deviations / sigma)
+
+
+def rank_scores(scores):
+    """
+    Normalize scores and compute their ranking order.
+
+    Parameters
+    ----------
+    scores : list or numpy.ndarray
+        The scores of the habits of one period.
+
+    Returns
+    -------
+    tuple
+        The normalized scores and the indices that sort them in descending order.
+
+    """
+    normalized = np.array(normalize_scores(scores), dtype=float)
+    # Stable sort on the negated scores keeps ties in input order, like sorted(reverse=True)
+    return normalized, np.argsort(-normalized, kind='stable')
+
+
+def score_rows(rows, weights, now):
+    """
+    Score habits from their streak rows with array operations.
+
+    Parameters
+    ----------
+    rows : list
+        Tuples of habit ID, period, number of tasks, creation time and the
+        ``SCORED_STREAK_FIELDS`` counters, ordered by habit ID and streak ID.
+    weights : dict
+        A dictionary containing weights for different factors.
+    now : DateTime
+        The reference time for the habit duration.
+
+    Returns
+    -------
+    dict
+        A mapping of column name to a NumPy array ordered by habit ID, holding
+        ``habit_id``, ``period``, the four streak counters and ``score``.
+
+    """
+    habit_ids, habit_periods, num_of_tasks, creation_times, *counters = zip(*rows)
+    habit_ids = np.array(habit_ids, dtype=np.int64)
+
+    # Rows are ordered by (habit_id, streak id): the last row of each habit is its latest streak
+    latest = np.append(habit_ids[1:] != habit_ids[:-1], True)
+    columns = {'habit_id': habit_ids[latest], 'period': np.array(habit_periods, dtype=object)[latest]}
+    for name, values in zip(SCORED_STREAK_FIELDS, counters):
+        columns[name] = np.array(values, dtype=np.int64)[latest]
+
+    # subtract one day from creation time to avoid ZeroDivisionError
+    naive_now = np.datetime64(timezone.make_naive(now, dt_timezone.utc), 'us')
+    created = np.array([timezone.make_naive(created, dt_timezone.utc) for created in creation_times],
+                       dtype='datetime64[us]')[latest]
+    duration = (naive_now - (created - np.timedelta64(1, 'D'))) // np.timedelta64(1, 'D')
+
+    num_of_tasks = np.array(num_of_tasks)[latest]
+    if not np.all(num_of_tasks * duration):
+        # Arrays divide by zero into inf; fail like calculate_score does on the pure-Python path
+        raise ZeroDivisionError('float division by zero')
+    columns['score'] = calculate_score(columns['num_of_completed_tasks'], columns['num_of_failed_tasks'],
+                                       columns['longest_streak'], columns['current_streak'],
+                                       num_of_tasks, duration, weights)
+    return columns
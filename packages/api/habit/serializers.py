@@ -0,0 +1,233 @@
+"""
+Sparse-fieldset serialization helpers for the JSON API views.
+
+Clients can pass ``?fields=name,streak`` to the habit endpoints to receive only
+the listed keys. The same selection is used to narrow the ORM projection with
+``only()`` and to skip the streak prefetch when no streak data is requested, so
+both the database transfer and the response size shrink.
+"""
+
+from django.db.models import Prefetch
+from habit.models import Streak
+
+
+# Serialized habit fields, in output order.
+HABIT_FIELDS = (
+    'id', 'name', 'period', 'frequency', 'goal', 'notes', 'num_of_tasks',
+    'in_progress', 'progress', 'streak', 'creation_time', 'completion_date',
+)
+
+# Fields of each habit entry in the analysis payload.
+ANALYSIS_HABIT_FIELDS = tuple(
+    name for name in HABIT_FIELDS if name not in ('creation_time', 'completion_date')
+)
+
+# Habit columns each serialized field needs loaded.
+HABIT_FIELD_COLUMNS = {
+    'id': ('id',),
+    'name': ('name',),
+    'period': ('period',),
+    'frequency': ('frequency',),
+    'goal': ('goal',),
+    'notes': ('notes',),
+    'num_of_tasks': ('num_of_tasks',),
+    'in_progress': (),
+    'progress': ('num_of_tasks',),
+    'streak': (),
+    'creation_time': ('creation_time',),
+    'completion_date': ('completion_date',),
+}
+
+STREAK_FIELDS = (
+    'current_streak', 'longest_streak', 'num_of_completed_tasks', 'num_of_failed_tasks',
+)
+
+EMPTY_STREAK = dict.fromkeys(STREAK_FIELDS, 0)
+
+
+class InvalidFieldsError(ValueError):
+    """Raised when ``?fields=`` names a field the endpoint does not serialize."""
+
+
+def parse_fields(request, allowed=HABIT_FIELDS):
+    """
+    Read the sparse fieldset requested through the ``fields`` query parameter.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        The HTTP request.
+    allowed : tuple
+        The fields the endpoint can serialize, in output order.
+
+    Returns
+    -------
+    tuple
+        The requested fields in output order, or ``allowed`` if the parameter is absent.
+
+    Raises
+    ------
+    InvalidFieldsError
+        If any requested field is not in ``allowed``.
+    """
+    raw = request.GET.get('fields', '')
+    requested = {name.strip() for name in raw.split(',') if name.strip()}
+    if not requested:
+        return allowed
+
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise InvalidFieldsError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in allowed if name in requested)
+
+
+def needs_streak(fields):
+    """Return True if serializing ``fields`` reads the habit's streak."""
+    return 'streak' in fields or 'progress' in fields
+
+
+def project_habits(habits, fields):
+    """
+    Restrict a habit queryset to the columns and relations ``fields`` need.
+
+    Parameters
+    ----------
+    habits : QuerySet
+        A queryset of habits, possibly already prefetching streaks.
+    fields : tuple
+        The fields that will be serialized.
+
+    Returns
+    -------
+    QuerySet
+        The queryset loading only the needed habit columns, and prefetching
+        only the needed streak columns (or no streaks at all).
+    """
+    columns = {'id'}
+    for name in fields:
+        columns.update(HABIT_FIELD_COLUMNS[name])
+
+    habits = habits.only(*columns).prefetch_related(None)
+    if needs_streak(fields):
+        streaks = Streak.objects.only('id', 'habit_id', *STREAK_FIELDS).order_by('id')
+        habits = habits.prefetch_related(Prefetch('streak', queryset=streaks))
+    return habits
+
+
+def first_streak(habit):
+    """
+    Return the habit's first streak using the prefetch cache when available.
+
+    Parameters
+    ----------
+    habit : Habit
+        The habit whose streak is to be read.
+
+    Returns
+    -------
+    Streak or None
+        The streak with the lowest ID, or None if the habit has no streak.
+    """
+    if 'streak' in getattr(habit, '_prefetched_objects_cache', {}):
+        streaks = habit.streak.all()
+        return streaks[0] if streaks else None
+    return habit.streak.first()
+
+
+def serialize_habit(habit, fields=HABIT_FIELDS, streak_as_list=False):
+    """
+    Serialize a habit to a dictionary containing only ``fields``.
+
+    Parameters
+    ----------
+    habit : Habit
+        The habit to serialize.
+    fields : tuple
+        The fields to include.
+    streak_as_list : bool, optional
+        If True, the streak is rendered as a list holding zero or one entries
+        (the analysis payload format) instead of a single object.
+
+    Returns
+    -------
+    dict
+        The serialized habit.
+    """
+    data = {}
+    for name in fields:
+        if name == 'streak':
+            streak = first_streak(habit)
+            if streak_as_list:
+                data['streak'] = [serialize_streak(streak)] if streak else []
+            else:
+                data['streak'] = serialize_streak(streak) if streak else dict(EMPTY_STREAK)
+        elif name == 'notes':
+            data['notes'] = habit.notes or ''
+        elif name in ('in_progress', 'progress'):
+            data[name] = getattr(habit, name, 0)
+        elif name in ('creation_time', 'completion_date'):
+            value = getattr(habit, name)
+            data[name] = value.isoformat() if value else None
+        else:
+            data[name] = getattr(habit, name)
+    return data
+
+
+def serialize_streak(streak):
+    """Serialize a streak's counters to a dictionary."""
+    return {name: getattr(streak, name) for name in STREAK_FIELDS}
+
+
+def serialize_analysis(user_id, fields=ANALYSIS_HABIT_FIELDS):
+    """
+    Build the analysis payload of a user.
+
+    Parameters
+    ----------
+    user_id : int
+        The ID of the user.
+    fields : tuple
+        The fields of each habit entry.
+
+    Returns
+    -------
+    dict
+        The user's tracked habits (all and by period) and completed habits, and
+        the habits with the longest streak and longest current streak overall.
+    """
+    from habit.analytics import (
+        all_tracked_habits, habits_by_period, all_completed_habits,
+        longest_streak_over_all_habits, longest_current_streak_over_all_habits,
+        calculate_progress
+    )
+
+    # Get all habits, loading only the columns the requested fields need
+    all_habits = project_habits(all_tracked_habits(user_id=user_id), fields)
+    daily_habits = habits_by_period('daily')(all_habits)
+    weekly_habits = habits_by_period('weekly')(all_habits)
+    monthly_habits = habits_by_period('monthly')(all_habits)
+    completed_habits = project_habits(all_completed_habits(user_id=user_id), fields)
+
+    # Calculate progress
+    if 'progress' in fields:
+        calculate_progress(all_habits)
+        calculate_progress(daily_habits)
+        calculate_progress(weekly_habits)
+        calculate_progress(monthly_habits)
+
+    def serialize(habit):
+        return serialize_habit(habit, fields, streak_as_list=True)
+
+    # Get longest streaks
+    longest_streak_habit = project_habits(longest_streak_over_all_habits(), fields).first()
+    longest_current_streak_habit = project_habits(longest_current_streak_over_all_habits(), fields).first()
+
+    return {
+        'all_habits': [serialize(h) for h in all_habits],
+        'daily_habits': [serialize(h) for h in daily_habits],
+        'weekly_habits': [serialize(h) for h in weekly_habits],
+        'monthly_habits': [serialize(h) for h in monthly_habits],
+        'completed_habits': [serialize(h) for h in completed_habits],
+        'longest_streak_habit': serialize(longest_streak_habit) if longest_streak_habit else None,
+        'longest_current_streak_habit': serialize(longest_current_streak_habit) if longest_current_streak_habit else None,
+    }
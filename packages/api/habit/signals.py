@@ -1,5 +1,8 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from . import streak_index
+from .cached import invalidate_user
 from .models import Habit, Streak
 
 @receiver(post_save, sender=Habit)
@@ -58,3 +61,105 @@ def save_streak(sender, instance, **kwargs):
         streak_instance = instance.streak.first()
         if streak_instance:
             streak_instance.save()
+
+
+@receiver(post_save, sender=Streak)
+def index_streak(sender, instance, **kwargs):
+    """
+    Signal handler for updating the Redis streak indexes when a Streak is saved.
+
+    The indexes are updated once the transaction commits, so a save that is
+    rolled back never reaches Redis.
+
+    Parameters
+    ----------
+    sender : class
+        The class sending the signal (Streak).
+    instance : Streak
+        The Streak instance that was saved.
+    **kwargs : dict
+        Additional keyword arguments.
+
+    Returns
+    -------
+    None
+
+    """
+    transaction.on_commit(lambda: streak_index.record_streak(instance), using=kwargs.get('using'))
+
+
+@receiver(post_delete, sender=Streak)
+def unindex_streak(sender, instance, **kwargs):
+    """
+    Signal handler for removing a habit from the Redis streak indexes when its
+    Streak is deleted (including when the Habit is deleted), once the
+    transaction commits.
+
+    Parameters
+    ----------
+    sender : class
+        The class sending the signal (Streak).
+    instance : Streak
+        The Streak instance that was deleted.
+    **kwargs : dict
+        Additional keyword arguments.
+
+    Returns
+    -------
+    None
+
+    """
+    habit_id = instance.habit_id
+    transaction.on_commit(lambda: streak_index.remove_habit(habit_id), using=kwargs.get('using'))
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def invalidate_cached_habits(sender, instance, **kwargs):
+    """
+    Signal handler for invalidating the cached records of a habit's owner when
+    the Habit is saved or deleted.
+
+    Parameters
+    ----------
+    sender : class
+        The class sending the signal (Habit).
+    instance : Habit
+        The Habit instance that was saved or deleted.
+    **kwargs : dict
+        Additional keyword arguments.
+
+    Returns
+    -------
+    None
+
+    """
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Streak)
+def invalidate_cached_streaks(sender, instance, **kwargs):
+    """
+    Signal handler for invalidating the cached records (the analysis payload)
+    of a habit's owner when the habit's Streak is saved.
+
+    Parameters
+    ----------
+    sender : class
+        The class sending the signal (Streak).
+    instance : Streak
+        The Streak instance that was saved.
+    **kwargs : dict
+        Additional keyword arguments.
+
+    Returns
+    -------
+    None
+
+    """
+    if Streak.habit.is_cached(instance):
+        user_id = instance.habit.user_id
+    else:
+        user_id = Habit.objects.filter(pk=instance.habit_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_user(user_id)
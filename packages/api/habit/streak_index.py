@@ -0,0 +1,246 @@
+"""
+This module maintains Redis sorted-set indexes of the current and longest streak
+of every habit.
+
+Members are habit IDs scored by the streak value. Streak ``post_save`` and
+``post_delete`` signals keep the indexes in sync, so the global top-K habits are
+read with ``ZREVRANGE`` in O(log n + K) instead of an ``ORDER BY`` over the whole
+Streak table. When Redis is not configured, fails, or the index has not been
+backfilled yet (see the ``rebuild_streak_index`` command), readers get None and
+fall back to the database.
+
+A backfill sets a "built" marker next to the indexes. Readers trust the indexes
+only while it is there, and updates only touch indexes that have it, so an empty
+or flushed Redis never holds a partial index that looks complete. An update that
+could not reach Redis (an error, or the cache's circuit breaker being open)
+drops the marker, right away or on the next access to Redis from this process,
+until the next backfill (scheduled hourly).
+"""
+
+import logging
+import threading
+from redis.exceptions import RedisError
+from Habit_Tracker.cache import get_redis_client, make_key
+from habit.models import Streak
+
+logger = logging.getLogger(__name__)
+
+# The hash tag keeps both indexes and their rebuild copies in one cluster slot,
+# which RENAME requires on ElastiCache Serverless (cluster mode).
+INDEX_KEYS = {
+    'current_streak': '{streaks}:current',
+    'longest_streak': '{streaks}:longest',
+}
+# Present while the indexes hold every streak (set by rebuild_index)
+BUILT_KEY = '{streaks}:built'
+
+_lock = threading.Lock()
+# Whether an update was lost while Redis could not be reached to drop the marker
+_state = {'lost_update': False}
+
+
+def index_key(field):
+    """
+    Return the Redis key of the index of a streak field.
+
+    Parameters
+    ----------
+    field : str
+        'current_streak' or 'longest_streak'.
+
+    Returns
+    -------
+    str
+        The prefixed Redis key.
+    """
+    return make_key(INDEX_KEYS[field])
+
+
+def built_key():
+    """
+    Return the Redis key of the marker of complete indexes.
+
+    Returns
+    -------
+    str
+        The prefixed Redis key.
+    """
+    return make_key(BUILT_KEY)
+
+
+def _lose_update(client=None):
+    """
+    Stop trusting the indexes after an update that did not reach Redis.
+
+    Parameters
+    ----------
+    client : redis.Redis, optional
+        The client to drop the marker with; without one, or if that fails, the
+        marker is dropped on the next access from this process.
+    """
+    with _lock:
+        _state['lost_update'] = True
+    if client is not None:
+        try:
+            _drop_lost_marker(client)
+        except RedisError:
+            logger.warning("Could not invalidate the streak indexes", exc_info=True)
+
+
+def _drop_lost_marker(client):
+    """Drop the marker if an update was lost since it was set; return True if it was."""
+    with _lock:
+        lost = _state['lost_update']
+    if lost:
+        client.delete(built_key())
+        with _lock:
+            _state['lost_update'] = False
+    return lost
+
+
+def _update(habit_id, description, apply):
+    """
+    Run ``apply(pipe)`` on a pipeline if the indexes are built, dropping them if it fails.
+    """
+    client = get_redis_client()
+    if client is None:
+        _lose_update()
+        return
+    try:
+        if _drop_lost_marker(client) or not client.exists(built_key()):
+            # Not built: a rebuild will read this streak from the database
+            return
+        pipe = client.pipeline(transaction=False)
+        apply(pipe)
+        pipe.execute()
+    except RedisError:
+        logger.warning("Could not %s streak of habit %s", description, habit_id, exc_info=True)
+        _lose_update(client)
+
+
+def record_streak(streak):
+    """
+    Update the indexed streak values of a habit.
+
+    Parameters
+    ----------
+    streak : Streak
+        The saved streak.
+    """
+    def apply(pipe):
+        for field in INDEX_KEYS:
+            pipe.zadd(index_key(field), {streak.habit_id: getattr(streak, field)})
+
+    _update(streak.habit_id, 'index', apply)
+
+
+def remove_habit(habit_id):
+    """
+    Remove a habit from the streak indexes.
+
+    Parameters
+    ----------
+    habit_id : int
+        The ID of the habit whose streak was deleted.
+    """
+    def apply(pipe):
+        for field in INDEX_KEYS:
+            pipe.zrem(index_key(field), habit_id)
+
+    _update(habit_id, 'unindex', apply)
+
+
+def top_habits(field, k=1):
+    """
+    Read the habits with the highest streak values.
+
+    Parameters
+    ----------
+    field : str
+        'current_streak' or 'longest_streak'.
+    k : int, optional
+        The number of habits to return.
+
+    Returns
+    -------
+    list or None
+        A list of (habit ID, streak value) tuples in descending order, or None if
+        the index is unavailable, not built or empty and the caller should query
+        the database.
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        if _drop_lost_marker(client):
+            return None
+        pipe = client.pipeline(transaction=False)
+        pipe.exists(built_key())
+        pipe.zrevrange(index_key(field), 0, k - 1, withscores=True)
+        built, entries = pipe.execute()
+    except RedisError:
+        logger.warning("Could not read the %s index", field, exc_info=True)
+        return None
+    if not built or not entries:
+        return None
+    return [(int(member), int(score)) for member, score in entries]
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Backfill the streak indexes from the database.
+
+    Streaks are read in primary key batches into temporary sorted sets that
+    replace the live ones atomically with RENAME, so readers never see a
+    partially built index, and the marker that makes readers trust them is set
+    in the same transaction. Streaks saved while the rebuild runs may be
+    overwritten by the values read from the database until they are saved again.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        The number of streaks read and written per round trip.
+
+    Returns
+    -------
+    int
+        The number of indexed streaks.
+
+    Raises
+    ------
+    RuntimeError
+        If the default cache is not Redis-backed.
+    """
+    client = get_redis_client()
+    if client is None:
+        raise RuntimeError("The default cache is not Redis-backed")
+
+    # Updates lost before now are covered by the values read below
+    with _lock:
+        _state['lost_update'] = False
+    fields = list(INDEX_KEYS)
+    staging = {field: index_key(field) + ':rebuild' for field in fields}
+    client.delete(*staging.values())
+
+    last_id, count = 0, 0
+    while True:
+        batch = list(Streak.objects.filter(id__gt=last_id).order_by('id')
+                     .values_list('id', 'habit_id', *fields)[:batch_size])
+        if not batch:
+            break
+        pipe = client.pipeline(transaction=False)
+        for position, field in enumerate(fields, start=2):
+            pipe.zadd(staging[field], {row[1]: row[position] for row in batch})
+        pipe.execute()
+        last_id = batch[-1][0]
+        count += len(batch)
+
+    pipe = client.pipeline(transaction=True)
+    for field in fields:
+        if count:
+            pipe.rename(staging[field], index_key(field))
+        else:
+            pipe.delete(index_key(field))
+    pipe.set(built_key(), 1)
+    pipe.execute()
+    return count
@@ -0,0 +1,174 @@
+"""
+In-memory stand-ins for the subset of redis-py the app uses directly, and for
+the commands the django-redis cache client sends.
+"""
+import math
+import time
+
+from redis.exceptions import ConnectionError
+
+
+class FakePipeline:
+    """Queues commands and runs them against the fake on execute()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class FakeRedis:
+    """Stores strings and sorted sets in dictionaries; members are returned as bytes like redis-py."""
+
+    def __init__(self):
+        self.data = {}
+
+    @staticmethod
+    def encode(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def set(self, key, value):
+        self.data[key] = self.encode(value)
+        return True
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    def rename(self, src, dst):
+        self.data[dst] = self.data.pop(src)
+        return True
+
+    def zadd(self, key, mapping):
+        zset = self.data.setdefault(key, {})
+        added = sum(self.encode(member) not in zset for member in mapping)
+        zset.update({self.encode(member): float(score) for member, score in mapping.items()})
+        return added
+
+    def zrem(self, key, *members):
+        zset = self.data.get(key, {})
+        return sum(zset.pop(self.encode(member), None) is not None for member in members)
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def zrevrange(self, key, start, end, withscores=False):
+        entries = sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+        entries = entries[start:None if end == -1 else end + 1]
+        return entries if withscores else [member for member, _ in entries]
+
+
+class FaultyRedis(FakeRedis):
+    """
+    Fake Redis server for the django-redis client that can be taken down or slowed.
+
+    Plugged in with the ``REDIS_CLIENT_CLASS`` cache option. While ``down`` is
+    set, every command raises ``ConnectionError``; ``latency`` seconds are
+    slept before each command. ``commands`` counts the commands received.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.expires = {}
+        self.down = False
+        self.latency = 0
+        self.commands = 0
+
+    def _command(self):
+        self.commands += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.down:
+            raise ConnectionError('Connection refused')
+
+    def _expired(self, key):
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+    def ping(self):
+        self._command()
+        return True
+
+    def get(self, key):
+        self._command()
+        self._expired(key)
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, nx=False, px=None, xx=False):
+        self._command()
+        self._expired(key)
+        if (nx and key in self.data) or (xx and key not in self.data):
+            return None
+        self.data[key] = self.encode(value)
+        self.expires.pop(key, None)
+        if px is not None:
+            self.expires[key] = time.time() + px / 1000
+        return True
+
+    def delete(self, *keys):
+        self._command()
+        for key in keys:
+            self.expires.pop(key, None)
+        return super().delete(*keys)
+
+    def exists(self, *keys):
+        self._command()
+        for key in keys:
+            self._expired(key)
+        return super().exists(*keys)
+
+    def pexpire(self, key, milliseconds):
+        self._command()
+        if key not in self.data:
+            return False
+        self.expires[key] = time.time() + milliseconds / 1000
+        return True
+
+    def ttl(self, key):
+        self._command()
+        self._expired(key)
+        if key not in self.data:
+            return -2
+        if key not in self.expires:
+            return -1
+        return math.ceil(self.expires[key] - time.time())
+
+    def eval(self, script, numkeys, key, arg):
+        self._command()
+        self._expired(key)
+        if "redis.call('del'" in script:
+            # Compare-and-delete of a lock (Habit_Tracker.single_flight)
+            if self.data.get(key) != self.encode(arg):
+                return 0
+            self.expires.pop(key, None)
+            return FakeRedis.delete(self, key)
+        # The INCRBY scripts of django-redis; with the EXISTS check unless it was skipped
+        if key not in self.data and 'EXISTS' in script:
+            return None
+        value = int(self.data.get(key, 0)) + int(arg)
+        self.data[key] = self.encode(value)
+        return value
+
+    def flushdb(self):
+        self._command()
+        self.data.clear()
+        self.expires.clear()
+        return True
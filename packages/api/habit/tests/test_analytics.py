@@ -1,9 +1,13 @@
+import math
+import random
 from datetime import datetime
-from django.test import TestCase
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
 from django.utils import timezone
 from django.contrib.auth.models import User
 from habit.models import Habit, Streak
-from habit.analytics import rank_habits
+from habit import ranking
+from habit.analytics import rank_habits, rank_habits_by_period, rank_scores, score_rows
 
 
 class AnalyticTestCase(TestCase):
@@ -119,4 +123,52 @@ class AnalyticTestCase(TestCase):
 
         assert ranked_habits[0][1] == 1.2634656762057948
         assert ranked_habits[1][1] == -0.08151391459392247
-        assert ranked_habits[2][1] == -1.1819517616118722
\ No newline at end of file
+        assert ranked_habits[2][1] == -1.1819517616118722
+
+    def test_rank_habits_by_period_matches_single_period(self):
+        weights = {'completed_tasks': -0.2, 'failed_tasks': 0.8, 'longest_streak': -0.2, 'current_streak': -0.1}
+        # One values_list query, one habit query and one streak prefetch
+        with self.assertNumQueries(3):
+            rankings = rank_habits_by_period(weights=weights, periods=['daily', 'weekly', 'monthly'])
+
+        assert rankings['daily'] == rank_habits(weights=weights, period='daily')
+        assert rankings['weekly'] == rank_habits(weights=weights, period='weekly')
+        # A single monthly habit has no spread to normalize against
+        assert rankings['monthly'][0][0] == Habit.objects.get(pk=143)
+        assert math.isnan(rankings['monthly'][0][1])
+
+    def test_numpy_path_matches_pure_python_path(self):
+        weights = {'completed_tasks': -0.2, 'failed_tasks': 0.8, 'longest_streak': -0.2, 'current_streak': -0.1}
+        pure = rank_habits_by_period(weights=weights, periods=['daily', 'weekly'])
+        with mock.patch('habit.analytics.SMALL_INPUT_SIZE', 0):
+            vectorized = rank_habits_by_period(weights=weights, periods=['daily', 'weekly'])
+        assert vectorized == pure
+
+
+class RankScoresTestCase(SimpleTestCase):
+    """Test cases for the pure-Python and NumPy ranking paths."""
+
+    def test_pure_python_ranking_is_identical_to_numpy(self):
+        rng = random.Random(42)
+        for size in (1, 2, 7, 8, 9, 63, 64, 129, 200):
+            scores = [rng.uniform(-5, 5) for _ in range(size)] + [0.5, 0.5]
+            with mock.patch('habit.analytics.SMALL_INPUT_SIZE', len(scores)):
+                normalized, order = rank_scores(scores)
+            expected_normalized, expected_order = ranking.rank_scores(scores)
+            assert normalized == list(expected_normalized)
+            assert order == list(expected_order)
+
+    def test_equal_scores_normalize_to_nan(self):
+        normalized, order = rank_scores([0.3, 0.3])
+        assert all(math.isnan(value) for value in normalized)
+        assert order == [0, 1]
+
+    def test_habits_without_tasks_fail_on_both_paths(self):
+        weights = {'completed_tasks': -0.2, 'failed_tasks': 0.8, 'longest_streak': -0.2, 'current_streak': -0.1}
+        now = timezone.make_aware(datetime(2024, 4, 10))
+        created = timezone.make_aware(datetime(2024, 4, 1))
+        rows = [(1, 'daily', 30, created, 3, 1, 2, 2), (2, 'daily', 0, created, 0, 0, 0, 0)]
+        with self.assertRaises(ZeroDivisionError):
+            score_rows(rows, weights, now)
+        with self.assertRaises(ZeroDivisionError):
+            ranking.score_rows(rows, weights, now)
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from habit.models import Habit, Streak
+
+
+class SparseFieldsTestCase(TestCase):
+    """Test cases for the ``?fields=`` parameter of the JSON API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user = User.objects.create_user(username='test_user_1', password='123456')
+        cls.habit = Habit.objects.create(user=cls.user, name='Reading', frequency=1, period='daily',
+                                         goal=30, notes='Read every day', start_date=timezone.now())
+        Streak.objects.filter(habit=cls.habit).update(current_streak=3, longest_streak=5)
+
+    def setUp(self):
+        """Log in the test user."""
+        self.client.force_login(self.user)
+
+    def test_habits_without_fields_returns_everything(self):
+        response = self.client.get(reverse('api-habits'))
+        habit = response.json()['habits'][0]
+        assert response.status_code == 200
+        assert habit['notes'] == 'Read every day'
+        assert habit['streak']['current_streak'] == 3
+        assert 'creation_time' in habit
+
+    def test_habits_fields_prunes_output(self):
+        response = self.client.get(reverse('api-habits'), {'fields': 'name,streak'})
+        habit = response.json()['habits'][0]
+        assert response.status_code == 200
+        assert set(habit) == {'name', 'streak'}
+        assert habit['name'] == 'reading'
+        assert habit['streak']['longest_streak'] == 5
+
+    def test_habits_fields_skips_streak_prefetch(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('api-habits'), {'fields': 'id,name'})
+        assert not any('habit_streak' in query['sql'] for query in queries.captured_queries)
+
+    def test_habits_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('api-habits'), {'fields': 'name,password'})
+        assert response.status_code == 400
+        assert 'password' in response.json()['error']
+
+    def test_analysis_fields_prunes_every_list(self):
+        response = self.client.get(reverse('api-analysis'), {'fields': 'name,streak'})
+        data = response.json()
+        assert response.status_code == 200
+        assert data['all_habits'] == [{'name': 'reading', 'streak': [{
+            'current_streak': 3, 'longest_streak': 5,
+            'num_of_completed_tasks': 0, 'num_of_failed_tasks': 0,
+        }]}]
+        assert set(data['longest_streak_habit']) == {'name', 'streak'}
@@ -0,0 +1,73 @@
+import json
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from habit import async_views, health, probes
+from habit.models import Habit, Streak, TaskTracker
+
+
+class AsyncViewsTestCase(TestCase):
+    """Test cases comparing the async read views with the synchronous ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user = User.objects.create_user(username='test_user_1', password='123456')
+        cls.habit = Habit.objects.create(user=cls.user, name='Reading', frequency=1, period='daily',
+                                         goal=30, notes='Read every day', start_date=timezone.now())
+        running = Habit.objects.create(user=cls.user, name='Running', frequency=1, period='weekly',
+                                       goal=12, notes='', start_date=timezone.now())
+        TaskTracker.create_tasks(cls.habit)
+        TaskTracker.create_tasks(running)
+        Streak.objects.filter(habit=cls.habit).update(current_streak=3, longest_streak=5)
+        cls.factory = RequestFactory()
+
+    def call(self, view_class, user=None, method='get', data=None, **kwargs):
+        request = getattr(self.factory, method)('/', data or {})
+        request.user = user or self.user
+        view = view_class.as_view()
+        if view_class.view_is_async:
+            view = async_to_sync(view)
+        response = view(request, **kwargs)
+        return response.status_code, json.loads(response.content)
+
+    def assert_same(self, name, **kwargs):
+        sync_view, async_view = getattr(health, name), getattr(async_views, f'Async{name}')
+        assert self.call(async_view, **kwargs) == self.call(sync_view, **kwargs)
+
+    def test_read_endpoints_match_sync_views(self):
+        self.assert_same('AuthCheckView')
+        self.assert_same('ProfileView')
+        self.assert_same('HabitsView')
+        self.assert_same('HabitsView', data={'fields': 'name,streak,progress'})
+        self.assert_same('HabitDetailView', habit_id=self.habit.id)
+        self.assert_same('AnalysisView')
+        self.assert_same('AnalysisView', data={'fields': 'name,streak'})
+        for task_type in ('due_today', 'active', 'upcoming', 'unknown'):
+            self.assert_same('TasksView', data={'type': task_type})
+
+    def test_errors_match_sync_views(self):
+        self.assert_same('HabitDetailView', habit_id=self.habit.id + 100)
+        self.assert_same('HabitsView', data={'fields': 'password'})
+        for name in ('ProfileView', 'HabitsView', 'TasksView', 'AnalysisView'):
+            self.assert_same(name, user=AnonymousUser())
+
+    def test_writes_are_delegated_to_sync_views(self):
+        status, data = self.call(async_views.AsyncAnalysisView, method='post',
+                                 data={'selectedValue': self.habit.id})
+        assert status == 200
+        assert data['id'] == self.habit.id
+        assert data['streak'][0]['longest_streak'] == 5
+
+    def test_health_uses_shared_probes(self):
+        def refused():
+            raise ConnectionError('cache down')
+
+        probes.reset_report()
+        self.addCleanup(probes.reset_report)
+        with mock.patch.object(probes, 'PROBES', [probes.Probe('cache', refused)]):
+            status, data = self.call(async_views.AsyncHealthCheckView)
+        assert status == 503
+        assert data['services'] == {'cache': {'status': 'unhealthy', 'message': 'cache down'}}
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from Habit_Tracker import auth_cache
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+class CachedUserTestCase(TestCase):
+    """Test cases for the cached resolution of request.user."""
+
+    def setUp(self):
+        cache.clear()
+        auth_cache.clear_local()
+        self.user = User.objects.create_user(username='test_user_1', password='123456', email='a@b.c')
+        self.client.force_login(self.user)
+
+    def check(self):
+        return self.client.get(reverse('auth-check')).json()
+
+    def test_auth_check_needs_no_sql_once_cached(self):
+        assert self.check()['authenticated'] is True
+        with self.assertNumQueries(0):
+            data = self.check()
+        assert data == {'authenticated': True, 'user_id': self.user.id, 'username': 'test_user_1'}
+        # The Redis layer alone is enough as well
+        auth_cache.clear_local()
+        with self.assertNumQueries(0):
+            assert self.check()['authenticated'] is True
+
+    def test_password_change_invalidates_sessions(self):
+        self.check()
+        self.user.set_password('new-password')
+        self.user.save()
+        assert cache.get(auth_cache.cache_key(self.user.id)) is None
+        assert self.check()['authenticated'] is False
+
+    def test_deleted_or_inactive_user_is_anonymous(self):
+        self.check()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        auth_cache.invalidate(self.user.pk)
+        assert self.check()['authenticated'] is False
+        self.client.force_login(User.objects.create_user(username='test_user_2', password='123456'))
+        self.check()
+        User.objects.get(username='test_user_2').delete()
+        assert self.check()['authenticated'] is False
+
+    def test_cached_user_defers_other_fields(self):
+        self.check()
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        user = auth_cache.get_user(request)
+        assert user.email == 'a@b.c'
+        assert user.get_deferred_fields() == {'password'}
+        with self.assertNumQueries(1):
+            assert user.check_password('123456')
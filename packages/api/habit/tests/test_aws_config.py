@@ -0,0 +1,85 @@
+import json
+import os
+from unittest import mock
+import boto3
+from botocore.stub import Stubber
+from django.test import SimpleTestCase
+from Habit_Tracker import aws_config
+
+PREFIX = '/habit-tracker/test'
+CONFIG_ENV = ('DB_NAME', 'DB_USER', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT', 'DB_READER_HOST',
+              'REDIS_HOST', 'REDIS_PORT', 'SECRET_KEY', 'DEBUG', 'ALLOWED_HOSTS', 'CSRF_TRUSTED_ORIGINS')
+
+
+def make_client(service):
+    return boto3.session.Session().client(
+        service, region_name='us-east-1', aws_access_key_id='test', aws_secret_access_key='test')
+
+
+class LoadAwsConfigTestCase(SimpleTestCase):
+    """Test cases for load_aws_config against stubbed AWS clients."""
+
+    def setUp(self):
+        env = {key: value for key, value in os.environ.items() if key not in CONFIG_ENV}
+        env.update(AWS_SECRET_NAME='habit-tracker/test/aurora', AWS_SSM_PREFIX=PREFIX)
+        patcher = mock.patch.dict(os.environ, env, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.clients = {'secretsmanager': make_client('secretsmanager'), 'ssm': make_client('ssm')}
+        patcher = mock.patch.dict(aws_config._clients, self.clients, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.secrets = Stubber(self.clients['secretsmanager'])
+        self.ssm = Stubber(self.clients['ssm'])
+
+    def test_parameters_are_fetched_in_one_call(self):
+        self.secrets.add_response(
+            'get_secret_value',
+            {'SecretString': json.dumps({'dbname': 'habits', 'username': 'app', 'password': 'pw',
+                                         'host': 'secret-host', 'port': 5432})},
+            {'SecretId': 'habit-tracker/test/aurora'})
+        names = [f'{PREFIX}/aurora/writer_endpoint', f'{PREFIX}/aurora/reader_endpoint',
+                 f'{PREFIX}/redis/endpoint', f'{PREFIX}/django/secret_key', f'{PREFIX}/django/debug',
+                 f'{PREFIX}/django/allowed_hosts', f'{PREFIX}/django/csrf_trusted_origins']
+        self.ssm.add_response(
+            'get_parameters',
+            {'Parameters': [
+                {'Name': names[0], 'Value': 'writer.example.com'},
+                {'Name': names[2], 'Value': 'cache.example.com:6380'},
+                {'Name': names[3], 'Value': 'not-a-real-key'},
+            ], 'InvalidParameters': [names[1], *names[4:]]},
+            {'Names': names, 'WithDecryption': True})
+
+        with self.secrets, self.ssm:
+            timings = aws_config.load_aws_config()
+            self.secrets.assert_no_pending_responses()
+            self.ssm.assert_no_pending_responses()
+
+        assert os.environ['DB_HOST'] == 'writer.example.com'
+        assert os.environ['DB_USER'] == 'app'
+        assert (os.environ['REDIS_HOST'], os.environ['REDIS_PORT']) == ('cache.example.com', '6380')
+        assert os.environ['SECRET_KEY'] == 'not-a-real-key'
+        assert os.environ['ALLOWED_HOSTS'] == '*'
+        assert 'DB_READER_HOST' not in os.environ
+        assert set(timings) == {'secrets_client', 'secret', 'ssm_client', 'parameters', 'total'}
+
+    def test_failures_leave_environment_to_defaults(self):
+        self.secrets.add_client_error('get_secret_value', 'ResourceNotFoundException')
+        self.ssm.add_client_error('get_parameters', 'AccessDeniedException')
+
+        with self.secrets, self.ssm, mock.patch('builtins.print'):
+            aws_config.load_aws_config()
+
+        assert 'DB_HOST' not in os.environ
+        assert os.environ['ALLOWED_HOSTS'] == '*'
+
+    def test_get_parameters_batches_names(self):
+        names = [f'{PREFIX}/param/{i}' for i in range(12)]
+        self.ssm.add_response('get_parameters', {'Parameters': [{'Name': names[0], 'Value': 'a'}]},
+                              {'Names': names[:10], 'WithDecryption': False})
+        self.ssm.add_response('get_parameters', {'Parameters': [{'Name': names[11], 'Value': 'b'}]},
+                              {'Names': names[10:], 'WithDecryption': False})
+
+        with self.ssm:
+            assert aws_config.get_parameters(names) == {names[0]: 'a', names[11]: 'b'}
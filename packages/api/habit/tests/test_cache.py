@@ -0,0 +1,66 @@
+import zlib
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from redis import BlockingConnectionPool
+from redis.connection import _HiredisParser
+from Habit_Tracker import cache as cache_helpers
+from Habit_Tracker.cache import ThresholdZlibCompressor
+
+REDIS_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        # Nothing listens here: the tests only build clients and connections
+        'LOCATION': 'redis://127.0.0.1:1/1',
+        'OPTIONS': {
+            'CONNECTION_POOL_CLASS': 'redis.BlockingConnectionPool',
+            'CONNECTION_POOL_KWARGS': {'max_connections': 7, 'timeout': 0.5},
+            'SOCKET_CONNECT_TIMEOUT': 0.25,
+            'SOCKET_TIMEOUT': 0.5,
+            'COMPRESSOR': 'Habit_Tracker.cache.ThresholdZlibCompressor',
+            'COMPRESS_MIN_SIZE': 64,
+        },
+    },
+}
+
+
+class ThresholdZlibCompressorTestCase(SimpleTestCase):
+    """Test cases for the Redis cache compressor."""
+
+    def test_small_values_are_left_uncompressed(self):
+        compressor = ThresholdZlibCompressor({'COMPRESS_MIN_SIZE': 64})
+        assert compressor.compress(b'x' * 63) == b'x' * 63
+        compressed = compressor.compress(b'x' * 64)
+        assert compressed != b'x' * 64
+        assert zlib.decompress(compressed) == b'x' * 64
+
+    @override_settings(CACHES=REDIS_CACHES)
+    def test_backend_round_trips_mixed_values(self):
+        client = caches['redis'].client
+        snapshot = {'habits': [{'id': i, 'name': f'habit {i}'} for i in range(100)]}
+        encoded = client.encode(snapshot)
+        assert len(encoded) < len(client._serializer.dumps(snapshot))
+        assert client.decode(encoded) == snapshot
+        assert client.decode(client.encode('small')) == 'small'
+
+
+@override_settings(CACHES=REDIS_CACHES)
+class RedisClientTestCase(SimpleTestCase):
+    """Test cases for the django-redis connection settings."""
+
+    def test_pool_and_timeouts_come_from_options(self):
+        client = cache_helpers.get_redis_client('redis', write=False)
+        pool = client.connection_pool
+        assert isinstance(pool, BlockingConnectionPool)
+        assert pool.max_connections == 7
+        assert pool.timeout == 0.5
+        assert pool.connection_kwargs['socket_connect_timeout'] == 0.25
+        assert pool.connection_kwargs['socket_timeout'] == 0.5
+
+    def test_replies_are_parsed_with_hiredis(self):
+        connection = cache_helpers.get_redis_client('redis').connection_pool.make_connection()
+        assert isinstance(connection._parser, _HiredisParser)
+
+    def test_non_redis_cache_has_no_client(self):
+        assert cache_helpers.get_redis_client('default') is None
+
@@ -0,0 +1,225 @@
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends import cached_db
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from Habit_Tracker import auth_cache, circuit_breaker, sessions, tiered_cache
+from Habit_Tracker.cache import get_redis_client
+from habit.models import CacheInvalidation
+from habit.probes import probe_cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'Habit_Tracker.circuit_breaker.CircuitBreakerRedisCache',
+        'LOCATION': 'redis://fake:6379/1',
+        'OPTIONS': {
+            'REDIS_CLIENT_CLASS': 'habit.tests.fake_redis.FaultyRedis',
+            'BREAKER_FAILURE_THRESHOLD': 3,
+            'BREAKER_SLOW_CALL_SECONDS': 0.05,
+            'BREAKER_RESET_TIMEOUT': 5,
+        },
+    }
+}
+
+
+@override_settings(CACHES=CACHES)
+class CircuitBreakerTestCase(TestCase):
+    """Test cases for the Redis cache backend's circuit breaker, against a fault-injecting fake Redis."""
+
+    def setUp(self):
+        circuit_breaker.reset_breakers()
+        circuit_breaker.reset_stats()
+        cache.fallback.clear()
+        self.redis = cache.client.get_client()
+        self.redis.down, self.redis.latency = False, 0
+        self.redis.data.clear()
+
+    def trip(self):
+        self.redis.down = True
+        for _ in range(3):
+            cache.get('key')
+        assert cache.breaker.state == circuit_breaker.OPEN
+
+    def test_consecutive_failures_open_the_circuit(self):
+        cache.set('key', 'value')
+        assert cache.get('key') == 'value'
+        self.trip()
+        commands = self.redis.commands
+        assert cache.get('key') is None
+        cache.set('other', 'fallback')
+        assert cache.get('other') == 'fallback'
+        # Served in-process without touching Redis
+        assert self.redis.commands == commands
+        stats = circuit_breaker.get_stats()
+        assert (stats['failures'], stats['trips'], stats['fallbacks'], stats['open_circuits']) == (3, 1, 3, 1)
+
+    def test_success_resets_the_failure_count(self):
+        self.redis.down = True
+        cache.get('key')
+        cache.get('key')
+        self.redis.down = False
+        cache.get('key')
+        self.redis.down = True
+        cache.get('key')
+        cache.get('key')
+        assert cache.breaker.state == circuit_breaker.CLOSED
+
+    def test_slow_calls_open_the_circuit(self):
+        self.redis.latency = 0.06
+        cache.set('key', 'value')
+        assert cache.get('key') == 'value'
+        cache.get('key')
+        assert cache.breaker.state == circuit_breaker.OPEN
+        assert circuit_breaker.get_stats()['slow_calls'] == 3
+
+    def test_half_open_probe_closes_the_circuit_and_purges_stale_keys(self):
+        cache.set('session', 'old')
+        with mock.patch('time.monotonic', return_value=1000):
+            self.trip()
+            cache.set('session', 'new')
+            self.redis.down = False
+            assert cache.get('session') == 'new'
+        with mock.patch('time.monotonic', return_value=1005):
+            # The probe finds Redis back and drops the key written while open
+            assert cache.get('session') is None
+        assert cache.breaker.state == circuit_breaker.CLOSED
+        assert cache.make_key('session') not in self.redis.data
+        assert circuit_breaker.get_stats()['recoveries'] == 1
+
+    def test_purged_keys_are_deleted_one_per_command(self):
+        with mock.patch('time.monotonic', return_value=1000):
+            self.trip()
+            cache.set('a', 1)
+            cache.set('b', 2)
+            self.redis.down = False
+        # A multi-key DEL fails with CROSSSLOT on the cluster endpoint
+        with mock.patch('time.monotonic', return_value=1005), \
+                mock.patch.object(self.redis, 'delete', wraps=self.redis.delete) as delete:
+            cache.get('a')
+        assert sorted(call.args for call in delete.call_args_list) == [(cache.make_key('a'),), (cache.make_key('b'),)]
+
+    def test_failed_probe_keeps_the_circuit_open(self):
+        with mock.patch('time.monotonic', return_value=1000):
+            self.trip()
+        with mock.patch('time.monotonic', return_value=1005):
+            commands = self.redis.commands
+            cache.get('key')
+            assert self.redis.commands == commands + 1
+            assert cache.breaker.state == circuit_breaker.OPEN
+            cache.get('key')
+            assert self.redis.commands == commands + 1
+        assert circuit_breaker.get_stats()['trips'] == 1
+
+    def test_incr_falls_back_like_a_missing_key(self):
+        cache.set('gen', 1)
+        assert cache.incr('gen') == 2
+        self.trip()
+        with self.assertRaises(ValueError):
+            cache.incr('gen')
+        cache.add('gen', 10)
+        assert cache.incr('gen') == 11
+
+    def test_invalidations_reach_redis_while_open(self):
+        cache.set('record', 'old')
+        self.trip()
+        # Open for this container only: Redis answers the others
+        self.redis.down = False
+        circuit_breaker.invalidate(caches['default'], ['record'])
+        assert cache.make_key('record') not in self.redis.data
+        assert not CacheInvalidation.objects.exists()
+
+    def test_unreachable_invalidations_are_recorded_and_replayed(self):
+        cache.set('record', 'old')
+        self.trip()
+        circuit_breaker.invalidate(caches['default'], ['record'])
+        assert list(CacheInvalidation.objects.values_list('key', flat=True)) == [cache.make_key('record')]
+        assert circuit_breaker.get_stats()['recorded_invalidations'] == 1
+        with self.assertRaises(CommandError):
+            call_command('replay_cache_invalidations', stdout=StringIO())
+        assert CacheInvalidation.objects.count() == 1
+        self.redis.down = False
+        out = StringIO()
+        call_command('replay_cache_invalidations', stdout=out)
+        assert out.getvalue().strip() == 'Replayed 1 cache invalidations'
+        assert cache.make_key('record') not in self.redis.data
+        assert not CacheInvalidation.objects.exists()
+
+    def test_invalidations_fail_loudly_if_they_cannot_be_recorded(self):
+        self.trip()
+        with mock.patch.object(QuerySet, 'bulk_create', side_effect=DatabaseError('unavailable')):
+            with self.assertRaises(DatabaseError):
+                circuit_breaker.invalidate(caches['default'], ['record'])
+
+    def test_generation_bumps_reach_redis_while_open(self):
+        tiered_cache.clear_local()
+        generation = tiered_cache.get_generation('user:1')
+        self.trip()
+        self.redis.down = False
+        tiered_cache.bump_generation('user:1')
+        assert cache.make_key(tiered_cache.generation_key('user:1')) not in self.redis.data
+        assert tiered_cache.get_generation('user:1') != generation
+
+    def test_direct_clients_and_health_fail_fast_while_open(self):
+        assert get_redis_client() is self.redis
+        assert probe_cache() == 'Redis cache connection successful'
+        self.trip()
+        assert get_redis_client() is None
+        with self.assertRaisesMessage(RuntimeError, 'circuit breaker is open'):
+            probe_cache()
+
+
+@override_settings(CACHES=CACHES, SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class SessionFallbackTestCase(TestCase):
+    """Test cases for sessions and auth while the Redis circuit is open."""
+
+    def setUp(self):
+        circuit_breaker.reset_breakers()
+        cache.fallback.clear()
+        auth_cache.clear_local()
+        self.redis = cache.client.get_client()
+        self.redis.down, self.redis.latency = False, 0
+        self.redis.data.clear()
+        self.user = User.objects.create_user(username='test_user_1', password='123456')
+        self.client.force_login(self.user)
+
+    def test_sessions_are_read_from_the_database(self):
+        assert self.client.get(reverse('auth-check')).json()['authenticated'] is True
+        self.redis.down = True
+        for _ in range(4):
+            assert self.client.get(reverse('auth-check')).json()['authenticated'] is True
+        assert cache.breaker.state == circuit_breaker.OPEN
+
+    def trip(self):
+        self.redis.down = True
+        for _ in range(3):
+            cache.get('key')
+        assert cache.breaker.state == circuit_breaker.OPEN
+        self.redis.down = False
+
+    def test_changed_users_are_invalidated_in_redis_while_open(self):
+        self.client.get(reverse('auth-check'))
+        key = cache.make_key(auth_cache.cache_key(self.user.pk))
+        assert key in self.redis.data
+        self.trip()
+        self.user.set_password('654321')
+        self.user.save()
+        assert key not in self.redis.data
+
+    def test_deleted_sessions_are_removed_from_redis_while_open(self):
+        # Production stores sessions with cached_db beneath Habit_Tracker.sessions
+        class SessionStore(sessions.SessionStore, cached_db.SessionStore):
+            pass
+
+        store = SessionStore()
+        store['habit'] = 1
+        store.save()
+        key = cache.make_key(store.cache_key)
+        assert key in self.redis.data
+        self.trip()
+        store.flush()
+        assert key not in self.redis.data
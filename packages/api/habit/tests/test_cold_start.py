@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.test import SimpleTestCase
+
+# Modules a cold start must not import before the first request that needs them
+DEFERRED_MODULES = ('numpy', 'habit.ranking')
+
+
+class ColdStartImportTestCase(SimpleTestCase):
+    """Regression tests for what booting the API imports."""
+
+    def boot(self, settings_module, code=''):
+        """Boot Django in a fresh interpreter and return the deferred modules it imported."""
+        script = (
+            "import json, sys, django\n"
+            "django.setup()\n"
+            "from django.urls import get_resolver\n"
+            "get_resolver().url_patterns\n"
+            f"{code}"
+            f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))\n"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+        result = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR,
+                                env=env, capture_output=True, text=True, check=True)
+        return json.loads(result.stdout)
+
+    def test_api_profile_does_not_import_numpy(self):
+        assert self.boot('Habit_Tracker.settings_api') == []
+
+    def test_full_urlconf_does_not_import_numpy(self):
+        # habit.views imports the analytics and leaderboard modules
+        assert self.boot('Habit_Tracker.settings') == []
+
+    def test_small_rankings_stay_pure_python(self):
+        code = "from habit.analytics import rank_scores\nrank_scores([1.0, 2.0, 3.0])\n"
+        assert self.boot('Habit_Tracker.settings', code) == []
@@ -0,0 +1,70 @@
+from unittest import mock
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import SimpleTestCase, TestCase, override_settings
+from Habit_Tracker import db_connections
+
+
+class FakeConnection:
+    """Just enough of a DatabaseWrapper for the lifecycle hooks."""
+
+    def __init__(self, alias, open=True):
+        self.alias = alias
+        self.connection = object() if open else None
+
+    def close(self):
+        self.connection = None
+
+
+@override_settings(DATABASE_CONN_MAX_IDLE=300)
+class ConnectionLifecycleTestCase(SimpleTestCase):
+    """Test cases for idle recycling and the reuse counters."""
+
+    def setUp(self):
+        db_connections.reset_stats()
+        self.addCleanup(db_connections.reset_stats)
+        self.conns = [FakeConnection('default'), FakeConnection('reader', open=False)]
+        patcher = mock.patch.object(db_connections, 'connections')
+        patcher.start().all.return_value = self.conns
+        self.addCleanup(patcher.stop)
+
+    def test_recent_connection_is_reused(self):
+        db_connections.release_connections(now=1000)
+        db_connections.prepare_connections(now=1100)
+        assert self.conns[0].connection is not None
+        assert db_connections.get_stats()['reuses'] == 1
+
+    def test_idle_connection_is_recycled(self):
+        db_connections.release_connections(now=1000)
+        db_connections.prepare_connections(now=1301)
+        assert self.conns[0].connection is None
+        stats = db_connections.get_stats()
+        assert stats['idle_recycles'] == 1
+        assert stats['reuses'] == 0
+
+    def test_reuse_ratio(self):
+        assert db_connections.get_stats()['reuse_ratio'] is None
+        connection_created.send(sender=None, connection=self.conns[0])
+        for now in (1000, 1010, 1020):
+            db_connections.prepare_connections(now=now)
+            db_connections.release_connections(now=now)
+        stats = db_connections.get_stats()
+        assert (stats['connects'], stats['reuses']) == (1, 3)
+        assert stats['reuse_ratio'] == 0.75
+
+
+class ConnectionLifecycleMiddlewareTestCase(TestCase):
+    """Test cases for ConnectionLifecycleMiddleware on real requests."""
+
+    def setUp(self):
+        db_connections.reset_stats()
+        self.addCleanup(db_connections.reset_stats)
+
+    def test_requests_reuse_the_open_connection(self):
+        connection.ensure_connection()
+        self.client.get('/api/auth/check/')
+        self.client.get('/api/auth/check/')
+        stats = db_connections.get_stats()
+        assert stats['reuses'] == 2
+        assert stats['connects'] == 0
+        assert connection.connection is not None
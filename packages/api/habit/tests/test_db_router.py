@@ -0,0 +1,143 @@
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from Habit_Tracker import db_router, tiered_cache
+from Habit_Tracker.middleware import ReplicaPinningMiddleware
+from habit.analytics import update_user_activity
+from habit.cached import analysis_data
+from habit.serializers import ANALYSIS_HABIT_FIELDS
+from habit.models import Habit, Streak, TaskTracker
+
+# The router only needs the reader alias to be configured to route to it
+TWO_ALIASES = {
+    'default': settings.DATABASES['default'],
+    'reader': {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}},
+}
+
+
+@override_settings(DATABASES=TWO_ALIASES)
+class ReadReplicaRouterTestCase(SimpleTestCase):
+    """Test cases for ReadReplicaRouter and ReplicaPinningMiddleware."""
+
+    def setUp(self):
+        self.router = db_router.ReadReplicaRouter()
+        token = db_router.start_request()
+        self.addCleanup(db_router.end_request, token)
+
+    def test_analytics_reads_go_to_reader(self):
+        assert self.router.db_for_read(Habit) == 'reader'
+        assert self.router.db_for_read(Streak) == 'reader'
+
+    def test_other_apps_use_default_routing(self):
+        assert self.router.db_for_read(User) is None
+
+    def test_reads_after_write_stick_to_writer(self):
+        assert self.router.db_for_write(Habit) == 'default'
+        assert db_router.wrote()
+        assert self.router.db_for_read(Habit) == 'default'
+
+    def test_writes_to_other_apps_do_not_pin(self):
+        assert self.router.db_for_write(User) == 'default'
+        assert self.router.db_for_read(Habit) == 'reader'
+
+    def test_related_reads_follow_instance_database(self):
+        habit = Habit(id=1)
+        habit._state.db = 'default'
+        assert self.router.db_for_read(Streak, instance=habit) == 'default'
+
+    def test_reader_is_never_migrated(self):
+        assert self.router.allow_migrate('reader', 'habit') is False
+        assert self.router.allow_migrate('default', 'habit') is None
+
+    @override_settings(DATABASES={'default': settings.DATABASES['default']})
+    def test_without_reader_default_routing_is_used(self):
+        assert self.router.db_for_read(Habit) is None
+
+    def test_read_from_writer_only_pins_the_block(self):
+        with db_router.read_from_writer():
+            assert self.router.db_for_read(Habit) == 'default'
+        assert self.router.db_for_read(Habit) == 'reader'
+        with db_router.read_from_writer():
+            self.router.db_for_write(Habit)
+        # A write inside the block still pins the request (read-your-writes)
+        assert self.router.db_for_read(Habit) == 'default'
+        assert db_router.wrote()
+
+    def test_middleware_pins_client_after_write(self):
+        factory = RequestFactory()
+
+        def write_view(request):
+            self.router.db_for_write(Habit)
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(write_view)(factory.post('/api/habits/'))
+        assert response.cookies[ReplicaPinningMiddleware.cookie_name]['max-age'] == 2
+
+        def read_view(request):
+            return HttpResponse(self.router.db_for_read(Habit))
+
+        request = factory.get('/api/habits/')
+        request.COOKIES[ReplicaPinningMiddleware.cookie_name] = '1'
+        assert ReplicaPinningMiddleware(read_view)(request).content == b'default'
+        response = ReplicaPinningMiddleware(read_view)(factory.get('/api/habits/'))
+        assert response.content == b'reader'
+        assert ReplicaPinningMiddleware.cookie_name not in response.cookies
+
+
+@override_settings(DATABASES=TWO_ALIASES)
+class ReplicaPinningViewTestCase(TestCase):
+    """Test cases for the routing of reads made by views."""
+
+    def setUp(self):
+        # Outside a request, reads would go to the reader, which only exists in the settings here
+        token = db_router.start_request(pinned=True)
+        self.user = User.objects.create_user(username='test_user_1', password='123456')
+        self.habit = Habit.objects.create(user=self.user, name='Test Habit', frequency=1,
+                                          period='daily', goal=7, notes='', start_date=timezone.now())
+        self.task = TaskTracker.objects.create(habit=self.habit, task_number=1)
+        self.client.force_login(self.user)
+        db_router.end_request(token)
+
+    def test_unsafe_requests_read_from_writer(self):
+        routed = []
+        db_for_read = db_router.ReadReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            if db_router.is_replicated(model):
+                routed.append(alias)
+            return alias
+
+        with mock.patch.object(db_router.ReadReplicaRouter, 'db_for_read', record):
+            response = self.client.post(reverse('api-complete-task'),
+                                        {'task_id': self.task.id, 'habit_id': self.habit.id})
+        assert response.status_code == 200
+        # The task, habit and streak were read from the writer before being updated
+        assert routed and set(routed) == {'default'}
+        assert Streak.objects.using('default').get(habit=self.habit).current_streak == 1
+
+    def test_failed_task_sweep_reads_from_writer(self):
+        self.task.due_date = timezone.now() - timezone.timedelta(days=1)
+        self.task.task_status = 'In progress'
+        self.task.save()
+        token = db_router.start_request()
+        self.addCleanup(db_router.end_request, token)
+        # GET requests are not pinned; a read from the reader would fail here
+        update_user_activity(self.user.id)
+        self.task.refresh_from_db()
+        assert self.task.task_status == 'Failed'
+
+    def test_cached_analysis_is_computed_from_writer(self):
+        token = db_router.start_request()
+        self.addCleanup(db_router.end_request, token)
+        cache.clear()
+        tiered_cache.clear_local()
+        # A read from the reader would fail here
+        payload = analysis_data(self.user.id, ANALYSIS_HABIT_FIELDS)
+        assert [habit['id'] for habit in payload['all_habits']] == [self.habit.id]
+        assert not db_router.is_pinned()
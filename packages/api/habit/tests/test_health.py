@@ -0,0 +1,75 @@
+import threading
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from habit import probes
+
+
+@override_settings(HEALTH_CHECK_TIMEOUT=0.2, HEALTH_CHECK_CACHE_SECONDS=60)
+class HealthCheckTestCase(TestCase):
+    """Test cases for the readiness probes and the liveness endpoint."""
+
+    def setUp(self):
+        probes.reset_report()
+        self.addCleanup(probes.reset_report)
+
+    def test_readiness_probes_database_and_cache(self):
+        with mock.patch.object(cache, 'set') as cache_set:
+            response = self.client.get(reverse('health-check'))
+        data = response.json()
+        assert response.status_code == 200
+        assert data['status'] == 'healthy'
+        assert set(data['services']) == {'database', 'cache'}
+        assert data['services']['database']['latency_ms'] >= 0
+        cache_set.assert_not_called()
+
+    def test_report_is_cached(self):
+        calls = []
+        probe = probes.Probe('database', lambda: calls.append(1) or 'ok')
+        with mock.patch.object(probes, 'PROBES', [probe]):
+            assert probes.health_report()['cached'] is False
+            report = probes.health_report()
+        assert report['cached'] is True
+        assert report['services']['database']['message'] == 'ok'
+        assert len(calls) == 1
+
+    def test_probes_run_concurrently(self):
+        slow = [probes.Probe(name, lambda: time.sleep(0.1) or 'ok') for name in ('a', 'b', 'c')]
+        start = time.monotonic()
+        results = probes.run_probes(slow, timeout=1)
+        assert time.monotonic() - start < 0.25
+        assert all(result['status'] == 'healthy' for result in results.values())
+
+    def test_hung_probe_times_out_without_piling_up(self):
+        release = threading.Event()
+        calls = []
+        hung = probes.Probe('database', lambda: calls.append(1) or release.wait(5) and 'ok')
+        self.addCleanup(release.set)
+        with mock.patch.object(probes, 'PROBES', [hung]):
+            start = time.monotonic()
+            response = self.client.get(reverse('health-check'))
+            assert time.monotonic() - start < 1
+            probes.reset_report()
+            self.client.get(reverse('health-check'))
+        assert response.status_code == 503
+        assert response.json()['services']['database'] == {'status': 'unhealthy', 'message': 'Timed out after 0.2s'}
+        # The second check waited on the same stuck attempt instead of starting another
+        assert len(calls) == 1
+
+    def test_failing_probe_reports_error(self):
+        def refused():
+            raise ConnectionError('connection refused')
+
+        with mock.patch.object(probes, 'PROBES', [probes.Probe('cache', refused)]):
+            response = self.client.get(reverse('health-check'))
+        assert response.status_code == 503
+        assert response.json()['services']['cache'] == {'status': 'unhealthy', 'message': 'connection refused'}
+
+    def test_liveness_touches_no_dependency(self):
+        with mock.patch.object(probes, 'health_report') as report, self.assertNumQueries(0):
+            response = self.client.get(reverse('health-live'))
+        assert response.status_code == 200
+        assert response.json() == {'status': 'alive'}
+        report.assert_not_called()
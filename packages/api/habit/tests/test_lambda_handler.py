@@ -0,0 +1,150 @@
+import importlib
+import io
+import json
+import sys
+from contextlib import redirect_stdout
+from unittest import mock
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.test import SimpleTestCase
+from Habit_Tracker import db_connections
+from Habit_Tracker.metrics import emf_record, parse_emf
+
+
+def import_lambda_handler():
+    """Import lambda_handler afresh, without AWS config or warm-up; returns it and its stdout."""
+    sys.modules.pop('lambda_handler', None)
+    output = io.StringIO()
+    with mock.patch('Habit_Tracker.aws_config.load_aws_config', return_value={'total': 1.0}), \
+            mock.patch.dict('os.environ', {'LAMBDA_WARMUP': 'false'}), redirect_stdout(output):
+        module = importlib.import_module('lambda_handler')
+    return module, output.getvalue()
+
+
+def http_event(path, cookies=()):
+    """An API Gateway HTTP API (v2) event for a GET request."""
+    return {
+        'version': '2.0',
+        'routeKey': '$default',
+        'rawPath': path,
+        'rawQueryString': '',
+        'cookies': list(cookies),
+        'headers': {'host': 'testserver'},
+        'requestContext': {
+            'http': {'method': 'GET', 'path': path, 'protocol': 'HTTP/1.1', 'sourceIp': '127.0.0.1'},
+            'requestId': 'test', 'stage': '$default',
+        },
+        'isBase64Encoded': False,
+    }
+
+
+class LambdaHandlerMetricsTestCase(SimpleTestCase):
+    """Test cases for the cold-start EMF records of lambda_handler."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.module, output = import_lambda_handler()
+        cls.init_records = parse_emf(output.splitlines())
+
+    def invoke(self):
+        output = io.StringIO()
+        response = {'statusCode': 200, 'headers': {}, 'body': '{}'}
+        with mock.patch.object(self.module, 'handler', return_value=response), redirect_stdout(output):
+            self.module.lambda_handler({'rawPath': '/health/'}, None)
+        return parse_emf(output.getvalue().splitlines())
+
+    def test_init_phases_are_published(self):
+        record, = self.init_records
+        assert record['event'] == 'init'
+        assert record['aws_config_ms'] == {'total': 1.0}
+        metrics = [m['Name'] for m in record['_aws']['CloudWatchMetrics'][0]['Metrics']]
+        assert metrics == ['InitAwsConfigDuration', 'InitDjangoSetupDuration', 'InitMigrationsDuration',
+                           'InitWarmupDuration', 'InitMangumDuration', 'InitDuration']
+        assert record['InitDuration'] >= record['InitDjangoSetupDuration']
+
+    def test_first_invocation_is_cold(self):
+        with mock.patch.object(self.module, '_cold_start', True):
+            (cold,), (warm,) = self.invoke(), self.invoke()
+        assert cold['StartType'] == 'cold'
+        assert cold['InitDuration'] == self.module.INIT_DURATION_MS
+        assert set(cold['init_phases_ms']) == {'AwsConfig', 'DjangoSetup', 'Migrations', 'Warmup', 'Mangum'}
+        assert warm['StartType'] == 'warm'
+        assert 'InitDuration' not in warm
+        assert warm['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['FunctionName', 'StartType']]
+
+    def test_parser_rejects_records_missing_declared_metrics(self):
+        record = emf_record({'Duration': 1.0})
+        del record['Duration']
+        with self.assertRaises(ValueError):
+            parse_emf([json.dumps(record)])
+        assert parse_emf(['START RequestId: abc', 'not json {']) == []
+
+
+class LambdaHandlerConnectionTestCase(SimpleTestCase):
+    """Test cases for DB connection reuse across invocations served through Mangum."""
+
+    databases = {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.module, _ = import_lambda_handler()
+
+    def setUp(self):
+        db_connections.reset_stats()
+        self.addCleanup(db_connections.reset_stats)
+        # Connections opened from now on are kept across requests, as with PostgreSQL in Lambda
+        patcher = mock.patch.dict(connections.settings['default'], {'CONN_MAX_AGE': 600})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_warm_invocations_reuse_the_connection(self):
+        used = []
+        release = db_connections.release_connections
+
+        def record(*args, **kwargs):
+            used.append(connections['default'].connection)
+            release(*args, **kwargs)
+
+        # A session cookie makes the request look the session up in the database
+        event = http_event('/api/auth/check/', cookies=['sessionid=unknownsessionkey'])
+        with mock.patch.object(db_connections, 'release_connections', side_effect=record), \
+                redirect_stdout(io.StringIO()):
+            for _ in range(2):
+                assert self.module.lambda_handler(event, None)['statusCode'] == 200
+        first, second = used
+        assert first is not None and second is first
+        stats = db_connections.get_stats()
+        assert (stats['connects'], stats['reuses']) == (1, 1)
+
+    def test_first_request_reuses_the_warm_up_connection(self):
+        from Habit_Tracker.asgi_lambda import run_on_request_thread
+        from Habit_Tracker.warmup import warm_up
+
+        # As in init: the warm-up runs on the thread that serves requests
+        run_on_request_thread(warm_up)
+        warmed = run_on_request_thread(lambda: connections['default'].connection)
+        used = []
+        release = db_connections.release_connections
+
+        def record(*args, **kwargs):
+            used.append(connections['default'].connection)
+            release(*args, **kwargs)
+
+        event = http_event('/api/auth/check/', cookies=['sessionid=unknownsessionkey'])
+        with mock.patch.object(db_connections, 'release_connections', side_effect=record), \
+                redirect_stdout(io.StringIO()):
+            assert self.module.lambda_handler(event, None)['statusCode'] == 200
+        assert warmed is not None and used == [warmed]
+        stats = db_connections.get_stats()
+        assert (stats['connects'], stats['reuses']) == (1, 1)
+
+    def tearDown(self):
+        # Close the connection on the handler's request thread. The SQLite backend keeps
+        # connections to the in-memory test database open on close(), so bypass it.
+        def close_all():
+            for conn in connections.all(initialized_only=True):
+                BaseDatabaseWrapper.close(conn)
+
+        self.module.run_on_request_thread(close_all)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from habit.analytics import STRUGGLE_WEIGHTS, rank_habits
+from habit.leaderboard import refresh_changed_rankings, refresh_rankings, struggled_most_habits
+from habit.models import Habit, HabitRanking, Streak
+
+
+class LeaderboardTestCase(TestCase):
+    """Test cases for the precomputed habit rankings."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user = User.objects.create_user(username='test_user_1', password='123456')
+        counters = [(16, 14, 9, 0), (18, 12, 6, 6), (18, 12, 7, 0), (6, 2, 3, 3), (5, 3, 3, 2)]
+        for i, (completed, failed, longest, current) in enumerate(counters):
+            habit = Habit.objects.create(user=cls.user, name=f'habit {i}', frequency=1,
+                                         period='daily' if i < 3 else 'weekly', goal=30,
+                                         notes='', start_date=timezone.now())
+            Streak.objects.filter(habit=habit).update(
+                num_of_completed_tasks=completed, num_of_failed_tasks=failed,
+                longest_streak=longest, current_streak=current)
+
+    def ranked_ids(self, period):
+        return list(HabitRanking.objects.filter(period=period).order_by('rank').values_list('habit_id', flat=True))
+
+    def live_ids(self, period):
+        return [habit.id for habit, _ in rank_habits(STRUGGLE_WEIGHTS, period)]
+
+    def test_full_refresh_matches_live_ranking(self):
+        assert refresh_rankings() == 5
+        assert self.ranked_ids('daily') == self.live_ids('daily')
+        assert self.ranked_ids('weekly') == self.live_ids('weekly')
+
+    def test_incremental_refresh_only_rescores_changed_habits(self):
+        refresh_rankings()
+        assert refresh_changed_rankings() == 0
+
+        # Make the least struggled daily habit the most struggled one
+        habit_id = self.ranked_ids('daily')[-1]
+        Streak.objects.filter(habit_id=habit_id).update(num_of_failed_tasks=30, current_streak=0)
+
+        assert refresh_changed_rankings() == 1
+        assert self.ranked_ids('daily')[0] == habit_id
+        assert self.ranked_ids('daily') == self.live_ids('daily')
+
+    def test_incremental_refresh_drops_habits_outside_window(self):
+        refresh_rankings()
+        habit_id = self.ranked_ids('weekly')[0]
+        Habit.objects.filter(pk=habit_id).update(creation_time=timezone.now() - timedelta(days=40))
+
+        refresh_changed_rankings()
+        assert habit_id not in self.ranked_ids('weekly')
+        assert self.ranked_ids('weekly') == self.live_ids('weekly')
+
+    def test_struggled_most_reads_top_rows(self):
+        call_command('refresh_rankings')
+        # exists() check, then per period one indexed lookup and one streak prefetch
+        with self.assertNumQueries(5):
+            rankings = struggled_most_habits()
+        assert [habit.id for habit, _ in rankings['daily']] == self.live_ids('daily')[:1]
+        assert [habit.id for habit, _ in rankings['weekly']] == self.live_ids('weekly')[:1]
+
+    def test_struggled_most_falls_back_before_first_refresh(self):
+        rankings = struggled_most_habits(limit=3)
+        assert [habit.id for habit, _ in rankings['daily']] == self.live_ids('daily')
@@ -0,0 +1,275 @@
+import gzip
+import json
+import os
+from unittest import mock
+from django.http import HttpResponse, JsonResponse
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from Habit_Tracker import auth_cache, load_shedding, request_metrics, tiered_cache
+from Habit_Tracker.metrics import parse_emf
+from Habit_Tracker.middleware import (
+    CompressionMiddleware, CorsMiddleware, LoadSheddingMiddleware, RouteMiddleware, brotli, negotiate_encoding
+)
+
+
+def large_payload():
+    return {'all_habits': [{'id': i, 'name': f'habit {i}', 'notes': 'Read every day'} for i in range(200)]}
+
+
+class CompressionMiddlewareTestCase(SimpleTestCase):
+    """Test cases for CompressionMiddleware."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def run_middleware(self, path, response, accept_encoding='gzip'):
+        request = self.factory.get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiate_prefers_server_order_on_ties(self):
+        assert negotiate_encoding('gzip, br', ('br', 'gzip')) == 'br'
+        assert negotiate_encoding('gzip;q=1.0, br;q=0.5', ('br', 'gzip')) == 'gzip'
+        assert negotiate_encoding('br;q=0, *', ('br', 'gzip')) == 'gzip'
+        assert negotiate_encoding('identity', ('br', 'gzip')) is None
+
+    def test_large_json_is_gzipped(self):
+        response = self.run_middleware('/api/analysis/', JsonResponse(large_payload()))
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['Vary'] == 'Accept-Encoding'
+        assert int(response['Content-Length']) == len(response.content)
+        assert json.loads(gzip.decompress(response.content)) == large_payload()
+
+    def test_brotli_is_used_when_accepted(self):
+        response = self.run_middleware('/api/analysis/', JsonResponse(large_payload()), 'gzip, br')
+        expected = 'br' if brotli is not None else 'gzip'
+        assert response['Content-Encoding'] == expected
+
+    def test_small_response_is_not_compressed(self):
+        response = self.run_middleware('/api/habits/', JsonResponse({'habits': []}))
+        assert not response.has_header('Content-Encoding')
+
+    def test_health_and_auth_are_skipped(self):
+        for path in ('/health/', '/api/auth/check/'):
+            response = self.run_middleware(path, JsonResponse(large_payload()))
+            assert not response.has_header('Content-Encoding')
+
+    def test_binary_content_is_not_compressed(self):
+        response = self.run_middleware('/media/x.png', HttpResponse(b'\x89PNG' * 1000, content_type='image/png'))
+        assert not response.has_header('Content-Encoding')
+
+
+class CorsMiddlewareTestCase(SimpleTestCase):
+    """Test cases for CorsMiddleware."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.calls = []
+
+    def build(self, allowed_origins):
+        def get_response(request):
+            self.calls.append(request)
+            return HttpResponse('view')
+
+        with mock.patch.dict(os.environ, {'CORS_ALLOWED_ORIGINS': allowed_origins}):
+            return CorsMiddleware(get_response)
+
+    def test_preflight_is_answered_without_the_view(self):
+        middleware = self.build('https://app.example.com, https://admin.example.com')
+        request = self.factory.options('/api/habits/', HTTP_ORIGIN='https://app.example.com')
+        response = middleware(request)
+        assert self.calls == []
+        assert response.status_code == 200
+        assert response['Access-Control-Allow-Origin'] == 'https://app.example.com'
+        assert response['Access-Control-Allow-Credentials'] == 'true'
+        assert 'PATCH' in response['Access-Control-Allow-Methods']
+
+    def test_header_sets_are_precomputed_per_origin(self):
+        middleware = self.build('https://app.example.com,https://admin.example.com')
+        assert middleware.allowed_origins == {'https://app.example.com', 'https://admin.example.com'}
+        headers = middleware.origin_headers['https://admin.example.com']
+        assert middleware.headers_for('https://admin.example.com') is headers
+        assert middleware.headers_for('https://evil.example.com') is None
+
+    def test_disallowed_origin_passes_through(self):
+        middleware = self.build('https://app.example.com')
+        request = self.factory.options('/api/habits/', HTTP_ORIGIN='https://evil.example.com')
+        response = middleware(request)
+        assert len(self.calls) == 1
+        assert not response.has_header('Access-Control-Allow-Origin')
+
+    def test_allowed_origin_gets_headers_on_other_methods(self):
+        middleware = self.build('https://app.example.com')
+        response = middleware(self.factory.get('/api/habits/', HTTP_ORIGIN='https://app.example.com'))
+        assert response.content == b'view'
+        assert response['Access-Control-Allow-Origin'] == 'https://app.example.com'
+
+    def test_wildcard_echoes_origin_and_bounds_cache(self):
+        middleware = self.build('*')
+        middleware.MAX_CACHED_ORIGINS = 2
+        for i in range(4):
+            origin = f'https://{i}.example.com'
+            response = middleware(self.factory.options('/api/habits/', HTTP_ORIGIN=origin))
+            assert response['Access-Control-Allow-Origin'] == origin
+        assert self.calls == []
+        assert len(middleware.origin_headers) == 2
+
+
+class RouteMiddlewareTestCase(SimpleTestCase):
+    """Test cases for RouteMiddleware."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.requests = []
+
+    def get_response(self, request):
+        self.requests.append(request)
+        return HttpResponse('view')
+
+    def test_route_is_decided_by_first_path_segment(self):
+        middleware = RouteMiddleware(self.get_response)
+        assert middleware.route_for('/health/') == 'health'
+        assert middleware.route_for('/health/live/') == 'health'
+        assert middleware.route_for('/api/habits/3/delete/') == 'api'
+        assert middleware.route_for('/admin/login/') == 'html'
+        assert middleware.route_for('/') == 'html'
+        assert middleware.route_for('/favicon.ico') == 'html'
+        assert middleware.segment_routes['/api/'] == 'api'
+
+    def test_each_route_runs_only_its_chain(self):
+        middleware = RouteMiddleware(self.get_response)
+        for path in ('/health/', '/api/habits/', '/Habit-Manager/'):
+            middleware(self.factory.get(path))
+        health, api, html = self.requests
+        assert not hasattr(health, 'session') and not hasattr(health, 'user')
+        assert hasattr(api, 'session') and hasattr(api, 'user')
+        assert not hasattr(api, '_messages')
+        assert hasattr(html, '_messages')
+
+    @override_settings(MIDDLEWARE_ROUTE_PREFIXES={'/api/': 'json'})
+    def test_route_without_chain_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            RouteMiddleware(self.get_response)
+
+    def test_view_hooks_of_the_chain_are_run(self):
+        # CsrfViewMiddleware only checks the token in process_view
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse('api-complete-task'), {'task_id': 1})
+        assert response.status_code == 403
+
+
+@override_settings(LOAD_SHED_DB_LATENCY_MS=200, LOAD_SHED_RECOVER_LATENCY_MS=50, LOAD_SHED_SMOOTHING=0.5,
+                   LOAD_SHED_STALE_SECONDS=30, LOAD_SHED_RETRY_AFTER_SECONDS=7)
+class LoadSheddingMiddlewareTestCase(TestCase):
+    """Test cases for LoadSheddingMiddleware and the DB latency average."""
+
+    def setUp(self):
+        load_shedding.reset_stats()
+        self.user = User.objects.create_user(username='test_user_1', password='123456')
+        self.client.force_login(self.user)
+
+    def overload(self):
+        with mock.patch('time.time', return_value=1000):
+            load_shedding.record_query(400)
+
+    def test_average_moves_with_each_query_and_goes_stale(self):
+        load_shedding.record_query(100, now=1000)
+        load_shedding.record_query(300, now=1001)
+        assert load_shedding.get_stats()['db_latency_ms'] == 200
+        assert load_shedding.overloaded(now=1002)
+        # Hysteresis: still shedding until the average drops under the recovery threshold
+        load_shedding.record_query(100, now=1003)
+        assert load_shedding.overloaded(now=1003)
+        load_shedding.record_query(0, now=1004)
+        assert load_shedding.overloaded(now=1004)
+        load_shedding.record_query(0, now=1004)
+        assert not load_shedding.overloaded(now=1004)
+        load_shedding.record_query(400, now=1005)
+        assert load_shedding.overloaded(now=1005)
+        assert not load_shedding.overloaded(now=1036)
+        assert load_shedding.get_stats()['db_latency_ms'] is None
+        assert load_shedding.get_stats()['overloads'] == 2
+
+    def test_low_priority_requests_are_shed_without_queries(self):
+        self.overload()
+        with mock.patch('time.time', return_value=1001), self.assertNumQueries(0):
+            response = self.client.get(reverse('api-analysis'))
+        assert response.status_code == 503
+        assert response['Retry-After'] == '7'
+        stats = load_shedding.get_stats()
+        assert (stats['shed'], stats['admitted'], stats['shed_ratio']) == (1, 0, 1)
+
+    def test_auth_and_task_completion_are_still_served(self):
+        self.overload()
+        with mock.patch('time.time', return_value=1001):
+            assert self.client.get(reverse('auth-check')).json()['authenticated'] is True
+            response = self.client.post(reverse('api-complete-task'), {'task_id': 999},
+                                        content_type='application/json')
+        assert response.status_code != 503
+        assert load_shedding.get_stats()['shed'] == 0
+
+    def test_queries_of_served_requests_are_measured(self):
+        middleware = LoadSheddingMiddleware(lambda request: JsonResponse({'users': User.objects.count()}))
+        middleware(RequestFactory().get('/api/analysis/'))
+        stats = load_shedding.get_stats()
+        assert stats['queries'] == 1 and stats['db_latency_ms'] is not None
+        assert stats['admitted'] == 1
+
+
+@override_settings(SERVER_TIMING=True, REQUEST_METRICS_EMF=False,
+                   SESSION_ENGINE='django.contrib.sessions.backends.cache')
+class RequestMetricsMiddlewareTestCase(TestCase):
+    """Test cases for RequestMetricsMiddleware and the per-request counts."""
+
+    def setUp(self):
+        cache.clear()
+        auth_cache.clear_local()
+        tiered_cache.clear_local()
+        self.user = User.objects.create_user(username='test_user_1', password='123456', email='a@b.c')
+        self.client.force_login(self.user)
+
+    @staticmethod
+    def timings(response):
+        parts = [part.split(';') for part in response['Server-Timing'].split(', ')]
+        return {part[0]: dict(item.split('=', 1) for item in part[1:]) for part in parts}
+
+    def test_server_timing_counts_queries_and_cache_calls(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = self.timings(self.client.get(reverse('api-profile')))
+        assert first['db']['desc'] == f'"{len(queries)} queries"'
+        assert float(first['total']['dur']) >= float(first['db']['dur'])
+        tiered_cache.clear_local()
+        second = self.timings(self.client.get(reverse('api-profile')))
+        # Session, user and profile all come from the cache now
+        assert second['db']['desc'] == '"0 queries"'
+        assert second['cache']['desc'].endswith('/0 misses"')
+
+    @override_settings(SERVER_TIMING=False, REQUEST_METRICS_EMF=True, REQUEST_METRICS_FUNCTION_NAME='api')
+    def test_emf_record_per_route(self):
+        with mock.patch('Habit_Tracker.middleware.emit') as emit:
+            response = self.client.get(reverse('api-habits'))
+        assert not response.has_header('Server-Timing')
+        record, = parse_emf([json.dumps(emit.call_args.args[0])])
+        assert (record['FunctionName'], record['Route'], record['status_code']) == ('api', 'api-habits', 200)
+        assert record['Queries'] >= 1
+        units = {metric['Name']: metric['Unit'] for metric in record['_aws']['CloudWatchMetrics'][0]['Metrics']}
+        assert units['Queries'] == 'Count' and units['DBTime'] == 'Milliseconds'
+
+    @override_settings(SERVER_TIMING=False, REQUEST_METRICS_EMF=False)
+    def test_not_used_when_disabled(self):
+        assert not self.client.get(reverse('health-live')).has_header('Server-Timing')
+
+    def test_cache_reads_count_hits_and_misses_once(self):
+        cache.set('a', 1)
+        with request_metrics.measure() as metrics:
+            assert cache.get('a') == 1
+            assert cache.get('b', 'default') == 'default'
+            # LocMemCache.get_many calls get for each key
+            assert cache.get_many(['a', 'b']) == {'a': 1}
+        assert (metrics.cache_calls, metrics.cache_hits, metrics.cache_misses) == (3, 2, 2)
+        cache.get('a')
+        assert metrics.cache_calls == 3
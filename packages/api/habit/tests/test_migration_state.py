@@ -0,0 +1,105 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+from django.test import TestCase, override_settings
+from Habit_Tracker import migration_state
+from habit.models import SchemaState
+
+
+class MigrationStateTestCase(TestCase):
+    """Test cases for the cold-start migration fingerprint check."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = override_settings(MIGRATION_FINGERPRINT_FILE=os.path.join(directory.name, 'fingerprint.txt'))
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.fingerprint = migration_state.write_fingerprint()
+        patcher = mock.patch('Habit_Tracker.migration_state.call_command')
+        self.migrate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fingerprint_covers_every_migration(self):
+        assert self.fingerprint == migration_state.compute_fingerprint()
+        loader = migration_state.MigrationLoader(None, ignore_no_migrations=True)
+        loader.disk_migrations[('habit', '9999_new')] = None
+        with mock.patch.object(migration_state, 'MigrationLoader', return_value=loader):
+            assert migration_state.compute_fingerprint() != self.fingerprint
+
+    def test_up_to_date_database_costs_one_query(self):
+        SchemaState.objects.create(fingerprint=self.fingerprint)
+        with self.assertNumQueries(1):
+            assert migration_state.ensure_migrated() is False
+        self.migrate.assert_not_called()
+
+    def missing_one_migration(self):
+        # The test database is fully migrated: pretend the newest migration is pending
+        applied = migration_state.applied_migrations()
+        return mock.patch.object(migration_state, 'applied_migrations',
+                                 side_effect=[applied - {('habit', '0032_cacheinvalidation')}, applied])
+
+    def test_changed_fingerprint_migrates_once(self):
+        SchemaState.objects.create(fingerprint='stale')
+        with self.missing_one_migration():
+            assert migration_state.ensure_migrated() is True
+        self.migrate.assert_called_once_with('migrate', interactive=False, verbosity=0)
+        assert SchemaState.objects.get().fingerprint == self.fingerprint
+        assert migration_state.ensure_migrated() is False
+        assert self.migrate.call_count == 1
+
+    def test_concurrent_cold_start_skips_after_waiting_for_lock(self):
+        @contextmanager
+        def lock_released_by_other_cold_start():
+            # The lock holder migrated and recorded the fingerprint before releasing it
+            migration_state.record_fingerprint(self.fingerprint)
+            yield
+
+        with mock.patch.object(migration_state, 'migration_lock', lock_released_by_other_cold_start), \
+                self.missing_one_migration():
+            assert migration_state.ensure_migrated() is False
+        self.migrate.assert_not_called()
+
+    def test_older_image_neither_migrates_nor_records(self):
+        # A newer image of a rolling deploy already migrated and recorded its fingerprint
+        SchemaState.objects.create(fingerprint='newer')
+        assert migration_state.ensure_migrated() is False
+        self.migrate.assert_not_called()
+        assert SchemaState.objects.get().fingerprint == 'newer'
+
+    def test_fingerprint_is_kept_when_database_is_ahead(self):
+        SchemaState.objects.create(fingerprint='newer')
+        applied = migration_state.applied_migrations()
+        behind = applied - {('habit', '0032_cacheinvalidation')}
+        ahead = applied | {('habit', '9999_newer')}
+        with mock.patch.object(migration_state, 'applied_migrations', side_effect=[behind, ahead]):
+            assert migration_state.ensure_migrated() is True
+        self.migrate.assert_called_once()
+        assert SchemaState.objects.get().fingerprint == 'newer'
+
+    def postgresql(self, *attempts):
+        cursor = mock.MagicMock()
+        cursor.fetchone.side_effect = [(taken,) for taken in attempts]
+        connection = mock.MagicMock(vendor='postgresql')
+        connection.cursor.return_value.__enter__.return_value = cursor
+        return cursor, mock.patch.object(migration_state, 'connections', {'default': connection})
+
+    def test_lock_is_polled_until_taken(self):
+        cursor, patcher = self.postgresql(False, True)
+        with patcher, mock.patch('time.sleep') as sleep, migration_state.migration_lock():
+            pass
+        sleep.assert_called_once_with(migration_state.MIGRATION_LOCK_POLL_INTERVAL)
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        assert statements == ['SELECT pg_try_advisory_lock(%s)'] * 2 + ['SELECT pg_advisory_unlock(%s)']
+
+    @override_settings(MIGRATION_LOCK_TIMEOUT=0)
+    def test_lock_wait_is_bounded(self):
+        cursor, patcher = self.postgresql(False)
+        with patcher, self.assertRaises(TimeoutError):
+            with migration_state.migration_lock():
+                pass
+
+    def test_missing_baked_file_computes_fingerprint(self):
+        os.remove(migration_state.fingerprint_path())
+        assert migration_state.baked_fingerprint() == self.fingerprint
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from freezegun import freeze_time
+from Habit_Tracker import sessions
+from Habit_Tracker.middleware import SessionWriteMiddleware
+
+
+@override_settings(SESSION_COOKIE_AGE=86400, SESSION_REFRESH_FRACTION=0.25)
+class SlidingSessionTestCase(TestCase):
+    """Test cases for the sliding-expiry session engine."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user = User.objects.create_user(username='test_user_1', password='123456')
+
+    def setUp(self):
+        sessions.reset_stats()
+        self.start = timezone.now()
+
+    def get(self, path, elapsed):
+        with freeze_time(self.start + elapsed):
+            return self.client.get(path)
+
+    def test_read_only_requests_skip_the_write(self):
+        with freeze_time(self.start):
+            self.client.force_login(self.user)
+        for minutes in (1, 30, 300):
+            response = self.get(reverse('auth-check'), timedelta(minutes=minutes))
+            assert response.json()['authenticated'] is True
+            assert settings.SESSION_COOKIE_NAME not in response.cookies
+        stats = sessions.get_stats()
+        assert stats['writes'] == 0
+        assert stats['skipped'] == 3
+        assert stats['write_ratio'] == 0
+
+    def test_session_is_refreshed_after_fraction_of_its_age(self):
+        with freeze_time(self.start):
+            self.client.force_login(self.user)
+        response = self.get(reverse('auth-check'), timedelta(hours=7))
+        cookie = response.cookies[settings.SESSION_COOKIE_NAME]
+        assert cookie['max-age'] == 86400
+        assert sessions.get_stats()['refreshes'] == 1
+        # The refreshed session is not written again until another interval elapses
+        response = self.get(reverse('auth-check'), timedelta(hours=8))
+        assert settings.SESSION_COOKIE_NAME not in response.cookies
+        # Without the refresh the session would have expired by now
+        response = self.get(reverse('auth-check'), timedelta(hours=30))
+        assert response.json()['authenticated'] is True
+        assert sessions.get_stats()['writes'] == 2
+
+    def test_modified_session_is_written(self):
+        def set_theme(request):
+            request.session['theme'] = 'dark'
+            return HttpResponse()
+
+        with freeze_time(self.start):
+            self.client.force_login(self.user)
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = self.client.session.session_key
+        with freeze_time(self.start + timedelta(minutes=1)):
+            response = SessionWriteMiddleware(set_theme)(request)
+        assert settings.SESSION_COOKIE_NAME in response.cookies
+        assert self.client.session['theme'] == 'dark'
+        assert sessions.get_stats()['writes'] == 1
+        assert sessions.get_stats()['refreshes'] == 0
+
+    def test_anonymous_requests_create_no_session(self):
+        response = self.get(reverse('auth-check'), timedelta(0))
+        assert settings.SESSION_COOKIE_NAME not in response.cookies
+        assert sessions.get_stats() == {'writes': 0, 'refreshes': 0, 'skipped': 0, 'write_ratio': None}
+
+    def test_sessions_without_timestamp_are_refreshed(self):
+        store = sessions.SessionStore()
+        assert store.refresh_due({'_auth_user_id': '1'})
+        assert not store.refresh_due({sessions.REFRESHED_AT_KEY: 1000}, now=1000 + 21599)
+        assert store.refresh_due({sessions.REFRESHED_AT_KEY: 1000}, now=1000 + 21600)
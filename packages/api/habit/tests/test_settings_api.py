@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+API_DIR = settings.BASE_DIR
+
+
+@override_settings(ROOT_URLCONF='Habit_Tracker.urls_api')
+class ApiUrlconfTestCase(TestCase):
+    """Test cases for the JSON auth endpoints of the API-only URLconf."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user = User.objects.create_user(username='test_user_1', password='123456')
+
+    def test_login_returns_json(self):
+        response = self.client.post('/Login/', {'username': 'test_user_1', 'password': '123456'})
+        assert response.status_code == 200
+        assert response.json()['username'] == 'test_user_1'
+        assert self.client.get('/api/auth/check/').json()['authenticated'] is True
+
+    def test_login_rejects_bad_credentials(self):
+        response = self.client.post('/Login/', {'username': 'test_user_1', 'password': 'wrong'})
+        assert response.status_code == 400
+        assert response.json()['form']['errors']['__all__']
+
+    def test_register_reports_form_errors(self):
+        data = {'username': 'new_user', 'email': 'new@example.com',
+                'password1': 'a-long-passphrase', 'password2': 'a-long-passphrase'}
+        assert self.client.post('/Register/', data).status_code == 201
+        response = self.client.post('/Register/', data)
+        assert response.status_code == 400
+        assert 'username' in response.json()['form']['errors']
+
+    def test_logout(self):
+        self.client.force_login(self.user)
+        assert self.client.post('/Logout/').json() == {'success': True}
+        assert self.client.get('/api/auth/check/').json()['authenticated'] is False
+
+    def test_server_rendered_pages_are_not_routed(self):
+        assert self.client.get('/admin/').status_code == 404
+        assert self.client.get('/Habit-Manager/').status_code == 404
+
+
+class SettingsApiBootTestCase(SimpleTestCase):
+    """Test that the API profile boots without the server-rendered stack."""
+
+    def test_boot_skips_template_apps(self):
+        code = (
+            "import json, sys, django\n"
+            "django.setup()\n"
+            "from django.urls import get_resolver\n"
+            "get_resolver().url_patterns\n"
+            "print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in "
+            "('crispy_forms', 'fontawesomefree', 'django_extensions') "
+            "or m.startswith(('django.contrib.admin', 'django.contrib.messages')))))\n"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='Habit_Tracker.settings_api')
+        result = subprocess.run([sys.executable, '-c', code], cwd=API_DIR, env=env,
+                                capture_output=True, text=True, check=True)
+        assert json.loads(result.stdout) == []
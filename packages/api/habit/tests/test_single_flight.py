@@ -0,0 +1,157 @@
+import threading
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from Habit_Tracker import auth_cache, circuit_breaker, single_flight, tiered_cache
+from habit.cached import user_scope
+from habit.models import Habit
+
+REDIS_CACHES = {
+    'default': {
+        'BACKEND': 'Habit_Tracker.circuit_breaker.CircuitBreakerRedisCache',
+        'LOCATION': 'redis://fake:6379/1',
+        'OPTIONS': {'REDIS_CLIENT_CLASS': 'habit.tests.fake_redis.FaultyRedis'},
+    }
+}
+
+
+def take_over_lock():
+    """Compute that outlasts its lock, which another worker takes meanwhile."""
+    cache.set(single_flight.lock_key('key'), 42, 30)
+    return 'new'
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    """Test cases for the stampede-protected get_or_compute."""
+
+    def setUp(self):
+        cache.clear()
+        single_flight.reset_stats()
+        self.compute = mock.Mock(return_value='new')
+
+    def store(self, value, expires_in, delta=0.1):
+        entry = {'value': value, 'expires_at': time.time() + expires_in, 'delta': delta}
+        cache.set('key', entry, 600)
+
+    def test_fresh_value_is_computed_once(self):
+        for _ in range(3):
+            assert single_flight.get_or_compute('key', self.compute, timeout=60) == 'new'
+        assert self.compute.call_count == 1
+        stats = single_flight.get_stats()
+        assert (stats['hits'], stats['computes'], stats['hit_ratio']) == (2, 1, 2 / 3)
+
+    def test_stale_value_is_served_while_another_worker_recomputes(self):
+        self.store('old', expires_in=-1)
+        cache.add(single_flight.lock_key('key'), 1, 30)
+        assert single_flight.get_or_compute('key', self.compute, timeout=60, stale_timeout=60) == 'old'
+        self.compute.assert_not_called()
+        assert single_flight.get_stats()['stale_served'] == 1
+
+    def test_stale_value_is_recomputed_by_the_lock_holder(self):
+        self.store('old', expires_in=-1)
+        assert single_flight.get_or_compute('key', self.compute, timeout=60, stale_timeout=60) == 'new'
+        assert cache.get(single_flight.lock_key('key')) is None
+        assert cache.get('key')['value'] == 'new'
+
+    def test_early_refresh_probability_follows_expiry_and_compute_time(self):
+        entry = {'expires_at': 100, 'delta': 2}
+        with mock.patch('random.random', return_value=0.5):
+            # -2 * ln(0.5) is about 1.39 seconds ahead of expiry
+            assert not single_flight.refresh_early(entry, now=98.5, beta=1)
+            assert single_flight.refresh_early(entry, now=98.7, beta=1)
+            assert not single_flight.refresh_early(entry, now=99.9, beta=0)
+
+    def test_early_refresh_recomputes_before_expiry(self):
+        self.store('old', expires_in=30, delta=5)
+        with mock.patch('random.random', return_value=1 - 1e-9):
+            assert single_flight.get_or_compute('key', self.compute, timeout=60) == 'new'
+        assert single_flight.get_stats()['early_refreshes'] == 1
+
+    @override_settings(SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+    def test_concurrent_cold_reads_compute_once(self):
+        def slow():
+            time.sleep(0.1)
+            return 'new'
+
+        compute = mock.Mock(side_effect=slow)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight.get_or_compute('key', compute, 60)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == ['new'] * 8
+        assert compute.call_count == 1
+        assert single_flight.get_stats()['waits'] == 7
+
+    def test_lock_is_released_when_compute_fails(self):
+        self.compute.side_effect = RuntimeError('database down')
+        with self.assertRaises(RuntimeError):
+            single_flight.get_or_compute('key', self.compute, timeout=60)
+        assert cache.get(single_flight.lock_key('key')) is None
+
+    def test_lock_taken_by_another_worker_is_not_released(self):
+        assert single_flight.get_or_compute('key', take_over_lock, timeout=60) == 'new'
+        assert cache.get(single_flight.lock_key('key')) == 42
+
+
+@override_settings(CACHES=REDIS_CACHES)
+class RedisLockTestCase(SimpleTestCase):
+    """Test cases for the release of the single-flight lock on Redis."""
+
+    def setUp(self):
+        circuit_breaker.reset_breakers()
+        self.redis = cache.client.get_client()
+        self.redis.down, self.redis.latency = False, 0
+        self.redis.data.clear()
+        self.lock = cache.make_key(single_flight.lock_key('key'))
+
+    def test_lock_is_released_by_its_holder(self):
+        assert single_flight.get_or_compute('key', lambda: 'new', timeout=60) == 'new'
+        assert self.lock not in self.redis.data
+        assert cache.get('key')['value'] == 'new'
+
+    def test_lock_taken_by_another_worker_is_not_released(self):
+        assert single_flight.get_or_compute('key', take_over_lock, timeout=60) == 'new'
+        assert self.redis.data[self.lock] == b'42'
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+class CachedAnalysisTestCase(TestCase):
+    """Test cases for the cached analysis payload."""
+
+    def setUp(self):
+        cache.clear()
+        auth_cache.clear_local()
+        tiered_cache.clear_local()
+        self.user = User.objects.create_user(username='test_user_1', password='123456')
+        self.habit = Habit.objects.create(user=self.user, name='read', frequency=1, period='daily', goal=30,
+                                          notes='', start_date=timezone.now())
+        self.client.force_login(self.user)
+
+    def test_analysis_is_served_from_cache(self):
+        first = self.client.get(reverse('api-analysis')).json()
+        with self.assertNumQueries(0):
+            assert self.client.get(reverse('api-analysis')).json() == first
+
+    def test_habit_and_streak_changes_invalidate_analysis(self):
+        self.client.get(reverse('api-analysis'))
+        self.habit.name = 'read more'
+        self.habit.save()
+        data = self.client.get(reverse('api-analysis')).json()
+        assert data['all_habits'][0]['name'] == 'read more'
+
+        generation = tiered_cache.get_generation(user_scope(self.user.id))
+        streak = self.habit.streak.first()
+        streak.current_streak = 3
+        streak.save()
+        assert tiered_cache.get_generation(user_scope(self.user.id)) > generation
+        data = self.client.get(reverse('api-analysis')).json()
+        assert data['all_habits'][0]['streak'][0]['current_streak'] == 3
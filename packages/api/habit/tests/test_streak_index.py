@@ -0,0 +1,116 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from redis.exceptions import ConnectionError
+from django.utils import timezone
+from habit import streak_index
+from habit.analytics import longest_current_streak_over_all_habits, longest_streak_over_all_habits
+from habit.models import Habit, Streak
+from habit.tests.fake_redis import FakePipeline, FakeRedis
+
+
+class StreakIndexTestCase(TestCase):
+    """Test cases for the Redis streak indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Set up test data."""
+        cls.user = User.objects.create_user(username='test_user_1', password='123456')
+        cls.habits = [
+            Habit.objects.create(user=cls.user, name=f'habit {i}', frequency=1, period='daily',
+                                 goal=30, notes='', start_date=timezone.now())
+            for i in range(3)
+        ]
+        for habit, (current, longest) in zip(cls.habits, [(2, 9), (5, 5), (0, 3)]):
+            Streak.objects.filter(habit=habit).update(current_streak=current, longest_streak=longest)
+
+    def setUp(self):
+        """Route the index to an in-memory Redis."""
+        self.redis = FakeRedis()
+        patcher = mock.patch('habit.streak_index.get_redis_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rebuild_backfills_in_batches(self):
+        call_command('rebuild_streak_index', '--batch-size', '2', stdout=mock.Mock())
+        assert streak_index.top_habits('current_streak', k=3) == [
+            (self.habits[1].id, 5), (self.habits[0].id, 2), (self.habits[2].id, 0)]
+        assert streak_index.top_habits('longest_streak') == [(self.habits[0].id, 9)]
+
+    def test_streak_save_updates_index(self):
+        streak_index.rebuild_index()
+        streak = Streak.objects.get(habit=self.habits[2])
+        streak.current_streak = 7
+        with self.captureOnCommitCallbacks(execute=True):
+            streak.save()
+        assert streak_index.top_habits('current_streak') == [(self.habits[2].id, 7)]
+        assert streak_index.top_habits('longest_streak', k=2)[1] == (self.habits[2].id, 7)
+
+    def test_rolled_back_save_leaves_index_unchanged(self):
+        streak_index.rebuild_index()
+        streak = Streak.objects.get(habit=self.habits[2])
+        streak.current_streak = 7
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                streak.save()
+                raise RuntimeError('rolled back')
+        assert callbacks == []
+        assert streak_index.top_habits('current_streak') == [(self.habits[1].id, 5)]
+
+    def test_updates_do_not_create_an_unbuilt_index(self):
+        streak = Streak.objects.get(habit=self.habits[2])
+        streak.current_streak = 7
+        with self.captureOnCommitCallbacks(execute=True):
+            streak.save()
+        assert streak_index.index_key('current_streak') not in self.redis.data
+        assert streak_index.top_habits('current_streak') is None
+
+    def test_index_is_not_trusted_without_marker(self):
+        streak_index.rebuild_index()
+        # e.g. a failover that lost the marker but not the indexes
+        self.redis.delete(streak_index.built_key())
+        assert streak_index.top_habits('current_streak') is None
+
+    def test_failed_update_drops_the_marker(self):
+        streak_index.rebuild_index()
+        streak = Streak.objects.get(habit=self.habits[2])
+        streak.current_streak = 7
+        with mock.patch.object(FakePipeline, 'execute', side_effect=ConnectionError('down')), \
+                self.captureOnCommitCallbacks(execute=True):
+            streak.save()
+        assert streak_index.built_key() not in self.redis.data
+        assert streak_index.top_habits('current_streak') is None
+
+    def test_update_skipped_without_redis_drops_the_marker_later(self):
+        streak_index.rebuild_index()
+        streak = Streak.objects.get(habit=self.habits[2])
+        streak.current_streak = 7
+        # The circuit breaker is open: the update never reaches Redis
+        with mock.patch('habit.streak_index.get_redis_client', return_value=None), \
+                self.captureOnCommitCallbacks(execute=True):
+            streak.save()
+        assert streak_index.top_habits('current_streak') is None
+        assert streak_index.built_key() not in self.redis.data
+        streak_index.rebuild_index()
+        assert streak_index.top_habits('current_streak') == [(self.habits[2].id, 7)]
+
+    def test_habit_delete_removes_it_from_index(self):
+        streak_index.rebuild_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.habits[0].delete()
+        assert streak_index.top_habits('longest_streak') == [(self.habits[1].id, 5)]
+
+    def test_analytics_read_index_without_scanning_streaks(self):
+        streak_index.rebuild_index()
+        with self.assertNumQueries(0):
+            longest = longest_streak_over_all_habits()
+            current = longest_current_streak_over_all_habits()
+        assert longest.get() == self.habits[0]
+        assert current.get() == self.habits[1]
+
+    def test_analytics_fall_back_to_database_when_index_is_empty(self):
+        assert streak_index.top_habits('longest_streak') is None
+        assert longest_streak_over_all_habits().get() == self.habits[0]
+        assert longest_current_streak_over_all_habits().get() == self.habits[1]
@@ -0,0 +1,104 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from Habit_Tracker import auth_cache, tiered_cache
+from Habit_Tracker.tiered_cache import TieredCache
+from habit.cached import user_scope
+from habit.models import Habit
+
+
+class TieredCacheTestCase(TestCase):
+    """Test cases for the in-process and Redis tiers and their generations."""
+
+    def setUp(self):
+        cache.clear()
+        tiered_cache.clear_local()
+        tiered_cache.reset_stats()
+        self.records = TieredCache('record', timeout=60)
+        self.load = mock.Mock(return_value={'name': 'first'})
+
+    def test_reads_go_through_each_tier(self):
+        assert self.records.get_or_load(1, self.load, 'user:1') == {'name': 'first'}
+        self.records.get_or_load(1, self.load, 'user:1')
+        tiered_cache.clear_local()
+        self.records.get_or_load(1, self.load, 'user:1')
+        assert self.load.call_count == 1
+        stats = tiered_cache.get_stats()
+        assert (stats['local_hits'], stats['redis_hits'], stats['misses']) == (1, 1, 1)
+        assert stats['local_hit_ratio'] == 1 / 3
+        assert stats['redis_hit_ratio'] == 1 / 2
+        assert stats['hit_ratio'] == 2 / 3
+
+    def test_bump_invalidates_only_the_scope(self):
+        self.records.get_or_load(1, self.load, 'user:1')
+        self.records.get_or_load(1, self.load, 'user:2')
+        tiered_cache.bump_generation('user:1')
+        self.load.return_value = {'name': 'second'}
+        assert self.records.get_or_load(1, self.load, 'user:1') == {'name': 'second'}
+        assert self.records.get_or_load(1, self.load, 'user:2') == {'name': 'first'}
+
+    @override_settings(TIERED_CACHE_LOCAL_TTL=5)
+    def test_other_containers_see_a_bump_within_the_local_ttl(self):
+        with mock.patch('time.monotonic', return_value=1000):
+            self.records.get_or_load(1, self.load, 'user:1')
+            # Another container bumps the generation in Redis
+            cache.incr(tiered_cache.generation_key('user:1'))
+            self.load.return_value = {'name': 'second'}
+            assert self.records.get_or_load(1, self.load, 'user:1') == {'name': 'first'}
+        with mock.patch('time.monotonic', return_value=1005):
+            assert self.records.get_or_load(1, self.load, 'user:1') == {'name': 'second'}
+
+    def test_evicted_generation_does_not_revive_old_records(self):
+        self.records.get_or_load(1, self.load, 'user:1')
+        generation = tiered_cache.get_generation('user:1')
+        cache.delete(tiered_cache.generation_key('user:1'))
+        tiered_cache.clear_local()
+        with mock.patch('time.time', return_value=generation / 1000 + 1):
+            assert tiered_cache.get_generation('user:1') > generation
+
+    @override_settings(TIERED_CACHE_MAX_ENTRIES=4)
+    def test_local_tier_is_bounded(self):
+        for key in range(10):
+            self.records.get_or_load(key, self.load, 'user:1')
+        assert len(tiered_cache._local) == 4
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+class CachedRecordsTestCase(TestCase):
+    """Test cases for the profile and habit records served by the two-tier cache."""
+
+    def setUp(self):
+        cache.clear()
+        auth_cache.clear_local()
+        tiered_cache.clear_local()
+        self.user = User.objects.create_user(username='test_user_1', password='123456', email='a@b.c')
+        self.habit = Habit.objects.create(user=self.user, name='read', frequency=1, period='daily', goal=30,
+                                          notes='', start_date=timezone.now())
+        self.client.force_login(self.user)
+
+    def test_profile_needs_no_sql_once_cached(self):
+        self.client.get(reverse('api-profile'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('api-profile'))
+        assert response.json()['profile'] == {'email': 'a@b.c'}
+        self.user.email = 'new@b.c'
+        self.user.save()
+        assert self.client.get(reverse('api-profile')).json()['profile'] == {'email': 'new@b.c'}
+
+    def test_habit_change_invalidates_detail(self):
+        url = reverse('api-habit-detail', args=[self.habit.id])
+        assert self.client.get(url).json()['habit']['name'] == 'read'
+        generation = tiered_cache.get_generation(user_scope(self.user.id))
+        self.habit.name = 'read more'
+        self.habit.save()
+        assert tiered_cache.get_generation(user_scope(self.user.id)) > generation
+        assert self.client.get(url).json()['habit']['name'] == 'read more'
+
+    def test_other_users_habit_is_not_found(self):
+        other = User.objects.create_user(username='test_user_2', password='123456')
+        self.client.force_login(other)
+        response = self.client.get(reverse('api-habit-detail', args=[self.habit.id]))
+        assert response.status_code == 404
@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.template import engines
+from django.test import TestCase
+from django.urls import get_resolver
+from Habit_Tracker import warmup
+
+
+class WarmupTestCase(TestCase):
+    """Test cases for the Lambda init warm-up."""
+
+    def test_every_route_is_compiled(self):
+        resolver = get_resolver()
+        assert warmup.warm_urls() >= 20
+        assert resolver._populated
+
+    def test_templates_are_compiled(self):
+        assert warmup.warm_templates() > 0
+        # The cached loader now serves compiled templates without reading the disk
+        engine = engines['django'].engine
+        cached = [loader for loader in engine.template_loaders if hasattr(loader, 'get_template_cache')]
+        assert not cached or cached[0].get_template_cache
+
+    def test_one_query_per_model(self):
+        models = [model for model in apps.get_models() if model._meta.managed and not model._meta.proxy]
+        with self.assertNumQueries(len(models)):
+            assert warmup.warm_models() == len(models)
+
+    def test_deferred_imports_leave_numpy_unloaded(self):
+        assert 'habit.ranking' not in warmup.DEFERRED_IMPORTS
+        assert warmup.warm_imports() == len(warmup.DEFERRED_IMPORTS)
+
+    def test_warm_up_reports_each_step(self):
+        assert set(warmup.warm_up()) == {'routes', 'http', 'templates', 'models', 'imports', 'caches', 'probes'}
@@ -13,8 +13,9 @@ from .analytics import (
     calculate_progress, longest_current_streak_over_all_habits,
     all_tracked_habits, habits_by_period,
     longest_streak_over_all_habits, num_inprogress_tasks,
-    update_user_activity, rank_habits, all_completed_habits
+    update_user_activity, all_completed_habits
 )
+from .leaderboard import struggled_most_habits
 
 class HabitView(View):
     """
@@ -391,17 +392,11 @@ class HabitAnalysis(View):
         # Retrieve the habit with longest streak
         longest_all_streak = longest_streak_over_all_habits()
 
-        weights = {
-            'completed_tasks': -0.2,
-            'failed_tasks': 0.8,
-            'longest_streak': -0.2,
-            'current_streak': -0.1
-        }
-
-        daily_struggled_most = rank_habits(weights, 'daily')
-        weekly_struggled_most = rank_habits(weights, 'weekly')
+        # Read the precomputed rankings maintained by the refresh_rankings job
+        struggled_most = struggled_most_habits()
+        daily_struggled_most = struggled_most['daily']
+        weekly_struggled_most = struggled_most['weekly']
 
-        print(weekly_struggled_most)
         calculate_progress(all_habits)
         calculate_progress(daily_habits)
         calculate_progress(weekly_habits)
@@ -2,10 +2,14 @@
 AWS Lambda handler for Django application.
 Uses Mangum to adapt Django ASGI application to Lambda's HTTP API v2 interface.
 """
+import base64
+import importlib
 import os
 import sys
+import time
 import traceback
 import logging
+from contextlib import contextmanager
 
 # Add the project directory to Python path
 sys.path.insert(0, os.path.dirname(__file__))
@@ -15,6 +19,35 @@ logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO))
 logger = logging.getLogger("apprentice_final.lambda")
 logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
 
+from Habit_Tracker.metrics import emf_record, emit  # noqa: E402 (needs the path above)
+
+# Cold-start instrumentation: every init phase below is timed, published as an
+# EMF record once init completes, and attached to the first invocation
+_INIT_STARTED = time.perf_counter()
+INIT_PHASES = {}
+config_timings = None
+_cold_start = True
+FUNCTION_NAME = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+# Counters logged with every invocation, by log field
+RUNTIME_STATS = {
+    "db_connections": "Habit_Tracker.db_connections",
+    "session_writes": "Habit_Tracker.sessions",
+    "tiered_cache": "Habit_Tracker.tiered_cache",
+    "single_flight": "Habit_Tracker.single_flight",
+    "redis_circuit": "Habit_Tracker.circuit_breaker",
+    "load_shedding": "Habit_Tracker.load_shedding",
+}
+
+
+@contextmanager
+def _init_phase(name):
+    """Record the duration of an init phase in milliseconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        INIT_PHASES[name] = round((time.perf_counter() - start) * 1000, 1)
+
 
 def _log_event_summary(event):
     """Log basic request metadata to make troubleshooting easier."""
@@ -40,110 +73,206 @@ def _log_event_summary(event):
     except Exception:
         logger.debug("Unable to summarize incoming event", exc_info=True)
 
+
+def flag_encoded_body(response):
+    """
+    Make sure compressed response bodies reach API Gateway base64 encoded.
+
+    Mangum only base64 encodes bodies whose content type is not textual, or
+    that fail to decode as UTF-8. A brotli body can happen to be valid UTF-8,
+    in which case Mangum returns it as text and API Gateway corrupts it.
+    Decoding succeeded, so encoding the text back yields the original bytes.
+    """
+    if not isinstance(response, dict) or response.get("isBase64Encoded"):
+        return response
+    headers = {key.lower() for key in (response.get("headers") or {})}
+    headers.update(key.lower() for key in (response.get("multiValueHeaders") or {}))
+    if "content-encoding" in headers and response.get("body"):
+        response["body"] = base64.b64encode(response["body"].encode()).decode()
+        response["isBase64Encoded"] = True
+    return response
+
 # Load AWS configuration from Secrets Manager and SSM BEFORE Django setup
 # This must happen before any Django imports
-try:
-    from Habit_Tracker.aws_config import load_aws_config
-    load_aws_config()
-    logger.info("AWS config loaded successfully from Secrets Manager/SSM")
-except Exception as e:
-    logger.warning("Could not load AWS config, falling back to environment variables: %s", e, exc_info=True)
+with _init_phase("AwsConfig"):
+    try:
+        from Habit_Tracker.aws_config import load_aws_config
+        config_timings = load_aws_config()
+        logger.info("AWS config loaded successfully from Secrets Manager/SSM",
+                    extra={"timings_ms": config_timings})
+    except Exception as e:
+        logger.warning("Could not load AWS config, falling back to environment variables: %s", e, exc_info=True)
 
 # Set Django settings module BEFORE importing ASGI/WSGI
 # The asgi.py/wsgi.py module will also set this, but we set it here to ensure it's set before Django initializes
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Habit_Tracker.settings')
+# The API-only profile skips the admin and server-rendered pages the SPA never calls
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Habit_Tracker.settings_api')
 
 # Import ASGI application - Mangum works better with ASGI
-# This will trigger Django setup via get_asgi_application()
-try:
-    from Habit_Tracker.asgi import application
-    logger.info("Django ASGI application loaded successfully")
-except Exception as e:
-    logger.error("Failed to load Django ASGI application: %s", e, exc_info=True)
-    # Fallback to WSGI if ASGI fails
+# This will trigger Django setup; the Lambda handler runs every request's sync
+# code on one thread, so DB connections are reused across warm invocations
+with _init_phase("DjangoSetup"):
     try:
-        from Habit_Tracker.wsgi import application
-        logger.warning("Fell back to Django WSGI application")
-    except Exception as e2:
-        logger.critical("Failed to load Django WSGI application: %s", e2, exc_info=True)
-        # Create a dummy application that returns 500 error
-        async def error_application(scope, receive, send):
-            await send({
-                'type': 'http.response.start',
-                'status': 500,
-                'headers': [[b'content-type', b'text/plain']],
-            })
-            await send({
-                'type': 'http.response.body',
-                'body': b'Django application failed to initialize',
-            })
-        application = error_application
-
-# Run migrations on cold start (only if needed, can be optimized)
+        from Habit_Tracker.asgi_lambda import application, run_on_request_thread
+        logger.info("Django ASGI application loaded successfully")
+    except Exception as e:
+        logger.error("Failed to load Django ASGI application: %s", e, exc_info=True)
+
+        def run_on_request_thread(func):
+            """Without the Lambda ASGI handler, init work runs on the init thread."""
+            return func()
+
+        # Fallback to WSGI if ASGI fails
+        try:
+            from Habit_Tracker.wsgi import application
+            logger.warning("Fell back to Django WSGI application")
+        except Exception as e2:
+            logger.critical("Failed to load Django WSGI application: %s", e2, exc_info=True)
+            # Create a dummy application that returns 500 error
+            async def error_application(scope, receive, send):
+                await send({
+                    'type': 'http.response.start',
+                    'status': 500,
+                    'headers': [[b'content-type', b'text/plain']],
+                })
+                await send({
+                    'type': 'http.response.body',
+                    'body': b'Django application failed to initialize',
+                })
+            application = error_application
+
+# Run migrations on cold start when the database is behind the image
 # This happens after Django is set up by the ASGI/WSGI import
-try:
-    from django.core.management import execute_from_command_line
-    from django.db import connection
-    
-    # Only run migrations if DB_MIGRATE_ON_START is set
-    if os.environ.get('DB_MIGRATE_ON_START', 'false').lower() == 'true':
-        # Check if migrations are needed by checking if auth_user table exists
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_schema = 'public' 
-                    AND table_name = 'auth_user'
-                );
-            """)
-            tables_exist = cursor.fetchone()[0]
-        
-        if not tables_exist:
-            logger.info("Database tables not found. Running migrations...")
-            execute_from_command_line(['manage.py', 'migrate', '--noinput'])
-            logger.info("Migrations completed successfully")
-        else:
-            logger.info("Database tables already exist. Skipping migrations.")
-except Exception as e:
-    logger.warning("Could not run migrations on cold start: %s", e, exc_info=True)
+with _init_phase("Migrations"):
+    try:
+        # Only run migrations if DB_MIGRATE_ON_START is set
+        if os.environ.get('DB_MIGRATE_ON_START', 'false').lower() == 'true':
+            # One primary key read against the fingerprint baked at build time;
+            # migrations run under an advisory lock shared by concurrent cold starts
+            from Habit_Tracker.migration_state import ensure_migrated
+            if ensure_migrated():
+                logger.info("Migrations completed successfully")
+            else:
+                logger.info("Database schema is up to date. Skipping migrations.")
+            # Requests run on the application's own thread and never use this thread's connection;
+            # the warm-up opens theirs
+            from django.db import connections
+            connections.close_all()
+    except Exception as e:
+        logger.warning("Could not run migrations on cold start: %s", e, exc_info=True)
+
+# Do Django's lazy first-request work (URL resolver, templates, model metadata,
+# DB and cache connections) during init, so the first request is as fast as warm
+# ones. It runs on the thread that serves requests, so they reuse its DB connections.
+with _init_phase("Warmup"):
+    if os.environ.get('LAMBDA_WARMUP', 'true').lower() == 'true':
+        try:
+            from Habit_Tracker.warmup import warm_up
+            logger.info("Warm-up completed", extra={"warmed": run_on_request_thread(warm_up)})
+            # Imported by the first invocation's log line otherwise
+            for module in RUNTIME_STATS.values():
+                importlib.import_module(module)
+        except Exception as e:
+            logger.warning("Could not warm up Django: %s", e, exc_info=True)
 
 # Import Mangum adapter
-try:
-    from mangum import Mangum
-    # Create the Lambda handler at module level
-    # Mangum works with ASGI applications (Django ASGI is preferred for Lambda)
-    # lifespan="off" disables ASGI lifespan events (not needed for basic HTTP)
-    handler = Mangum(application, lifespan="off")
-    logger.info("Mangum handler created successfully")
-except Exception as e:
-    logger.critical("Failed to create Mangum handler: %s", e, exc_info=True)
-    # Create a fallback handler
-    def error_handler(event, context):
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json'},
-            'body': '{"error": "Lambda handler initialization failed"}'
-        }
-    handler = error_handler
+with _init_phase("Mangum"):
+    try:
+        from mangum import Mangum
+        # Create the Lambda handler at module level
+        # Mangum works with ASGI applications (Django ASGI is preferred for Lambda)
+        # lifespan="off" disables ASGI lifespan events (not needed for basic HTTP)
+        handler = Mangum(application, lifespan="off")
+        logger.info("Mangum handler created successfully")
+    except Exception as e:
+        logger.critical("Failed to create Mangum handler: %s", e, exc_info=True)
+        # Create a fallback handler
+        def error_handler(event, context):
+            return {
+                'statusCode': 500,
+                'headers': {'Content-Type': 'application/json'},
+                'body': '{"error": "Lambda handler initialization failed"}'
+            }
+        handler = error_handler
+
+INIT_DURATION_MS = round((time.perf_counter() - _INIT_STARTED) * 1000, 1)
+emit(emf_record(
+    {**{f"Init{name}Duration": ms for name, ms in INIT_PHASES.items()}, "InitDuration": INIT_DURATION_MS},
+    dimensions={"FunctionName": FUNCTION_NAME},
+    properties={"event": "init", "aws_config_ms": config_timings},
+))
+
+
+def _emit_invocation_metrics(cold, duration_ms):
+    """Publish the duration of an invocation, tagged cold or warm; cold ones carry the init duration."""
+    metrics = {"InvocationDuration": round(duration_ms, 1)}
+    properties = {"event": "invocation"}
+    if cold:
+        metrics["InitDuration"] = INIT_DURATION_MS
+        properties["init_phases_ms"] = INIT_PHASES
+    emit(emf_record(metrics, dimensions={"FunctionName": FUNCTION_NAME, "StartType": "cold" if cold else "warm"},
+                    properties=properties))
+
+
+# Management commands that scheduled (EventBridge) events may run through this function
+SCHEDULED_COMMANDS = {'refresh_rankings', 'rebuild_streak_index', 'replay_cache_invalidations', 'clearsessions'}
+
+
+def _run_scheduled_command(event):
+    """Run the management command named by a scheduled event."""
+    from django.core.management import call_command
+
+    command = event.get("management_command")
+    if command not in SCHEDULED_COMMANDS:
+        logger.error("Refusing to run unknown scheduled command %s", command)
+        return {"status": "rejected", "command": command}
+    logger.info("Running scheduled command %s", command)
+    call_command(command, *event.get("args", []))
+    return {"status": "ok", "command": command}
+
+
+def _runtime_stats(module):
+    """Return the counters of a Habit_Tracker module, or None if Django failed to load."""
+    try:
+        return importlib.import_module(module).get_stats()
+    except Exception:
+        return None
+
 
 def lambda_handler(event, context):
     """
     AWS Lambda handler entry point.
     
     Args:
-        event: Lambda event (API Gateway HTTP API v2 event)
+        event: Lambda event (API Gateway HTTP API v2 event, or an EventBridge
+            scheduled event carrying a ``management_command``)
         context: Lambda context object
     
     Returns:
         API Gateway HTTP API v2 response
     """
+    global _cold_start
+    cold, _cold_start = _cold_start, False
+    start = time.perf_counter()
+    try:
+        return _handle(event, context)
+    finally:
+        _emit_invocation_metrics(cold, (time.perf_counter() - start) * 1000)
+
+
+def _handle(event, context):
+    """Dispatch an event to a scheduled command or the Django application."""
+    if isinstance(event, dict) and "management_command" in event:
+        return _run_scheduled_command(event)
     _log_event_summary(event)
     try:
-        response = handler(event, context)
+        response = flag_encoded_body(handler(event, context))
         status = None
         if isinstance(response, dict):
             status = response.get("statusCode")
-        logger.info("Lambda invocation completed", extra={"status_code": status})
+        logger.info("Lambda invocation completed",
+                    extra={"status_code": status,
+                           **{field: _runtime_stats(module) for field, module in RUNTIME_STATS.items()}})
         return response
     except Exception as e:
         logger.error("Unhandled exception in lambda_handler: %s", e, exc_info=True)